@@ -0,0 +1,159 @@
+"""Async-native production entry point: an ASGI server, Motor and python-socketio.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+    python asgi.py --port 8000
+
+Socket.IO runs on python-socketio's ``AsyncServer`` in ASGI mode. Its
+handlers read sessions and chat rooms through Motor, so they never block
+the event loop. Every HTTP route is still the Flask app from main.py,
+served through a WSGI adapter that runs requests on ``ASGI_THREADS``
+worker threads: bcrypt, PDF parsing and the LLM call hold up a thread,
+never the loop. Nothing is monkey-patched.
+
+What the events do comes from utils.chat_service and utils.presence,
+shared with main.py's Flask-SocketIO handlers. Set SOCKETIO_MESSAGE_QUEUE (local://, redis://
+or amqp://) when running more than one worker.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from http.cookies import SimpleCookie
+import socketio
+from a2wsgi import WSGIMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import main
+from utils.chat_service import analysis_update, finished_analysis
+from utils.chat_store import AsyncRoomCache
+from utils.logs import log_event
+from utils.metrics import MongoCommandListener, timed_event
+from utils.presence import PRESENCE_INTERVAL, presence_room, watched_uids
+from utils.sessions import fetch_session
+from utils.socket_queue import async_client_manager
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+
+motor_client = AsyncIOMotorClient(main.CON, event_listeners=[MongoCommandListener()])
+motor_db = motor_client["freelanceconnect"]
+session_interface = main.app.session_interface
+rooms = AsyncRoomCache(main.room_cache, motor_db["chatroom"])
+
+sio = socketio.AsyncServer(async_mode="asgi", client_manager=async_client_manager(os.getenv("SOCKETIO_MESSAGE_QUEUE")))
+presence = main.presence
+presence.attach(sio.manager)
+loop = None
+
+
+async def load_session(environ):
+    cookie = SimpleCookie(environ.get("HTTP_COOKIE", "")).get(session_interface.get_cookie_name(main.app))
+    sid = session_interface.session_id(main.app, cookie.value if cookie else None)
+    entry = await fetch_session(session_interface.store, motor_db["sessions"], sid) if sid else None
+    return dict(entry[1]) if entry else {}
+
+
+@sio.event
+async def connect(sid, environ):
+    # Read once per connection; events use the saved copy
+    session = await load_session(environ)
+    await sio.save_session(sid, session)
+    presence.connect(sid, session.get("userid"))
+
+
+@sio.event
+async def disconnect(sid, reason=None):
+    presence.disconnect(sid)
+
+
+@sio.on("join")
+@timed_event("join")
+async def handle_join(sid, data):
+    room = data["room"]
+    if room in sio.rooms(sid):
+        return
+    await sio.enter_room(sid, room)
+    session = await sio.get_session(sid)
+    presence.room_change(room, session.get("username"), "joined")
+
+
+@sio.on("message")
+@timed_event("message")
+async def handle_message(sid, data):
+    room = data["room"]
+    room_meta = await rooms.get(room) if room else None
+    if room_meta:
+        session = await sio.get_session(sid)
+        payload = main.chat_service.post(room_meta, session.get("username"), session.get("userid"), data["message"])
+        await sio.emit("message", payload, to=room)
+        presence.typing(room, session.get("username"), False)
+
+
+@sio.on("typing")
+@timed_event("typing")
+async def handle_typing(sid, data):
+    session = await sio.get_session(sid)
+    presence.typing(data.get("room"), session.get("username"), bool(data.get("typing", True)))
+
+
+@sio.on("watch_presence")
+@timed_event("watch_presence")
+async def handle_watch_presence(sid, data):
+    uids = watched_uids(data.get("uids"))
+    for uid in uids:
+        await sio.enter_room(sid, presence_room(uid))
+    return sorted(presence.online(uids))
+
+
+@sio.on("watch_analysis")
+@timed_event("watch_analysis")
+async def handle_watch_analysis(sid, data):
+    await sio.enter_room(sid, data["job_id"])
+    # A job submitted to another worker is looked up in Mongo; keep that off the loop
+    update = await asyncio.get_running_loop().run_in_executor(None, finished_analysis, main.analysis_jobs,
+                                                              data["job_id"])
+    if update:
+        await sio.emit("analysis_done", update, to=sid)
+
+
+@sio.on("leave")
+@timed_event("leave")
+async def handle_leave(sid, data):
+    room = data["room"]
+    await sio.leave_room(sid, room)
+    session = await sio.get_session(sid)
+    presence.room_change(room, session.get("username"), "left")
+
+
+def notify_analysis_done(job_id, job):
+    # Called on an analysis worker thread; the emit belongs on the loop
+    asyncio.run_coroutine_threadsafe(sio.emit("analysis_done", analysis_update(job_id, job), to=job_id), loop)
+
+
+async def flush_presence():
+    while True:
+        await asyncio.sleep(PRESENCE_INTERVAL)
+        try:
+            for event, payload, room in presence.flush():
+                await sio.emit(event, payload, to=room)
+        except Exception as e:
+            log_event("presence_flush_failed", logging.ERROR, error=e)
+
+
+async def startup():
+    global loop
+    loop = asyncio.get_running_loop()
+    main.analysis_jobs.on_done = notify_analysis_done
+    loop.create_task(flush_presence())
+
+
+app = socketio.ASGIApp(sio, WSGIMiddleware(main.app, workers=ASGI_THREADS), on_startup=startup)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run FreelanceConnect on an ASGI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
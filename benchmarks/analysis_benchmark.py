@@ -0,0 +1,60 @@
+"""Throughput of the resume analysis pipeline against the stub LLM.
+
+Pushes ``--jobs`` analyses (``--unique`` distinct resumes) through
+AnalysisJobs and the shared LLMClient, then reports wall time, jobs per
+second and the client's coalescing/latency metrics:
+
+    python -m benchmarks.analysis_benchmark --jobs 200 --unique 50 --workers 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.stub_llm import start_stub, StubLLMHandler
+from utils.analysis import AnalysisJobs
+from utils.llm_client import LLMClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server, url = start_stub(delay=args.delay)
+
+    client = LLMClient(url, "stub-key", max_in_flight=args.workers)
+
+    def analyze(resume_text, job_requirements):
+        return client.chat(f"{resume_text}\n{job_requirements}")
+
+    def extract(path):
+        with open(path) as f:
+            return f.read()
+
+    done = threading.Semaphore(0)
+    jobs = AnalysisJobs(extract, analyze, on_done=lambda job_id, job: done.release(),
+                        max_workers=args.workers, max_pending=args.jobs)
+
+    start = time.perf_counter()
+    for i in range(args.jobs):
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"resume {i % args.unique}")
+        jobs.submit(path, "python, flask")
+    for _ in range(args.jobs):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{args.jobs} jobs in {elapsed:.2f}s ({args.jobs / elapsed:.1f} jobs/s), "
+          f"{StubLLMHandler.calls} LLM calls, {args.workers} workers")
+    print(client.metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Concurrent Socket.IO connection capacity of a running server, eventlet vs asyncio.
+
+Start the server in one mode, point the benchmark at it, then repeat for
+the other mode and compare:
+
+    python main.py                                    # Flask-SocketIO, port 5000
+    python -m benchmarks.connection_benchmark --url http://127.0.0.1:5000 --connections 2000
+    uvicorn asgi:app --port 8000                      # AsyncServer + Motor
+    python -m benchmarks.connection_benchmark --url http://127.0.0.1:8000 --connections 2000 \\
+        --compare benchmarks/results/<eventlet report>.json
+
+Connections are opened ``--ramp`` per second and held for ``--duration``
+seconds. Each one sits in its own room and keeps timing acknowledged
+``join`` round trips. Meanwhile ``--logins`` bcrypt logins per second hit the
+HTTP side, and that load is what shows a blocked event loop. The report
+gives connections established and still open at the end, connect, round
+trip and login percentiles, and errors. Both ends need file descriptors:
+the benchmark raises its own soft limit, the server may need ``ulimit -n``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from urllib.parse import urlparse
+
+from benchmarks.load_benchmark import Recorder, git_commit, print_report
+
+USERNAME = "connection-benchmark"
+PASSWORD = "connection-benchmark"
+
+
+def raise_fd_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+async def login(http, url, recorder=None):
+    """Log the benchmark user in; returns the session cookie header."""
+    form = {"username": USERNAME, "password": PASSWORD}
+    start = time.perf_counter()
+    async with http.post(f"{url}/auth/login", data=form, allow_redirects=False) as response:
+        ok = response.status == 302
+        cookie = "; ".join(f"{name}={morsel.value}" for name, morsel in response.cookies.items())
+    if recorder:
+        recorder.record("http_login", (time.perf_counter() - start) * 1000, ok)
+    return cookie if ok else None
+
+
+async def open_connection(url, cookie, recorder, timeout):
+    import socketio
+    client = socketio.AsyncClient(reconnection=False)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.connect(url, headers={"Cookie": cookie}, transports=["websocket"]), timeout)
+    except Exception:
+        recorder.record("connect", (time.perf_counter() - start) * 1000, False)
+        return None
+    recorder.record("connect", (time.perf_counter() - start) * 1000, True)
+    return client
+
+
+async def round_trips(client, room, deadline, interval, recorder, rng):
+    while time.monotonic() < deadline and client.connected:
+        start = time.perf_counter()
+        try:
+            # The acknowledgement comes back once the server has run the handler
+            await client.call("join", {"room": room}, timeout=5)
+            ok = True
+        except Exception:
+            ok = False
+        recorder.record("join_round_trip", (time.perf_counter() - start) * 1000, ok)
+        await asyncio.sleep(interval * (0.5 + rng.random()))
+
+
+async def login_load(http, url, rate, deadline, recorder):
+    if rate <= 0:
+        return
+    pending = set()
+    while time.monotonic() < deadline:
+        pending.add(asyncio.ensure_future(login(http, url, recorder)))
+        pending = {task for task in pending if not task.done()}
+        await asyncio.sleep(1 / rate)
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def run(args):
+    import aiohttp
+    url = args.url.rstrip("/")
+    recorder = Recorder()
+    async with aiohttp.ClientSession() as http:
+        await http.post(f"{url}/auth/signup", data={
+            "username": USERNAME, "email": f"{USERNAME}@example.com", "password": PASSWORD, "user_type": "freelancer",
+        }, allow_redirects=False)
+        cookie = await login(http, url)
+        if not cookie:
+            raise SystemExit(f"Could not log in to {url}")
+
+        start = time.monotonic()
+        connections = []
+        for offset in range(0, args.connections, args.ramp):
+            step = time.monotonic()
+            count = min(args.ramp, args.connections - offset)
+            opened = await asyncio.gather(*[open_connection(url, cookie, recorder, args.timeout) for _ in range(count)])
+            connections += [c for c in opened if c]
+            await asyncio.sleep(max(0.0, 1 - (time.monotonic() - step)))
+        established = len(connections)
+        ramp_seconds = time.monotonic() - start
+
+        rng = random.Random(args.seed)
+        deadline = time.monotonic() + args.duration
+        measured = time.monotonic()
+        await asyncio.gather(
+            login_load(http, url, args.logins, deadline, recorder),
+            *[round_trips(client, f"bench-{i}", deadline, args.interval, recorder, rng)
+              for i, client in enumerate(connections)],
+        )
+        elapsed = time.monotonic() - measured
+        held = sum(1 for client in connections if client.connected)
+        await asyncio.gather(*[client.disconnect() for client in connections], return_exceptions=True)
+
+    report = recorder.report(elapsed)
+    report["capacity"] = {"requested": args.connections, "established": established, "held": held,
+                          "ramp_s": round(ramp_seconds, 2)}
+    report["meta"] = {
+        "commit": git_commit(), "target": url, "connections": args.connections, "ramp": args.ramp,
+        "logins_per_s": args.logins, "duration_s": round(elapsed, 2), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--ramp", type=int, default=200, help="connections opened per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to hold the connections")
+    parser.add_argument("--interval", type=float, default=2.0, help="mean seconds between round trips per connection")
+    parser.add_argument("--logins", type=float, default=5.0, help="bcrypt logins per second during the hold")
+    parser.add_argument("--timeout", type=float, default=10.0, help="connect timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="where to write the JSON report")
+    parser.add_argument("--compare", help="a report from the other mode to compare against")
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    capacity = report["capacity"]
+    line = f"connections: {capacity['established']}/{capacity['requested']} established, {capacity['held']} held"
+    if baseline and "capacity" in baseline:
+        line += f" (base: {baseline['capacity']['established']} established, {baseline['capacity']['held']} held)"
+    print(line)
+
+    port = urlparse(args.url).port or "default"
+    out = args.out or os.path.join("benchmarks", "results", f"{report['meta']['commit']}-connections-{port}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
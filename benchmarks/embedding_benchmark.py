@@ -0,0 +1,110 @@
+"""Score one job against N freelancers: per-pair Python overlap vs the embedding index.
+
+    python -m benchmarks.embedding_benchmark --freelancers 100000
+"""
+import argparse
+import random
+import time
+import numpy as np
+
+from utils.embeddings import EmbeddingIndex
+from utils.skill_index import normalize_skills
+
+# Spellings of the same skill, as people actually type them
+SKILLS = [
+    ["react", "React.js", "reactjs"], ["node", "Node.js", "nodejs"], ["python", "Python3"],
+    ["django"], ["flask"], ["vue", "Vue.js"], ["angular", "AngularJS"], ["typescript", "TS"],
+    ["postgres", "PostgreSQL"], ["mongodb", "Mongo DB"], ["aws", "Amazon Web Services"],
+    ["docker"], ["kubernetes", "k8s"], ["figma"], ["photoshop", "Adobe Photoshop"],
+    ["seo"], ["copywriting", "copy writing"], ["swift", "SwiftUI"], ["kotlin"], ["flutter"],
+    ["machine learning", "ML"], ["pandas"], ["tensorflow"], ["excel", "MS Excel"],
+    ["wordpress", "WordPress"], ["shopify"], ["unity", "Unity3D"], ["golang", "Go"], ["rust"], ["c++", "cpp"],
+]
+WORDS = "build app website api dashboard fix bug design landing page store mobile backend data model".split()
+
+
+def make_freelancers(n, seed=7):
+    rng = random.Random(seed)
+    freelancers = []
+    for i in range(n):
+        picked = rng.sample(SKILLS, rng.randint(2, 6))
+        skills = [rng.choice(spellings) for spellings in picked]
+        text = " ".join(rng.choices(WORDS, k=12))
+        freelancers.append((str(i), skills, text))
+    return freelancers
+
+
+def overlap_scan(freelancers, required):
+    # What /match did before the skill index: one Python comparison per freelancer
+    required = normalize_skills(required)
+    scored = []
+    for uid, skills, _ in freelancers:
+        matched = required & normalize_skills(skills)
+        if matched:
+            scored.append((len(matched) / len(required), uid))
+    scored.sort(reverse=True)
+    return scored[:20]
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--freelancers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=20)
+    args = parser.parse_args()
+
+    freelancers = make_freelancers(args.freelancers)
+    index = EmbeddingIndex()
+    start = time.perf_counter()
+    index.fit([(skills, text) for _, skills, text in freelancers])
+    for uid, skills, text in freelancers:
+        index.upsert(uid, skills, text)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    index.train()
+    train = time.perf_counter() - start
+    print(f"Embedded {len(index)} freelancers in {build:.1f}s, trained IVF in {train:.1f}s, "
+          f"matrix {index.matrix[:len(index)].nbytes / 1e6:.0f} MB")
+
+    rng = random.Random(1)
+    jobs = [[rng.choice(s) for s in rng.sample(SKILLS, 3)] for _ in range(args.queries)]
+
+    python_ms, exact_ms, approx_ms, recalls = [], [], [], []
+    for skills in jobs:
+        vector = index.embed(skills, "need someone to build " + " ".join(skills))
+        _, samples = timed(lambda: overlap_scan(freelancers, skills), 1)
+        python_ms += samples
+        exact, samples = timed(lambda: index.search(vector, args.top_k), 3)
+        exact_ms += samples
+        approx, samples = timed(lambda: index.search(vector, args.top_k, approximate=True), 3)
+        approx_ms += samples
+        expected = {uid for uid, _ in exact}
+        recalls.append(len(expected & {uid for uid, _ in approx}) / max(1, len(expected)))
+
+    print(f"{'':<24}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, samples in [("python overlap scan", python_ms), ("exact matmul", exact_ms), ("approximate (IVF)", approx_ms)]:
+        print(f"{name:<24}{percentile(samples, 0.5):>10.1f}{percentile(samples, 0.99):>10.1f}")
+    print(f"approximate recall@{args.top_k}: {np.mean(recalls):.2f}")
+
+    # Spelling variants: how close does each land to its canonical form?
+    for spellings in SKILLS[:3]:
+        canonical = index.embed([spellings[0]])
+        print(", ".join(f"{s} {float(index.embed([s]) @ canonical):.2f}" for s in spellings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Scripted HTTP and Socket.IO load against the app's hot paths.
+
+Each virtual user logs in as a seeded account and runs a weighted mix of
+operations for ``--duration`` seconds. Latencies are reported per endpoint
+(throughput, p50/p95/p99) and written as JSON, so runs on two commits can
+be compared:
+
+    python -m benchmarks.load_benchmark --mongomock --scale 2 --profile mixed
+    python -m benchmarks.load_benchmark --url http://localhost:5000 --concurrency 20
+    python -m benchmarks.load_benchmark --mongomock --compare benchmarks/results/<old>.json
+
+In-process mode imports ``main`` and drives it through Flask's and
+Flask-SocketIO's test clients; with ``--mongomock`` the database is an
+in-memory mongomock seeded by ``benchmarks.seed_data`` (it has no
+indexes, so keep ``--scale`` small there), otherwise CON_STR
+is used (add ``--seed-db`` to fill it first). ``--url`` drives a running
+server over real HTTP and WebSocket connections instead; the server's
+database has to be seeded separately.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.seed_data import PASSWORD, SKILLS, add_arguments, counts_from_args, seed
+
+# profile -> user type -> [(weight, operation)]
+PROFILES = {
+    "browse": {
+        "client": [(4, "home"), (4, "feed"), (3, "search"), (3, "comments")],
+        "freelancer": [(4, "home"), (4, "feed"), (3, "search"), (3, "comments")],
+    },
+    "mixed": {
+        "client": [(3, "home"), (3, "feed"), (2, "search"), (2, "comments"), (1, "add_comment"),
+                   (2, "match"), (2, "chat")],
+        "freelancer": [(3, "home"), (3, "feed"), (3, "search"), (2, "comments"), (1, "add_comment"),
+                       (2, "recommended_jobs"), (2, "chat")],
+    },
+    "chat": {
+        "client": [(1, "chat")],
+        "freelancer": [(1, "chat")],
+    },
+}
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, name, ms, ok):
+        with self.lock:
+            self.samples[name].append(ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for name in sorted(self.samples):
+            samples = sorted(self.samples[name])
+            endpoints[name] = {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "rps": round(len(samples) / duration, 2),
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(percentile(samples, 0.50), 3),
+                "p95_ms": round(percentile(samples, 0.95), 3),
+                "p99_ms": round(percentile(samples, 0.99), 3),
+            }
+        total = sum(e["count"] for e in endpoints.values())
+        return {"endpoints": endpoints, "total_rps": round(total / duration, 2)}
+
+
+class InProcessUser:
+    """One virtual user driving ``main.app`` through the Flask test client."""
+
+    def __init__(self, app_module, username):
+        self.main = app_module
+        self.http = app_module.app.test_client()
+        response = self.http.post("/auth/login", data={"username": username, "password": PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f"login failed for {username}: {response.status_code}")
+        self.socket = None
+
+    def get(self, path):
+        response = self.http.get(path)
+        return response.status_code < 400, response.get_json(silent=True)
+
+    def post_json(self, path, body):
+        response = self.http.post(path, json=body)
+        return response.status_code < 400, response.get_json(silent=True)
+
+    def join(self, room):
+        self.socket = self.main.socketio.test_client(self.main.app, flask_test_client=self.http)
+        self.socket.emit("join", {"room": room})
+        self.socket.get_received()
+
+    def send_message(self, room, text):
+        # The test client runs the handler inline, so this times handle_message itself
+        self.socket.emit("message", {"room": room, "message": text})
+        received = self.socket.get_received()
+        return any(packet["name"] == "message" for packet in received)
+
+
+class RemoteUser:
+    """One virtual user talking to a running server over HTTP and Socket.IO."""
+
+    def __init__(self, base_url, username):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        response = self.http.post(f"{self.base_url}/auth/login",
+                                  data={"username": username, "password": PASSWORD}, allow_redirects=False)
+        if response.status_code != 302:
+            raise RuntimeError(f"login failed for {username}: {response.status_code}")
+        self.socket = None
+        self.echo = threading.Event()
+
+    def get(self, path):
+        response = self.http.get(self.base_url + path)
+        return response.ok, (response.json() if "json" in response.headers.get("Content-Type", "") else None)
+
+    def post_json(self, path, body):
+        response = self.http.post(self.base_url + path, json=body)
+        return response.ok, (response.json() if "json" in response.headers.get("Content-Type", "") else None)
+
+    def join(self, room):
+        import socketio
+        self.socket = socketio.Client()
+        self.socket.on("message", lambda data: self.echo.set())
+        cookie = "; ".join(f"{k}={v}" for k, v in self.http.cookies.items())
+        self.socket.connect(self.base_url, headers={"Cookie": cookie}, transports=["websocket"])
+        self.socket.emit("join", {"room": room})
+        time.sleep(0.1)
+        self.echo.clear()
+
+    def send_message(self, room, text):
+        # Round trip: emit, then wait for the broadcast to come back
+        self.echo.clear()
+        self.socket.emit("message", {"room": room, "message": text})
+        return self.echo.wait(5)
+
+
+class Scenario:
+    def __init__(self, user, username, summary, rng):
+        self.user = user
+        self.username = username
+        self.summary = summary
+        self.rng = rng
+        self.feed_cursor = None
+        self.room = None
+
+    def run(self, operation):
+        return getattr(self, operation)()
+
+    def home(self):
+        return self.user.get("/home")[0]
+
+    def feed(self):
+        # Scroll a few pages deep, then start again from the top
+        path = "/home/feed" + (f"?cursor={self.feed_cursor}" if self.feed_cursor else "")
+        ok, body = self.user.get(path)
+        self.feed_cursor = (body or {}).get("next_cursor") if self.rng.random() < 0.75 else None
+        return ok
+
+    def search(self):
+        return self.user.get(f"/search?query={self.rng.choice(SKILLS)}")[0]
+
+    def comments(self):
+        return self.user.get(f"/home/posts/{self.rng.choice(self.summary['posts'])}/comments")[0]
+
+    def add_comment(self):
+        post_id = self.rng.choice(self.summary["posts"])
+        return self.user.post_json(f"/home/posts/{post_id}/comment",
+                                   {"comment": "load test comment", "userId": self.summary["ids"][self.username]})[0]
+
+    def match(self):
+        return self.user.post_json("/match", {"postid": self.rng.choice(self.summary["client_posts"])})[0]
+
+    def recommended_jobs(self):
+        return self.user.get("/home/recommended_jobs")[0]
+
+    def chat(self):
+        if self.room is None:
+            rooms = [r for r in self.summary["rooms"] if self.summary["ids"][self.username] in (r["client_id"], r["freelancer_id"])]
+            self.room = (rooms or self.summary["rooms"])[0]["room_id"]
+            self.user.join(self.room)
+        return self.user.send_message(self.room, "load test message")
+
+
+def run_user(make_user, username, user_type, summary, profile, deadline, recorder, seed):
+    rng = random.Random(seed)
+    scenario = Scenario(make_user(username), username, summary, rng)
+    weighted = PROFILES[profile][user_type]
+    operations = [name for _, name in weighted]
+    weights = [weight for weight, _ in weighted]
+    while time.monotonic() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        start = time.perf_counter()
+        try:
+            ok = scenario.run(operation)
+        except Exception as e:
+            print(f"{operation} failed: {e}")
+            ok = False
+        recorder.record(operation, (time.perf_counter() - start) * 1000, ok)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<18}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          + (f"{'p95 vs base':>13}" if baseline else ""))
+    for name, stats in report["endpoints"].items():
+        line = (f"{name:<18}{stats['count']:>8}{stats['errors']:>6}{stats['rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+        old = (baseline or {}).get("endpoints", {}).get(name)
+        if old and old["p95_ms"]:
+            line += f"{(stats['p95_ms'] / old['p95_ms'] - 1) * 100:>+12.0f}%"
+        print(line)
+    print(f"total throughput: {report['total_rps']:.1f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--mongomock", action="store_true", help="in-process against an in-memory database")
+    parser.add_argument("--seed-db", action="store_true", help="seed CON_STR before an in-process run")
+    parser.add_argument("--url", help="drive a running server instead of importing main")
+    parser.add_argument("--out", help="where to write the JSON report")
+    parser.add_argument("--compare", help="an earlier JSON report to compare p95 against")
+    add_arguments(parser)
+    args = parser.parse_args()
+    counts = counts_from_args(args)
+
+    if args.url:
+        from pymongo import MongoClient
+        from dotenv import load_dotenv
+        load_dotenv()
+        db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+        summary = summarize(db)
+        make_user = lambda username: RemoteUser(args.url, username)
+    else:
+        if args.mongomock:
+            use_mongomock()
+        import main as app_module
+        if args.mongomock or args.seed_db:
+            start = time.perf_counter()
+            seed(app_module.db, seed=args.seed, **counts)
+            print(f"Seeded {counts} in {time.perf_counter() - start:.1f}s")
+        summary = summarize(app_module.db)
+        make_user = lambda username: InProcessUser(app_module, username)
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = []
+    for i in range(args.concurrency):
+        user_type = "client" if i % 2 == 0 else "freelancer"
+        username = summary[user_type + "s"][i // 2 % len(summary[user_type + "s"])]
+        threads.append(threading.Thread(
+            target=run_user,
+            args=(make_user, username, user_type, summary, args.profile, deadline, recorder, args.seed + i),
+        ))
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    report = recorder.report(elapsed)
+    report["meta"] = {
+        "commit": git_commit(), "profile": args.profile, "concurrency": args.concurrency, "duration_s": round(elapsed, 2),
+        "target": args.url or ("mongomock" if args.mongomock else "CON_STR"), "counts": counts,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    out = args.out or os.path.join("benchmarks", "results", f"{report['meta']['commit']}-{args.profile}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {out}")
+
+
+def use_mongomock():
+    import mongomock
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+    # mongomock writes "_id" into the projection dict it is given, which races
+    # when threads share a module-level projection such as FEED_PROJECTION
+    find = mongomock.collection.Collection.find
+
+    def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+        return find(self, filter, dict(projection) if isinstance(projection, dict) else projection, *args, **kwargs)
+
+    mongomock.collection.Collection.find = find_with_copied_projection
+
+
+def summarize(db):
+    """What the load profiles need to know about the seeded data."""
+    users = list(db["users"].find({"email": {"$regex": "@example\\.com$"}}, {"username": 1, "user_type": 1}))
+    return {
+        "clients": [u["username"] for u in users if u["user_type"] == "client"],
+        "freelancers": [u["username"] for u in users if u["user_type"] == "freelancer"],
+        "ids": {u["username"]: str(u["_id"]) for u in users},
+        "posts": [str(p["_id"]) for p in db["posts"].find({}, {"_id": 1}).limit(5000)],
+        "client_posts": [str(p["_id"]) for p in db["posts"].find({"user_type": "client"}, {"_id": 1}).limit(5000)],
+        "rooms": list(db["chatroom"].find({}, {"_id": 0, "room_id": 1, "client_id": 1, "freelancer_id": 1})),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Event-loop stall during a login storm: inline bcrypt vs the offloaded pool.
+
+Runs on an eventlet hub the way ``python main.py`` does: socketio.run
+serves greenlets without monkey-patching, so neither does this. A green
+"chat" ticker wakes every 10ms and records how late it was while
+``--logins`` concurrent logins verify a password, first with
+bcrypt.checkpw inline and then through utils.passwords.check_password:
+
+    python -m benchmarks.login_storm_benchmark --logins 50 --rounds 12
+"""
+import argparse
+import time
+
+import bcrypt
+import eventlet
+
+from utils import passwords
+
+TICK = 0.01
+
+
+def measure(login, hashed, logins):
+    lags = []
+    running = True
+
+    def ticker():
+        while running:
+            start = time.perf_counter()
+            eventlet.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    tick = eventlet.spawn(ticker)
+    eventlet.sleep(0.05)
+    start = time.perf_counter()
+    pool = eventlet.GreenPool(logins)
+    for _ in range(logins):
+        pool.spawn(login, b"hunter2" if login is bcrypt.checkpw else "hunter2", hashed)
+    pool.waitall()
+    elapsed = time.perf_counter() - start
+    running = False
+    tick.wait()
+    lags.sort()
+    return elapsed, lags[len(lags) // 2] * 1000, lags[int(len(lags) * 0.99)] * 1000, lags[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"hunter2", bcrypt.gensalt(args.rounds))
+    print(f"{'mode':<10}{'total s':>9}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for name, login in (("inline", bcrypt.checkpw), ("offloaded", passwords.check_password)):
+        elapsed, p50, p99, worst = measure(login, hashed, args.logins)
+        print(f"{name:<10}{elapsed:>9.2f}{p50:>12.1f}{p99:>12.1f}{worst:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare the old $regex title scan with the in-process BM25 search index.
+
+The regex path is reproduced in Python (a case-insensitive regex tested
+against every title), which is what Mongo does for an unanchored $regex
+that cannot use an index.
+
+    python -m benchmarks.search_benchmark --posts 100000
+"""
+import argparse
+import itertools
+import random
+import re
+import time
+
+from utils.search import SearchIndex
+
+WORDS = (
+    "python react django flask node java kotlin swift rust golang sql mongodb aws docker "
+    "kubernetes design logo seo content writing marketing video editing translation data "
+    "analysis machine learning mobile app website backend frontend api testing automation"
+).split()
+LOCATIONS = ["Mumbai", "Pune", "Delhi", "Bangalore", "Remote", "London", "New York", "Berlin"]
+QUERIES = ["python", "react developer", "logo design", "machine learning", "mobile app testing", "seo content"]
+
+
+def make_corpus(n, seed=42, vocabulary=20_000):
+    rng = random.Random(seed)
+    # Filler words follow a rough Zipf distribution, like real descriptions
+    filler = [f"w{i}" for i in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    posts = []
+    for i in range(n):
+        posts.append({
+            "_id": i,
+            "Title": " ".join(rng.choices(WORDS, k=2) + rng.choices(filler, cum_weights=cum_weights, k=2)).title(),
+            "Content": " ".join(rng.choices(filler, cum_weights=cum_weights, k=35) + rng.choices(WORDS, k=3)),
+            "Skills": rng.sample(WORDS, 3),
+            "Location": rng.choice(LOCATIONS),
+            "Budget": str(rng.randint(50, 5000)),
+        })
+    return posts
+
+
+def regex_search(posts, query):
+    pattern = re.compile(query, re.IGNORECASE)
+    return [post["_id"] for post in posts if pattern.search(post["Title"])]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = make_corpus(args.posts)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for post in posts:
+        index.add_post(post)
+    print(f"Indexed {len(index)} posts in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<22}{'regex ms':>10}{'index ms':>10}{'regex hits':>12}{'index hits':>12}")
+    for query in QUERIES:
+        regex_ms = timed(lambda: regex_search(posts, query), args.repeat)
+        index_ms = timed(lambda: index.search(query), args.repeat)
+        _, total = index.search(query)
+        print(f"{query:<22}{regex_ms:>10.1f}{index_ms:>10.1f}{len(regex_search(posts, query)):>12}{total:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Seed a database with synthetic users, posts, comments and chat history.
+
+Documents have the same shape the app writes, including the derived
+collections (skill index, match table), so every route works on them.
+
+    python -m benchmarks.seed_data --users 2000 --posts 20000 --comments 50000
+    python -m benchmarks.seed_data --scale 10        # 10x the defaults
+
+Writes to CON_STR (a local mongod); the load benchmark can also seed
+mongomock in-process with the same ``seed`` function.
+"""
+import argparse
+import os
+import random
+import time
+from bson import ObjectId
+
+from utils.comments import add_comment
+from utils.match_table import rebuild_match_table
+from utils.passwords import hash_password
+from utils.render_cache import render_content
+from utils.skill_index import normalize_skills, rebuild_skill_index
+
+PASSWORD = "benchmark"
+DEFAULTS = {"users": 500, "posts": 5000, "comments": 10000, "chatrooms": 200, "messages": 20000}
+SKILLS = ("python react django flask node java kotlin swift rust golang sql mongodb aws docker "
+          "kubernetes figma seo copywriting wordpress shopify excel flutter vue angular").split()
+WORDS = ("build app website api dashboard fix bug design landing page store mobile backend data "
+         "model migrate integrate payment login report chart scrape automate deploy test").split()
+LOCATIONS = ["Mumbai", "Pune", "Delhi", "Bangalore", "Remote", "London", "New York", "Berlin"]
+BATCH = 1000
+
+
+def _insert(collection, docs):
+    for start in range(0, len(docs), BATCH):
+        collection.insert_many(docs[start:start + BATCH], ordered=False)
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def seed(db, users=DEFAULTS["users"], posts=DEFAULTS["posts"], comments=DEFAULTS["comments"],
+         chatrooms=DEFAULTS["chatrooms"], messages=DEFAULTS["messages"], seed=42):
+    """Fill ``db`` with ``users`` accounts (a third of them clients), their posts and activity."""
+    rng = random.Random(seed)
+    # One hash for everybody: bcrypt at the real work factor is the slow part of seeding
+    hashed = hash_password(PASSWORD)
+
+    user_docs = []
+    for i in range(users):
+        user_type = "client" if i % 3 == 0 else "freelancer"
+        user_docs.append({
+            "_id": ObjectId(), "username": f"{user_type}{i}", "email": f"{user_type}{i}@example.com",
+            "hashed_password": hashed, "user_type": user_type,
+        })
+    _insert(db["users"], user_docs)
+    clients = [u for u in user_docs if u["user_type"] == "client"]
+    freelancers = [u for u in user_docs if u["user_type"] == "freelancer"]
+
+    post_docs = []
+    for _ in range(posts):
+        author = rng.choice(user_docs)
+        skills = rng.sample(SKILLS, rng.randint(1, 4))
+        content = _sentence(rng, 40)
+        post = {
+            "_id": ObjectId(), "Title": _sentence(rng, 4).title(), "Content": content,
+            "Content_html": render_content(content), "Location": rng.choice(LOCATIONS),
+            "Budget": str(rng.randint(50, 5000)), "Multimedia": [], "comment_count": 0,
+            "UID": str(author["_id"]), "user_type": author["user_type"],
+        }
+        if author["user_type"] == "client":
+            post["Skills"] = skills
+            post["skill_keys"] = sorted(normalize_skills(skills))
+        else:
+            post["Skills_required"] = skills
+        post_docs.append(post)
+    _insert(db["posts"], post_docs)
+
+    for _ in range(comments):
+        author = rng.choice(user_docs)
+        add_comment(db["comments"], db["posts"], rng.choice(post_docs)["_id"], {
+            "user_id": str(author["_id"]), "username": author["username"],
+            "comment": _sentence(rng, 12), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    rooms = []
+    for _ in range(min(chatrooms, len(clients) * len(freelancers))):
+        client, freelancer = rng.choice(clients), rng.choice(freelancers)
+        room_id = f"{client['_id']}_{freelancer['_id']}"
+        rooms.append({"room_id": room_id, "client_id": str(client["_id"]), "freelancer_id": str(freelancer["_id"])})
+        for member in (client, freelancer):
+            db["users"].update_one({"_id": member["_id"]}, {"$addToSet": {"chatrooms": room_id}})
+    rooms = list({room["room_id"]: room for room in rooms}.values())
+    if rooms:
+        _insert(db["chatroom"], [dict(room) for room in rooms])
+    message_docs = []
+    seq = int(time.time() * 1_000_000)
+    for i in range(messages if rooms else 0):
+        room = rng.choice(rooms)
+        seq += 1
+        message_docs.append({
+            "room_id": room["room_id"], "seq": seq, "sender": "benchmark", "sender_id": room["client_id"],
+            "message": _sentence(rng, 8), "timestamp": "12:00",
+        })
+    _insert(db["messages"], message_docs)
+
+    rebuild_skill_index(db["posts"], db["skill_index"], db["users"])
+    rebuild_match_table(db["posts"], db["skill_index"], db["matches"])
+
+
+def scaled(scale):
+    return {name: int(count * scale) for name, count in DEFAULTS.items()}
+
+
+def add_arguments(parser):
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every default count")
+    for name in DEFAULTS:
+        parser.add_argument(f"--{name}", type=int, help=f"default {DEFAULTS[name]} x scale")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def counts_from_args(args):
+    counts = scaled(args.scale)
+    counts.update({name: getattr(args, name) for name in DEFAULTS if getattr(args, name) is not None})
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic FreelanceConnect data")
+    add_arguments(parser)
+    parser.add_argument("--drop", action="store_true", help="drop the database first")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.schema import apply_indexes
+
+    load_dotenv()
+    client = MongoClient(os.getenv("CON_STR"))
+    if args.drop:
+        client.drop_database("freelanceconnect")
+    db = client["freelanceconnect"]
+    apply_indexes(db)
+    counts = counts_from_args(args)
+    start = time.perf_counter()
+    seed(db, seed=args.seed, **counts)
+    print(f"Seeded {counts} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,140 @@
+"""Multi-worker Socket.IO fan-out through the local broker: delivered messages/s and latency.
+
+For each worker count the benchmark starts a local broker and that many
+Socket.IO worker processes. Each worker is a Flask-SocketIO server
+configured with ``socketio_queue_options`` and served by ``socketio.run``,
+as main.py is. ``--clients`` Socket.IO clients connect to every worker and
+join one room. A sender on worker 0 then emits ``--messages`` chat messages
+at ``--rate`` per second, and the worker broadcasts each one to the room
+the way ``handle_message`` does. Every message has to cross the broker to
+reach the clients on the other workers.
+
+The report gives delivered messages/s across all clients, the share of
+expected deliveries that arrived, and p50/p99 latency from send to
+receipt:
+
+    python -m benchmarks.socketio_fanout_benchmark --workers 1 2 4 --clients 20 --messages 500
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from utils.local_broker import start_broker_thread
+
+ROOM = "bench"
+
+
+def serve_worker(port, queue_url):
+    """One Socket.IO worker process, set up like main.py."""
+    from flask import Flask
+    from flask_socketio import SocketIO, emit, join_room
+
+    from utils.socket_queue import socketio_queue_options
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, **socketio_queue_options(queue_url))
+
+    @socketio.on("join")
+    def handle_join(data):
+        join_room(data["room"])
+        return True
+
+    @socketio.on("message")
+    def handle_message(data):
+        emit("message", data, to=data["room"])
+
+    socketio.run(app, port=port, log_output=False)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def connect(url):
+    import socketio
+    client = socketio.AsyncClient(reconnection=False)
+    await client.connect(url, transports=["websocket"])
+    return client
+
+
+async def measure(urls, clients_per_worker, messages, rate, drain):
+    latencies = []
+    clients = []
+    for url in urls:
+        for _ in range(clients_per_worker):
+            client = await connect(url)
+            client.on("message", lambda data: latencies.append(time.time() - data["sent"]))
+            await client.call("join", {"room": ROOM}, timeout=10)
+            clients.append(client)
+    sender = await connect(urls[0])
+
+    expected = messages * len(clients)
+    start = time.time()
+    for seq in range(messages):
+        await sender.emit("message", {"room": ROOM, "seq": seq, "sent": time.time()})
+        await asyncio.sleep(max(0.0, start + (seq + 1) / rate - time.time()))
+    deadline = time.monotonic() + drain
+    while len(latencies) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.time() - start
+
+    await asyncio.gather(*[client.disconnect() for client in clients + [sender]], return_exceptions=True)
+    latencies.sort()
+    if not latencies:
+        return 0.0, 0.0, None, None
+    return (len(latencies) / elapsed, len(latencies) / expected,
+            latencies[len(latencies) // 2] * 1000, latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000)
+
+
+def run(workers, args):
+    queue_url = f"local://127.0.0.1:{start_broker_thread()}"
+    ports = [free_port() for _ in range(workers)]
+    procs = [multiprocessing.Process(target=serve_worker, args=(port, queue_url), daemon=True) for port in ports]
+    for proc in procs:
+        proc.start()
+    for port in ports:
+        wait_for_port(port)
+    try:
+        return asyncio.run(measure([f"http://127.0.0.1:{port}" for port in ports], args.clients,
+                                   args.messages, args.rate, args.drain))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=20, help="clients connected to each worker")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="messages sent per second")
+    parser.add_argument("--drain", type=float, default=10, help="seconds to wait for late deliveries")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'clients':>9}{'msgs/s':>10}{'delivered':>11}{'p50 ms':>10}{'p99 ms':>10}")
+    for workers in args.workers:
+        rate, delivered, p50, p99 = run(workers, args)
+        p50 = f"{p50:.1f}" if p50 is not None else "-"
+        p99 = f"{p99:.1f}" if p99 is not None else "-"
+        print(f"{workers:>8}{workers * args.clients:>9}{rate:>10.0f}{delivered:>11.1%}{p50:>10}{p99:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Local stand-in for the Groq chat completions API.
+
+Answers every POST with a canned OpenAI-style completion after a fixed
+delay, so the analysis pipeline can be exercised without network access.
+Tests can queue other replies (429s, 5xx, malformed bodies) with
+``queue_replies``; they are served in order before the canned one.
+
+    python -m benchmarks.stub_llm --port 8001 --delay 1.5
+    LLM_BASE_URL=http://127.0.0.1:8001/v1/chat/completions python main.py
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    delay = 1.0
+    calls = 0
+    active = 0
+    peak_active = 0  # most requests being served at once
+    replies = deque()  # (status, body, headers) served before the canned reply
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        with StubLLMHandler.lock:
+            StubLLMHandler.calls += 1
+            StubLLMHandler.active += 1
+            StubLLMHandler.peak_active = max(StubLLMHandler.peak_active, StubLLMHandler.active)
+            reply = StubLLMHandler.replies.popleft() if StubLLMHandler.replies else None
+        try:
+            time.sleep(self.delay)
+            if reply is None:
+                prompt = ""
+                try:
+                    prompt = json.loads(body)["messages"][-1]["content"]
+                except (ValueError, KeyError, IndexError):
+                    pass
+                reply = (200, {"choices": [{"message": {"role": "assistant",
+                                                        "content": f"Stub analysis of {len(prompt)} characters."}}]}, {})
+            status, payload, headers = reply
+            payload = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with StubLLMHandler.lock:
+                StubLLMHandler.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, delay=1.0):
+    """Start the stub on a background thread; returns ``(server, url)``."""
+    with StubLLMHandler.lock:
+        StubLLMHandler.delay = delay
+        StubLLMHandler.calls = StubLLMHandler.active = StubLLMHandler.peak_active = 0
+        StubLLMHandler.replies.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def queue_replies(*replies):
+    """Serve ``(status, body[, headers])`` replies, in order, before the canned one.
+
+    ``body`` is a dict sent as JSON, or a string sent as is.
+    """
+    with StubLLMHandler.lock:
+        for reply in replies:
+            status, body, headers = (tuple(reply) + ({},))[:3]
+            StubLLMHandler.replies.append((status, body, headers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+    server, url = start_stub(args.port, args.delay)
+    print(f"Stub LLM listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,10 +1,28 @@
 import os
+import logging
+import queue
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
 from pymongo import MongoClient
-import bcrypt
+from pymongo.errors import DuplicateKeyError
 from werkzeug.utils import secure_filename
 import base64
-from utils.utils import convert_lists_to_html
+from utils.feed import fetch_feed_page, parse_page_size, FEED_PROJECTION
+from utils.render_cache import attach_content_html
+from utils.comments import add_comment as add_post_comment, fetch_comments, COMMENTS_PAGE_SIZE, COMMENTS_MAX_PAGE_SIZE
+from utils.user_cache import UserCache
+from utils.schema import apply_indexes
+from utils.passwords import hash_password, check_password, needs_rehash, rehash_in_background, HashingBusy
+from utils.search import SearchIndex, SEARCH_PAGE_SIZE, parse_budget
+from utils.skill_index import index_freelancer_skills, normalize_skills, MATCH_TOP_K, MATCH_MAX_K
+from utils.match_table import refresh_post_matches, refresh_freelancer_matches, recommended_freelancers, recommended_jobs
+from utils.embeddings import FreelancerEmbeddings
+from utils.storage import blob_store_from_env
+from utils.posts import client_post, freelancer_post, create_post, import_posts, IMPORT_MAX_POSTS
+from utils.media import send_blob
+from utils.thumbnails import Thumbnailer, THUMBNAIL_SIZES
+from utils.sessions import ServerSideSessionInterface, session_store_from_env
+from utils.metrics import MongoCommandListener, init_app as init_metrics, register_llm_client, timed_event
+from utils.logs import log_event
 # , save_profile_picture, save_profile_picture_free
 from dotenv import load_dotenv
 
@@ -16,24 +34,42 @@ CON = os.getenv("CON_STR")
 app = Flask(__name__)
 app.secret_key = "your_secret_key_here"
 
-client = MongoClient(CON)
+init_metrics(app)
+
+client = MongoClient(CON, event_listeners=[MongoCommandListener()])
 db = client["freelanceconnect"]
 users_collection = db["users"]
+user_cache = UserCache(users_collection)
 posts_collection = db["posts"]
 file_collection = db['files']
 profile_collection = db['profile']
+skill_index_collection = db['skill_index']
+matches_collection = db['matches']
+comments_collection = db['comments']
+chatroom_collection = db['chatroom']
+messages_collection = db['messages']
+blobs_collection = db['blobs']
+sessions_collection = db['sessions']
+analysis_jobs_collection = db['analysis_jobs']
+apply_indexes(db)
 
-UPLOAD_FOLDER = "client_uploads"
-ALLOWED_EXTENSIONS = {"pdf", "jpg", "png", "docx"}
+# The cookie holds only a signed session id; the data stays server-side
+app.session_interface = ServerSideSessionInterface(session_store_from_env(sessions_collection))
 
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["FREE_UPLOAD_FOLDER"] = "freelance_uploads"
+# Uploads of every kind go through one content-addressed store
+blob_store = blob_store_from_env(blobs_collection)
+thumbnailer = Thumbnailer(blob_store)
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+ATTACHMENT_EXTENSIONS = {"pdf", "jpg", "jpeg", "png", "docx"}
 
-def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+def allowed_attachment(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ATTACHMENT_EXTENSIONS
+
+# Resumes are served back from this origin, so only document types are accepted
+RESUME_EXTENSIONS = {"pdf", "docx"}
+
+def allowed_resume(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in RESUME_EXTENSIONS
 
 @app.route("/")
 def landingpage():
@@ -53,16 +89,23 @@ def signup():
         password = data.get("password")
         user_type = data.get("user_type")
 
-        if users_collection.find_one({"email": email}):
+        if users_collection.find_one({"$or": [{"email": email}, {"username": username}]}, {"_id": 1}):
             return jsonify({"message": "User already exists"}), 400
 
-        hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-        users_collection.insert_one({
-            "username": username,
-            "email": email,
-            "hashed_password": hashed_pw,
-            "user_type": user_type,
-        })
+        try:
+            hashed_pw = hash_password(password)
+        except HashingBusy as e:
+            return jsonify({"message": str(e)}), 503
+        try:
+            users_collection.insert_one({
+                "username": username,
+                "email": email,
+                "hashed_password": hashed_pw,
+                "user_type": user_type,
+            })
+        except DuplicateKeyError:
+            # Taken by a concurrent signup between the check and the insert
+            return jsonify({"message": "User already exists"}), 400
         return redirect(url_for("login"))
     return render_template("signup.html")
 
@@ -74,7 +117,16 @@ def login():
         username = data.get("username")
         password = data.get("password")
         user = users_collection.find_one({"username": username})
-        if user and bcrypt.checkpw(password.encode("utf-8"), user["hashed_password"]):
+        try:
+            valid = bool(user) and check_password(password, user["hashed_password"])
+        except HashingBusy as e:
+            return jsonify({"message": str(e)}), 503
+        if valid:
+            if needs_rehash(user["hashed_password"]):
+                rehash_in_background(users_collection, user["_id"], password)
+            # A fresh session id, so one fixed before login cannot ride along
+            session.clear()
+            session.regenerate()
             session["username"] = user["username"]
             session["user_type"] = user["user_type"]
             session["email"] = user["email"]
@@ -87,18 +139,27 @@ def login():
 def home():
     if "userid" in session:
         user_type = session.get("user_type", "").lower()
-        posts = list(posts_collection.find({}))
-        for post in posts:
-            post["_id"] = str(post["_id"])
-            post["Content"] = convert_lists_to_html(post["Content"])
+        posts, next_cursor = fetch_feed_page(posts_collection)
         if user_type == "client":
-            return render_template("client/client_dashboard.html", posts=posts)
+            return render_template("client/client_dashboard.html", posts=posts, next_cursor=next_cursor)
         elif user_type == "freelancer":
-            return render_template("freelancer/freelancer_dashboard.html", posts=posts)
+            return render_template("freelancer/freelancer_dashboard.html", posts=posts, next_cursor=next_cursor)
         return redirect(url_for("login"))
     return redirect(url_for("login"))
 
 
+@app.route("/home/feed", methods=["GET"])
+def feed():
+    if "userid" not in session:
+        return jsonify({"message": "Unauthorized"}), 401
+    limit = parse_page_size(request.args.get("limit"))
+    try:
+        posts, next_cursor = fetch_feed_page(posts_collection, request.args.get("cursor"), limit)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"posts": posts, "next_cursor": next_cursor})
+
+
 
 from bson import ObjectId
 from datetime import datetime
@@ -106,22 +167,19 @@ from datetime import datetime
 @app.route("/home/posts/<postid>/comment", methods=["POST"])
 def add_comment(postid):
     if "userid" not in session:
-        print("Unauthorized: User not logged in.")
         return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    data = request.get_json()
-    print("Received data:", data)  
+    data = request.get_json(silent=True) or {}
 
     comment_text = data.get("comment")
-    user_id = data.get("userId")
+    # The author is whoever is logged in; any user id in the body is ignored
+    user_id = session["userid"]
 
-    if not comment_text or not user_id:
-        print("Invalid request: Missing comment or user ID.")
+    if not comment_text:
         return jsonify({"success": False, "message": "Invalid request"}), 400
 
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     if not user:
-        print("User not found:", user_id)
         return jsonify({"success": False, "message": "User not found"}), 404
 
     comment = {
@@ -131,75 +189,87 @@ def add_comment(postid):
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    print("Comment to be added:", comment)  
-    result = posts_collection.update_one(
-        {"_id": ObjectId(postid)},
-        {"$push": {"Comments": comment}}
-    )
-
-    if result.modified_count > 0:
-        print("Comment added successfully to post:", postid)
+    if add_post_comment(comments_collection, posts_collection, postid, comment):
+        log_event("comment_added", post_id=postid, user_id=user_id)
         return jsonify({"success": True, "message": "Comment added successfully"})
     else:
-        print("Failed to add comment to post:", postid)
+        log_event("comment_failed", logging.WARNING, post_id=postid, user_id=user_id)
         return jsonify({"success": False, "message": "Failed to add comment"}), 500
     
     
 
+@app.route("/home/posts/<postid>/comments", methods=["GET"])
+def get_comments(postid):
+    if "userid" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    limit = parse_page_size(request.args.get("limit"), COMMENTS_PAGE_SIZE, COMMENTS_MAX_PAGE_SIZE)
+    try:
+        comments, next_cursor = fetch_comments(comments_collection, postid, request.args.get("cursor"), limit)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, "comments": comments, "next_cursor": next_cursor})
+
+
 @app.route("/home/posts", methods=["GET", "POST"])
 def posts():
-    print("Request method:", request.method)
-
     if "userid" in session and session["user_type"].lower() == "client":
         if request.method == "POST":
-            print("Form submitted!")
-
-            title = request.form.get("title")
-            content = request.form.get("description")
-            location = request.form.get("location")
-            budget = request.form.get("budget")
-            documents = request.files.getlist("document")
-            skills_required = request.form.get("skills_required")
-
-            print("Title:", title)
-            print("Content:", content)
-            print("Documents:", [doc.filename for doc in documents] if documents else "No document")
-            if not title or not content:
-                print("Missing fields!")
+            if not request.form.get("title") or not request.form.get("description"):
                 return "Missing title or content", 400
-            post_data = {
-                "Title": title,
-                "Content": content,
-                "Location":location,
-                "Budget": budget,
-                "Multimedia": [],
-                "Comments": [],
-                "Skills": skills_required.split(',') if skills_required else [],
-                "UID": session["userid"],
-                "user_type": session["user_type"]
-            }
-            inserted_post = posts_collection.insert_one(post_data)
-            post_id = str(inserted_post.inserted_id)  
-            user_folder = os.path.join(app.config["UPLOAD_FOLDER"], f"client_{session['userid']}")
-            post_folder = os.path.join(user_folder, "posts", post_id, "multimedia")
-            os.makedirs(post_folder, exist_ok=True)  
-            for doc in documents:
-                if doc and allowed_file(doc.filename):
-                    filename = secure_filename(doc.filename)
-                    file_path = os.path.join(post_folder, filename)
-                    doc.save(file_path)
-                    post_data["Multimedia"].append(file_path)  
-                    print(file_path)
-            posts_collection.update_one({"_id": inserted_post.inserted_id}, {"$set": post_data})
-            print("Post stored in collection!")
-            
+            documents = [doc for doc in request.files.getlist("document") if doc and allowed_attachment(doc.filename)]
+            # The _id is generated client-side, so attachments are stored first and the post is one insert
+            post_data = create_post(posts_collection, blob_store, client_post(request.form, session["userid"]), documents)
+            published_client_posts([post_data])
+            log_event("post_created", post_id=str(post_data["_id"]), user_type="client",
+                      attachments=len(post_data["Multimedia"]))
             return redirect(url_for("home"))
         return render_template("client/client_dashboard.html")
     return redirect(url_for("login"))
 
+
+def published_client_posts(posts):
+    """Bring the derived data up to date for newly inserted client posts."""
+    for post in posts:
+        try:
+            for attachment in post["Multimedia"]:
+                thumbnailer.submit(attachment["key"])
+            refresh_post_matches(matches_collection, skill_index_collection, post)
+            search_index.add_post(post)
+        except Exception as e:
+            # The post is already written; one bad post must not hold back the rest
+            log_event("post_publish_failed", logging.ERROR, post_id=str(post["_id"]), error=e)
+
+
+@app.route("/home/posts/import", methods=["POST"])
+def import_client_posts():
+    """Create many job posts from one JSON body: ``{"posts": [{title, description, ...}]}``.
+
+    Items are written with unordered bulk inserts; the response has one
+    result per item, so a bad item does not fail the rest.
+    """
+    if "userid" not in session or session["user_type"].lower() != "client":
+        return jsonify({"message": "Unauthorized"}), 401
+    items = (request.get_json(silent=True) or {}).get("posts")
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Expected a non-empty posts list"}), 400
+    if len(items) > IMPORT_MAX_POSTS:
+        return jsonify({"message": f"At most {IMPORT_MAX_POSTS} posts per import"}), 400
+
+    uid = session["userid"]
+    inserted, results = import_posts(posts_collection, items, lambda item: client_post(item, uid))
+    published_client_posts(inserted)
+    log_event("posts_imported", user_id=uid, inserted=len(inserted), failed=len(items) - len(inserted))
+    return jsonify({"inserted": len(inserted), "failed": len(items) - len(inserted), "results": results})
+
 from dotenv import load_dotenv
-import PyPDF2
-import requests
+import tempfile
+from utils.analysis import AnalysisJobs, QueueFull
+from utils.pdf_text import extract_text_from_pdf
+from utils.llm_client import LLMClient, LLMError
+from utils.chat_store import (RoomCache, MessageWriter, RecentMessages, fetch_history,
+                              HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+from utils.chat_service import ChatService, analysis_update, finished_analysis
+from utils.presence import Presence, PRESENCE_INTERVAL, presence_room, watched_uids
 load_dotenv(override=True)
 
 # 
@@ -207,33 +277,18 @@ from flask_cors import CORS
 CORS(app, resources={r"/analyze": {"origins": "*"}})
 
 API_KEY = os.getenv("GROQ_TOKEN")  # Ensure this is correctly set
-BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+# LLM_BASE_URL can point at benchmarks/stub_llm.py to test offline
+BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1/chat/completions")
 
-def extract_text_from_pdf(pdf_path):
-    with open(pdf_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-    return text
+llm_client = LLMClient(BASE_URL, API_KEY)
+register_llm_client(llm_client)
 
 # Function to chat with Groq API
 def chat_with_llama(prompt):
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-8b-8192",  # Adjust the model name if needed
-        "messages": [{"role": "user", "content": prompt}]
-    }
-    
-    response = requests.post(BASE_URL, json=data, headers=headers)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"]
-    else:
-        return f"Error: {response.status_code} - {response.json()}"
-
+    try:
+        return llm_client.chat(prompt)
+    except LLMError as e:
+        return f"Error: {e}"
 
 # Function to analyze a resume and recommend improvements based on job requirements
 def analyze_resume(resume_text, job_requirements):
@@ -252,40 +307,113 @@ def analyze_resume(resume_text, job_requirements):
     return chat_with_llama(prompt)
 
 
+# Jobs finish on pool threads. An emit from there never wakes the eventlet
+# hub, so finished jobs are queued and pushed by a task on the hub instead.
+analysis_done_queue = queue.Queue()
+ANALYSIS_PUSH_POLL = 0.05  # seconds between checks of the queue
+
+
+def notify_analysis_done(job_id, job):
+    if analysis_pusher is None:
+        return  # no socket has connected here, so nobody is watching the job
+    analysis_done_queue.put((job_id, job))
+
+
+analysis_jobs = AnalysisJobs(extract_text_from_pdf, analyze_resume, on_done=notify_analysis_done,
+                             collection=analysis_jobs_collection)
+
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    if "resume" not in request.files:
-        return jsonify({"error": "No resume file uploaded"}), 400
     if "job_requirements" not in request.form:
         return jsonify({"error": "Job requirements not provided"}), 400
-    resume_file = request.files["resume"]
     job_requirements = request.form["job_requirements"]
 
-    resume_path = "uploaded_resume.pdf"
-    resume_file.save(resume_path)
-    resume_text = extract_text_from_pdf(resume_path)
-    analysis_result = analyze_resume(resume_text, job_requirements)
+    resume_file = request.files.get("resume")
+    if not resume_file:
+        # Use the resume text extracted when the freelancer saved their profile
+        profile = profile_collection.find_one({"uid": session.get("userid")}, {"resume_text": 1})
+        if not profile or not profile.get("resume_text"):
+            return jsonify({"error": "No resume file uploaded"}), 400
+        try:
+            job_id = analysis_jobs.submit_text(profile["resume_text"], job_requirements)
+        except QueueFull as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+    # Every upload gets its own file so concurrent analyses never collide
+    fd, resume_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        resume_file.save(f)
+    try:
+        job_id = analysis_jobs.submit(resume_path, job_requirements)
+    except QueueFull as e:
+        os.remove(resume_path)
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"job_id": job_id, "status": "pending"}), 202
 
-    return jsonify({"analysis": analysis_result})
+
+@app.route("/analyze/jobs/<job_id>", methods=["GET"])
+def analysis_status(job_id):
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(dict(job, job_id=job_id))
 
 
 @app.route('/analyze', methods=['GET','POST'])
 def resumebot():
     return render_template('resumebot.html')
 
+search_index = SearchIndex()
+# Loaded and kept in sync (other workers' posts, edits, deletes) off the request path
+search_index.start(posts_collection)
+skill_embeddings = FreelancerEmbeddings(users_collection, posts_collection)
+# Built, and rebuilt, on a background thread; other workers' posts reach it by sync
+skill_embeddings.start()
+
 @app.route('/search', methods=['GET'])
 def search():
+    if "userid" not in session:
+        return redirect(url_for("login"))
     query = request.args.get('query', '').strip()
-    if not query and session['user_type']=='client':
-        return render_template('client/client_dashboard.html', posts=list(posts_collection.find({})))
-    elif not query and session['user_type']=='freelancer':
-        return render_template('freelancer/freelancer_dashboard.html', posts=list(posts_collection.find({})))
-    results = posts_collection.find({"Title": {"$regex": query, "$options": "i"}})
-    jobs = [{"Title": job["Title"], "Content": job["Content"], "Location": job["Location"], "Budget": job["Budget"]} for job in results]
+    if not query:
+        return redirect(url_for("home"))
+    page = max(request.args.get('page', 1, type=int), 1)
+    min_budget = parse_budget(request.args.get('min_budget'))
+    max_budget = parse_budget(request.args.get('max_budget'))
+    location = request.args.get('location', '').strip()
+
+    post_ids, total = search_index.search(query, page=page, per_page=SEARCH_PAGE_SIZE,
+                                          min_budget=min_budget, max_budget=max_budget, location=location)
+
+    found = {
+        str(post["_id"]): post
+        for post in posts_collection.find({"_id": {"$in": [ObjectId(pid) for pid in post_ids]}}, FEED_PROJECTION)
+    }
+    jobs = []
+    for pid in post_ids:  # keep the ranking order
+        if pid in found:
+            post = found[pid]
+            post["_id"] = pid
+            jobs.append(post)
+    attach_content_html(posts_collection, jobs)
+
+    search_info = {
+        "query": query,
+        "page": page,
+        "total": total,
+        "has_next": page * SEARCH_PAGE_SIZE < total,
+        "min_budget": request.args.get('min_budget', ''),
+        "max_budget": request.args.get('max_budget', ''),
+        "location": location,
+    }
     if session['user_type']=='client':
-        return render_template('client/client_dashboard.html', posts=jobs)
+        return render_template('client/client_dashboard.html', posts=jobs, search=search_info)
     elif session['user_type']=='freelancer':
-        return render_template('freelancer/freelancer_dashboard.html', posts=jobs)
+        return render_template('freelancer/freelancer_dashboard.html', posts=jobs, search=search_info)
+    return redirect(url_for("login"))
 
 
 
@@ -305,48 +433,70 @@ def match_post():
     if not clientpost:
         return jsonify({"message": "Post not found"}), 404
 
-    required_skills = set(skill.strip().lower() for skill in clientpost.get("Skills", []))
-    if not required_skills:
-        return jsonify({"message": "No required skills found"}), 400
-
-    print(f"Required Skills: {required_skills}")
+    top_k = parse_page_size(data.get("limit"), MATCH_TOP_K, MATCH_MAX_K)
+    if data.get("semantic"):
+        if not skill_embeddings.ready:
+            return jsonify({"message": "Semantic matching is still loading, try again shortly"}), 503
+        # Similar skills count too ("React.js" ~ "react"); approximate probes a few partitions
+        matches = [
+            {"uid": uid, "score": score, "matched": []}
+            for uid, score in skill_embeddings.match(clientpost, top_k, bool(data.get("approximate")))
+        ]
+    else:
+        if not normalize_skills(clientpost.get("Skills", [])):
+            return jsonify({"message": "No required skills found"}), 400
+        # Scores are kept up to date as posts are written, so this is one indexed read
+        matches = recommended_freelancers(matches_collection, postid, limit=top_k)
 
-    freelance_posts = list(posts_collection.find({"user_type": "freelancer"}))
+    # One batched lookup for every matched freelancer instead of one per match
+    freelancers = user_cache.get_many([row["uid"] for row in matches])
 
     matched_freelancers_list = []
     total_match_percentages = []
-
-    seen_freelancers = set()  # To prevent duplicates
-
-    for fpost in freelance_posts:
-        freelancer_skills = set(skill.strip().lower() for skill in fpost.get("Skills_required", []))
-        matched_skills = freelancer_skills & required_skills
-
-        if matched_skills:
-            freelancer_id = str(fpost["UID"])
-
-            if freelancer_id not in seen_freelancers:  # Prevent duplicates
-                seen_freelancers.add(freelancer_id)
-                match_percent = round((len(matched_skills) / len(required_skills)) * 100, 2)
-                total_match_percentages.append(match_percent)
-
-                freelancer = users_collection.find_one({"_id": ObjectId(freelancer_id)})
-                if freelancer:
-                    matched_freelancers_list.append({
-                        "freelancer_id": freelancer_id,
-                        "name": freelancer.get("username", "Unknown"),
-                        "email": freelancer.get("email", "None"),
-                        "skills": list(freelancer_skills),
-                        "match_percent": match_percent  # Include percentage
-                    })
+    for row in matches:
+        freelancer = freelancers.get(row["uid"])
+        if not freelancer:
+            continue
+        match_percent = round(row["score"] * 100, 2)
+        total_match_percentages.append(match_percent)
+        matched_freelancers_list.append({
+            "freelancer_id": row["uid"],
+            "name": freelancer.get("username", "Unknown"),
+            "email": freelancer.get("email", "None"),
+            "skills": freelancer.get("skills", row["matched"]),
+            "match_percent": match_percent  # Include percentage
+        })
 
     avg_match_percent = round(sum(total_match_percentages) / len(total_match_percentages), 2) if total_match_percentages else 0
 
-    print(f"Matched Freelancers: {matched_freelancers_list}")
+    log_event("match", post_id=postid, semantic=bool(data.get("semantic")), matches=len(matched_freelancers_list))
 
     return jsonify({"matched_freelancers": matched_freelancers_list, "avg_match_percent": avg_match_percent})
 
 
+@app.route("/home/recommended_jobs")
+def recommended_jobs_for_freelancer():
+    if "userid" not in session or session["user_type"].lower() != "freelancer":
+        return jsonify({"message": "Unauthorized"}), 401
+    limit = parse_page_size(request.args.get("limit"))
+    rows = recommended_jobs(matches_collection, session["userid"], limit=limit)
+    posts = {
+        str(post["_id"]): post
+        for post in posts_collection.find({"_id": {"$in": [ObjectId(row["post_id"]) for row in rows]}}, FEED_PROJECTION)
+    }
+    jobs = []
+    for row in rows:
+        post = posts.get(row["post_id"])
+        if not post:
+            continue
+        post["_id"] = row["post_id"]
+        post["match_percent"] = round(row["score"] * 100, 2)
+        post["matched_skills"] = row["matched"]
+        jobs.append(post)
+    attach_content_html(posts_collection, jobs)
+    return jsonify({"jobs": jobs})
+
+
 @app.route("/home/myposts")
 def my_posts():
     if "userid" not in session or session["user_type"].lower() != "client":
@@ -364,7 +514,33 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["ALLOWED_EXTENSIONS"] = ALLOWED_EXTENSIONS
 @app.route("/home/uploads/<path:filename>")
 def uploaded_file(filename):
+    # Profile pictures saved before the blob store existed
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+@app.route("/media/<key>")
+def media(key):
+    return send_blob(blob_store, key, request.args.get("name"))
+
+@app.route("/media/<key>/<size>")
+def media_thumbnail(key, size):
+    if size not in THUMBNAIL_SIZES:
+        return "Unknown size", 404
+    variant_key = thumbnailer.variant(key, size)
+    if not variant_key:
+        # Not generated yet; this redirect is not cached, so the next view gets the thumbnail
+        return redirect(url_for("media", key=key))
+    return send_blob(blob_store, variant_key)
+
+@app.template_global()
+def thumb_url(key, size="small"):
+    return url_for("media_thumbnail", key=key, size=size)
+
+@app.template_filter()
+def image_attachments(media):
+    return [
+        item for item in media or []
+        if isinstance(item, dict) and item.get("filename", "").lower().endswith((".png", ".jpg", ".jpeg"))
+    ]
 @app.route("/home/profile/client/<userid>", methods=["GET", "POST"])
 def client_profile(userid):
     if "userid" not in session:
@@ -374,7 +550,6 @@ def client_profile(userid):
         return redirect(url_for("client_profile", userid=session['userid']))
 
     client_data = profile_collection.find_one({"uid": userid})
-    user = users_collection.find_one({"_id": ObjectId(userid)})  # Ensure ObjectId is used
 
     if request.method == "POST":
         profile_pic = request.files.get("profile_pic")
@@ -393,19 +568,21 @@ def client_profile(userid):
         }
 
         if profile_pic:
-            profile_pic_path = save_profile_picture(profile_pic, userid, session['user_type'])
-            if profile_pic_path:
-                update_data["profile_pic"] = profile_pic_path  
+            profile_pic_key = save_profile_picture(profile_pic, client_data)
+            if profile_pic_key:
+                update_data["profile_pic_key"] = profile_pic_key
 
         if client_data:
             profile_collection.update_one({"uid": userid}, {"$set": update_data})
         else:
             profile_collection.insert_one(update_data)
 
-        users_collection.update_one(
-            {"_id": ObjectId(userid)},
-            {"$set": {"profile_url": f"localhost:5000/home/profile/client/{userid}"}}
-        )
+        user_update = {"profile_url": f"localhost:5000/home/profile/client/{userid}"}
+        if "profile_pic_key" in update_data:
+            # Kept on the user too, so lists of users can show avatars from the user cache
+            user_update["profile_pic_key"] = update_data["profile_pic_key"]
+        users_collection.update_one({"_id": ObjectId(userid)}, {"$set": user_update})
+        user_cache.invalidate(userid)
         return redirect(url_for("client_profile", userid=userid))
 
     client_data = profile_collection.find_one({"uid": userid})
@@ -421,11 +598,12 @@ def freelancer_profile(userid):
         return redirect(url_for("freelancer_profile", userid=session['userid']))  
     
     client_data = profile_collection.find_one({"uid": userid})
-    print(userid)
 
     if request.method == "POST":
         profile_pic = request.files.get("profile_pic")
         resume = request.files.get("resume")  # Get resume file
+        if resume and not allowed_resume(resume.filename):
+            return jsonify({"message": "Resume must be a PDF or DOCX file"}), 400
         name = request.form.get("name")
         work_experience = request.form.get("work_experience")
         education = request.form.get("education")
@@ -442,78 +620,62 @@ def freelancer_profile(userid):
         }
 
         if profile_pic:
-            profile_pic_path = save_profile_picture(profile_pic, userid, session['user_type'])
-            if profile_pic_path:
-                update_data["profile_pic"] = profile_pic_path
+            profile_pic_key = save_profile_picture(profile_pic, client_data)
+            if profile_pic_key:
+                update_data["profile_pic_key"] = profile_pic_key
 
         # Handle Resume File
-        upload_dir = f"freelance_uploads/{userid}"
-        os.makedirs(upload_dir, exist_ok=True)
-
-        files = glob.glob(os.path.join(upload_dir, '*'))
-        for file in files:
-            if os.path.isfile(file):
-                os.remove(file)
-
         if resume:
-            resume_path = os.path.join(upload_dir, resume.filename)
-            resume.save(resume_path)
-            update_data["resume"] = resume_path
-
-        print(f"Profile picture path: {profile_pic_path if profile_pic else 'No change'}")
-        print(f"Resume saved at: {resume_path if resume else 'No change'}")
+            resume_key = blob_store.put(resume.stream, resume.filename)
+            update_data["resume_key"] = resume_key
+            update_data["resume_filename"] = secure_filename(resume.filename)
+            if client_data:
+                blob_store.release(client_data.get("resume_key"))
+            # Parse once here so analysis and matching never re-read the PDF
+            if resume.filename.lower().endswith(".pdf"):
+                try:
+                    with blob_store.local_path(resume_key) as resume_path:
+                        update_data["resume_text"] = extract_text_from_pdf(resume_path)
+                except Exception as e:
+                    log_event("resume_text_failed", logging.WARNING, user_id=userid, key=resume_key, error=e)
 
         # Update or insert profile data
+        user_update = {}
         if client_data:
             profile_collection.update_one({"uid": userid}, {"$set": update_data})
         else:
             profile_collection.insert_one(update_data)
-            curruser = users_collection.find_one({"uid": userid})
-            if curruser:
-                users_collection.update_one(
-                    {"uid": userid},
-                    {"$set": {"profile_url": f"localhost:5000/home/profile/freelance/{userid}"}}
-                )
+            user_update["profile_url"] = f"localhost:5000/home/profile/freelance/{userid}"
+        if "profile_pic_key" in update_data:
+            user_update["profile_pic_key"] = update_data["profile_pic_key"]
+        if user_update:
+            users_collection.update_one({"_id": ObjectId(userid)}, {"$set": user_update})
+            user_cache.invalidate(userid)
 
         return redirect(url_for("freelancer_profile", userid=userid))  
 
     client_data = profile_collection.find_one({"uid": userid})
-    print(f"Client data: {client_data}")
     return render_template("freelancer/profile.html", client=client_data, userid=userid)
 
 # Helper Functions
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in app.config["ALLOWED_EXTENSIONS"]
 
-def save_profile_picture(profile_pic, userid, user_type):
+def save_profile_picture(profile_pic, profile_data):
+    """Store a new profile picture and release the one it replaces; returns the blob key."""
     try:
-        if user_type == "client":
-            upload_folder = os.path.join(app.config['UPLOAD_FOLDER'], "clientpfp")
-        else:
-            upload_folder = os.path.join(app.config['UPLOAD_FOLDER'], "freelancepfp")
-        os.makedirs(upload_folder, exist_ok=True)
-        for filename in os.listdir(upload_folder):
-            if filename.startswith(f"profile_{userid}"):
-                file_path = os.path.join(upload_folder, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-
-        # Save the new profile picture
         if not allowed_file(profile_pic.filename):
             return None
-        file_ext = os.path.splitext(profile_pic.filename)[1].lower()
-        filename = f"profile_{userid}{file_ext}"
-        save_path = os.path.join(upload_folder, filename)
-        profile_pic.save(save_path)
-
-        # Return the relative path
-        return os.path.relpath(save_path, app.config['UPLOAD_FOLDER'])
+        key = blob_store.put(profile_pic.stream, profile_pic.filename)
+        thumbnailer.submit(key)
+        if profile_data:
+            blob_store.release(profile_data.get("profile_pic_key"))
+        return key
     except Exception as e:
-        print(f"Error saving profile picture: {e}")
+        log_event("profile_picture_failed", logging.ERROR, exc_info=True, error=e)
         return None
 
 
-FREE_UPLOAD_FOLDER = "freelance_uploads"
 from flask import Flask, request, redirect, url_for, render_template, jsonify
 from werkzeug.utils import secure_filename
 import os
@@ -521,57 +683,28 @@ from bson import json_util
 
 @app.route("/home/freelanceposts", methods=["GET", "POST"])
 def freelance_posts():
-    print("Request method:", request.method)
-    
     if "userid" in session and session["user_type"].lower() == "freelancer":
         if request.method == "POST":
-            
-            title = request.form.get("title")
-            description = request.form.get("description")
-            category = request.form.get("category")
-            location = request.form.get("location")
-            budget = request.form.get("budget")
-            delivery_time = request.form.get("delivery_time")
-            skills_required = request.form.get("skills_required")
-            documents = request.files.getlist("documents")
-            post_data = {
-                "Title": title,
-                "Content": description,
-                "Category": category,
-                "Location": location,
-                "Budget": budget,
-                "Delivery_time": delivery_time,
-                "Skills_required": skills_required.split(",") if skills_required else [],
-                "Multimedia": [],
-                "Comments": [],
-                "UID": session["userid"],
-                "user_type": session["user_type"]
-            }
-
-            # Insert post into the collection
-            inserted_post = posts_collection.insert_one(post_data)
-            post_id = str(inserted_post.inserted_id)
-
-            # Create directories
-            user_folder = os.path.join(app.config["FREE_UPLOAD_FOLDER"], f"freelancer_{session['userid']}")
-            post_folder = os.path.join(user_folder, "posts", post_id, "multimedia")
-            os.makedirs(post_folder, exist_ok=True)
-
-            # Handle file uploads
-            for doc in documents:
-                if doc and allowed_file(doc.filename):
-                    filename = secure_filename(doc.filename)
-                    file_path = os.path.join(post_folder, filename)
-                    doc.save(file_path)
-                    post_data["Multimedia"].append(filename)  
-            posts_collection.update_one({"_id": inserted_post.inserted_id}, {"$set": post_data})
-            print("Post stored in collection!")
+            documents = [doc for doc in request.files.getlist("documents") if doc and allowed_attachment(doc.filename)]
+            post_data = create_post(posts_collection, blob_store, freelancer_post(request.form, session["userid"]), documents)
+            for attachment in post_data["Multimedia"]:
+                thumbnailer.submit(attachment["key"])
+            skills = normalize_skills(post_data["Skills_required"])
+            known = users_collection.find_one({"_id": ObjectId(session["userid"])}, {"skills": 1}) or {}
+            known = set(known.get("skills", []))
+            index_freelancer_skills(skill_index_collection, users_collection, session["userid"], skills)
+            refresh_freelancer_matches(matches_collection, posts_collection, session["userid"], known | skills, skills - known)
+            skill_embeddings.refresh(session["userid"])
+            user_cache.invalidate(session["userid"])
+            search_index.add_post(post_data)
+            log_event("post_created", post_id=str(post_data["_id"]), user_type="freelancer",
+                      attachments=len(post_data["Multimedia"]))
             return redirect(url_for("home"))
 
-       
-        posts = list(posts_collection.find({}))  # Show all posts
 
-        return render_template("freelancer/freelancer_dashboard.html", posts=posts)
+        posts, next_cursor = fetch_feed_page(posts_collection)
+
+        return render_template("freelancer/freelancer_dashboard.html", posts=posts, next_cursor=next_cursor)
    
     return redirect(url_for("login"))
 
@@ -582,8 +715,9 @@ def freelance_posts():
 def client_chatroom():
     if "userid" not in session:
         return redirect(url_for("login"))
-    clients = users_collection.find({"user_type": "client"}) 
-    return render_template("freelancer/clients.html", clients=clients)
+    clients = list(users_collection.find({"user_type": "client"}, {"username": 1, "email": 1, "profile_pic_key": 1}))
+    online = presence.online(client["_id"] for client in clients)
+    return render_template("freelancer/clients.html", clients=clients, online=online)
 
 
 
@@ -592,32 +726,82 @@ def client_chatroom():
 def home_clients():
     if "userid" not in session:
         return redirect(url_for("login"))
-    user = users_collection.find_one({"_id": ObjectId(session["userid"]), "user_type":"client"})
-    if user and "chatrooms" in user:
-        chatrooms = user["chatrooms"]
+    user = user_cache.get(session["userid"])
+    if user and user.get("user_type") == "client" and "chatrooms" in user:
+        rooms = [room_cache.get(room_id) for room_id in user["chatrooms"]]
+        rooms = [room for room in rooms if room]
+        others = user_cache.get_many([room["freelancer_id"] for room in rooms])
+        chatrooms = [
+            {"room_id": room["room_id"], "uid": str(room["freelancer_id"]), "other": others.get(str(room["freelancer_id"]))}
+            for room in rooms
+        ]
     else:
         chatrooms = []
 
-    return render_template("client/chatroom.html", chatrooms=chatrooms)
+    online = presence.online(room["uid"] for room in chatrooms)
+    return render_template("client/chatroom.html", chatrooms=chatrooms, online=online)
 
 
 
 from flask import Flask, render_template, session, request, redirect, url_for
-from flask_socketio import SocketIO, send, emit, join_room, leave_room
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms as socket_rooms
+from utils.socket_queue import socketio_queue_options
+
+# SOCKETIO_MESSAGE_QUEUE lets several workers share rooms, e.g.
+# local://127.0.0.1:6390 (python -m utils.local_broker) or redis://localhost:6379/0
+socketio = SocketIO(app, **socketio_queue_options(os.getenv("SOCKETIO_MESSAGE_QUEUE")))
+
+
+room_cache = RoomCache(chatroom_collection)
+message_writer = MessageWriter(messages_collection)
+recent_messages = RecentMessages(messages_collection)
+chat_service = ChatService(message_writer, recent_messages)
+presence = Presence()
+presence.attach(socketio.server.manager)
+presence_flusher = None
+analysis_pusher = None
+
+
+def flush_presence():
+    while True:
+        socketio.sleep(PRESENCE_INTERVAL)
+        try:
+            for event, payload, room in presence.flush():
+                socketio.emit(event, payload, to=room)
+        except Exception as e:
+            log_event("presence_flush_failed", logging.ERROR, error=e)
+
+
+def push_analysis_results():
+    while True:
+        try:
+            job_id, job = analysis_done_queue.get_nowait()
+        except queue.Empty:
+            socketio.sleep(ANALYSIS_PUSH_POLL)
+            continue
+        try:
+            socketio.emit("analysis_done", analysis_update(job_id, job), to=job_id)
+        except Exception as e:
+            log_event("analysis_push_failed", logging.ERROR, job_id=job_id, error=e)
+
+
+def start_background_tasks():
+    # Started by the first connection, so importing main (as asgi.py does) starts nothing
+    global presence_flusher, analysis_pusher
+    if presence_flusher is None:
+        presence_flusher = socketio.start_background_task(flush_presence)
+    if analysis_pusher is None:
+        analysis_pusher = socketio.start_background_task(push_analysis_results)
 
-socketio = SocketIO(app)
 
-
-chatroom_collection = db['chatroom']
 @app.route("/start_chat", methods=["POST"])
 def start_chat():
     if "userid" in session:
         freelancer_id = session["userid"]  # ID of the freelancer
-        client = users_collection.find_one({"username":request.form.get("other_user_id")})
-        print(client)
-        client_id = str(client.get("_id")) # ID of the client
-
-        print(f"Freelancer ID: {freelancer_id}, Client ID: {client_id}")  # Debugging line
+        client = user_cache.get(request.form.get("other_user_id"))
+        if not client:
+            return "Error: User not found", 404
+        client_id = str(client["_id"]) # ID of the client
 
         if freelancer_id == client_id:
             return "Error: Freelancer and client cannot be the same user!", 400  # Prevent self-chat
@@ -634,15 +818,17 @@ def start_chat():
             {"_id": ObjectId(client_id)},
             {"$addToSet": {"chatrooms": room_id}}  
         )
+        user_cache.invalidate(freelancer_id)
+        user_cache.invalidate(client_id)
 
-        # Initialize the chatroom in the collection
-        chatroom_collection.insert_one({
+        # Initialize the chatroom in the collection; messages live in messages_collection
+        room = {
             "room_id": room_id,
             "client_id": client_id,
             "freelancer_id": freelancer_id,
-            "client_msg": [],
-            "freelancer_msg": []
-        })
+        }
+        chatroom_collection.insert_one(dict(room))
+        room_cache.put(room)
 
         return redirect(url_for("chat", room_id=room_id))
     return redirect(url_for("login"))
@@ -651,59 +837,84 @@ def start_chat():
 def chat(room_id):
     if "userid" in session:
         session["room_id"] = room_id
-        return render_template("chat.html", room_id=room_id)
+        return render_template("chat.html", room_id=room_id, username=session.get("username"))
     return redirect(url_for("login"))
 
+@app.route("/chat/<room_id>/history")
+def chat_history(room_id):
+    if "userid" not in session:
+        return jsonify({"message": "Unauthorized"}), 401
+    room = room_cache.get(room_id)
+    if not room or session["userid"] not in (room.get("client_id"), room.get("freelancer_id")):
+        return jsonify({"message": "Chat room not found"}), 404
+
+    limit = parse_page_size(request.args.get("limit"), HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+    before = request.args.get("before", type=int)
+    if before is None:
+        # The latest page is what every chat opens with; serve it from memory
+        messages, next_before = recent_messages.latest(room_id, limit)
+    else:
+        messages, next_before = fetch_history(messages_collection, room_id, before, limit)
+    return jsonify({"messages": messages, "next_before": next_before})
+
+@socketio.on("connect")
+def handle_connect():
+    start_background_tasks()
+    presence.connect(request.sid, session.get("userid"))
+
+@socketio.on("disconnect")
+def handle_disconnect(reason=None):
+    presence.disconnect(request.sid)
+
 @socketio.on("join")
+@timed_event("join")
 def handle_join(data):
     room = data["room"]
+    if room in socket_rooms():
+        return
     join_room(room)
-    send(f"{session.get('username')} has joined the chat.", to=room)
+    # Reported with the room's next activity batch instead of a message per join
+    presence.room_change(room, session.get("username"), "joined")
 
 @socketio.on("message")
+@timed_event("message")
 def handle_message(data):
     room = data["room"]
-    message = data["message"]
-    sender = session.get("username")
-    timestamp = datetime.now().strftime("%H:%M")
-    
-    # Store message in the chatroom collection under the correct room
-    if room:
-        chatroom = chatroom_collection.find_one({"room_id": room})
-        if chatroom:
-            if sender == session.get("username"):  # Check if message sender is the logged in user
-                if sender == chatroom["freelancer_id"]:
-                    # Save message to freelancer's message array
-                    chatroom_collection.update_one(
-                        {"room_id": room},
-                        {"$push": {"freelancer_msg": {"sender": sender, "message": message, "timestamp": timestamp}}}
-                    )
-                else:
-                    # Save message to client's message array
-                    chatroom_collection.update_one(
-                        {"room_id": room},
-                        {"$push": {"client_msg": {"sender": sender, "message": message, "timestamp": timestamp}}}
-                    )
-            else:
-                # Assuming the other user is the client
-                if sender == chatroom["freelancer_id"]:
-                    chatroom_collection.update_one(
-                        {"room_id": room},
-                        {"$push": {"freelancer_msg": {"sender": sender, "message": message, "timestamp": timestamp}}}
-                    )
-                else:
-                    chatroom_collection.update_one(
-                        {"room_id": room},
-                        {"$push": {"client_msg": {"sender": sender, "message": message, "timestamp": timestamp}}}
-                    )
-
-            emit("message", {"sender": sender, "message": message, "timestamp": timestamp}, to=room)
+    # Room metadata comes from the in-process cache; the write is queued and
+    # flushed in batches, so nothing here waits on Mongo
+    room_meta = room_cache.get(room) if room else None
+    if room_meta:
+        emit("message", chat_service.post(room_meta, session.get("username"), session.get("userid"), data["message"]), to=room)
+        presence.typing(room, session.get("username"), False)
+
+@socketio.on("typing")
+@timed_event("typing")
+def handle_typing(data):
+    presence.typing(data.get("room"), session.get("username"), bool(data.get("typing", True)))
+
+@socketio.on("watch_presence")
+@timed_event("watch_presence")
+def handle_watch_presence(data):
+    """Subscribe to online/offline changes of ``uids``; acks with which of them are online now."""
+    uids = watched_uids(data.get("uids"))
+    for uid in uids:
+        join_room(presence_room(uid))
+    return sorted(presence.online(uids))
+
+@socketio.on("watch_analysis")
+@timed_event("watch_analysis")
+def handle_watch_analysis(data):
+    join_room(data["job_id"])
+    update = finished_analysis(analysis_jobs, data["job_id"])
+    if update:
+        emit("analysis_done", update)
 
 @socketio.on("leave")
+@timed_event("leave")
 def handle_leave(data):
     room = data["room"]
     leave_room(room)
-    send(f"{session.get('username')} has left the chat.", to=room)
+    presence.room_change(room, session.get("username"), "left")
 
 @app.route("/logout")
 def logout():
@@ -711,5 +922,6 @@ def logout():
     return redirect(url_for("landingpage"))
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # app.run() would block before Socket.IO ever started; socketio.run serves both.
+    # For the asyncio server see asgi.py
     socketio.run(app, debug=True)
\ No newline at end of file
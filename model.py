@@ -1,40 +1,23 @@
 import os
-import requests
 from dotenv import load_dotenv
-import PyPDF2
+from utils.pdf_text import extract_text_from_pdf
+from utils.llm_client import LLMClient, LLMError
 
 # Load environment variables
 load_dotenv(override=True)
 
 # Groq API configuration
 API_KEY = os.getenv("GROQ_TOKEN")  # Ensure this is correctly set
-BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1/chat/completions")
 
-# Function to extract text from a PDF resume
-def extract_text_from_pdf(pdf_path):
-    with open(pdf_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-    return text
+llm_client = LLMClient(BASE_URL, API_KEY)
 
 # Function to chat with Groq API
 def chat_with_llama(prompt):
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "llama3-8b-8192",  # Adjust the model name if needed
-        "messages": [{"role": "user", "content": prompt}]
-    }
-    
-    response = requests.post(BASE_URL, json=data, headers=headers)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"]
-    else:
-        return f"Error: {response.status_code} - {response.json()}"
+    try:
+        return llm_client.chat(prompt)
+    except LLMError as e:
+        return f"Error: {e}"
 
 # Function to analyze a resume
 def analyze_resume(resume_text):
@@ -0,0 +1,81 @@
+"""MessageWriter: seqs unique across workers and failed flushes retried with the emitted seq.
+
+    python -m pytest tests
+"""
+import unittest
+from unittest import mock
+
+from pymongo import ASCENDING
+from pymongo.errors import AutoReconnect
+
+from utils import chat_store
+from utils.chat_store import MessageWriter
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+class FlakyCollection:
+    """Passes writes through to ``collection`` after raising ``failures`` first."""
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.database = collection.database
+        self.failures = list(failures)
+
+    def insert_many(self, docs, ordered=True):
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure == "after_write":
+                self.collection.insert_many([dict(doc) for doc in docs], ordered=ordered)
+                raise AutoReconnect("connection lost after the write")
+            raise failure
+        return self.collection.insert_many(docs, ordered=ordered)
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+@mock.patch.object(chat_store, "FLUSH_RETRY_DELAY", 0)
+class MessageWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.messages = mongomock.MongoClient().db.messages
+        self.messages.create_index([("room_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+
+    def doc(self, writer, message="hi"):
+        return {"room_id": "r1", "seq": writer.next_seq(), "sender": "a", "sender_id": "1",
+                "message": message, "timestamp": "10:00"}
+
+    def stored(self):
+        return [(doc["seq"], doc["message"]) for doc in self.messages.find({}, {"_id": 0}).sort("seq", 1)]
+
+    def test_writers_never_share_a_seq(self):
+        first, second = MessageWriter(self.messages), MessageWriter(self.messages)
+        self.assertNotEqual(first.writer_id, second.writer_id)
+        seqs = [first.next_seq() for _ in range(500)] + [second.next_seq() for _ in range(500)]
+        self.assertEqual(len(set(seqs)), len(seqs))
+        self.assertLess(max(seqs), 2 ** 53)  # exact as a JavaScript number
+
+    def test_failed_write_is_retried_with_the_emitted_seq(self):
+        writer = MessageWriter(FlakyCollection(self.messages, [AutoReconnect("down"), AutoReconnect("down")]))
+        batch = [self.doc(writer, "one"), self.doc(writer, "two")]
+        writer._flush(batch)
+        self.assertEqual(self.stored(), [(doc["seq"], doc["message"]) for doc in batch])
+
+    def test_retry_after_a_partial_write_stores_each_message_once(self):
+        writer = MessageWriter(FlakyCollection(self.messages, ["after_write"]))
+        batch = [self.doc(writer, "one")]
+        writer._flush(batch)
+        self.assertEqual(self.stored(), [(batch[0]["seq"], "one")])
+
+    def test_gives_up_after_the_retries(self):
+        writer = MessageWriter(FlakyCollection(self.messages, [AutoReconnect("down")] * 10))
+        with mock.patch.object(chat_store, "log_event") as log_event:
+            writer._flush([self.doc(writer)])
+        self.assertEqual(self.stored(), [])
+        self.assertEqual(log_event.call_args_list[-1].args[0], "chat_flush_failed")
+        self.assertEqual(log_event.call_count, chat_store.FLUSH_RETRIES + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""FreelancerEmbeddings kept in sync with posts written by other workers.
+
+    python -m pytest tests
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from utils.embeddings import FreelancerEmbeddings
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class EmbeddingsSyncTest(unittest.TestCase):
+    def setUp(self):
+        db = mongomock.MongoClient().db
+        self.users, self.posts = db.users, db.posts
+        self.stamp = datetime(2026, 1, 1)
+
+    def freelancer(self, skills, title):
+        uid = self.users.insert_one({"user_type": "freelancer", "skills": skills}).inserted_id
+        self.stamp += timedelta(seconds=1)
+        self.posts.insert_one({"_id": ObjectId(), "UID": str(uid), "user_type": "freelancer",
+                               "Title": title, "updated_at": self.stamp})
+        return str(uid)
+
+    def test_not_ready_until_built(self):
+        embeddings = FreelancerEmbeddings(self.users, self.posts)
+        self.assertFalse(embeddings.ready)
+        self.assertEqual(embeddings.match({"Skills": ["python"]}), [])
+        embeddings.sync()
+        self.assertTrue(embeddings.ready)
+
+    def test_sync_picks_up_another_workers_post(self):
+        self.freelancer(["python"], "Django developer")
+        embeddings = FreelancerEmbeddings(self.users, self.posts)
+        embeddings.sync()
+        other = self.freelancer(["golang"], "Go services")  # written on another worker
+        self.assertNotIn(other, [uid for uid, _ in embeddings.match({"Skills": ["golang"]})])
+        embeddings.sync()
+        self.assertEqual(embeddings.match({"Skills": ["golang"]})[0][0], other)
+
+    def test_rebuild_drops_removed_freelancers(self):
+        gone = self.freelancer(["rust"], "Rust tooling")
+        embeddings = FreelancerEmbeddings(self.users, self.posts, rebuild_interval=0)
+        embeddings.sync()
+        self.assertEqual(embeddings.match({"Skills": ["rust"]})[0][0], gone)
+        self.users.delete_one({"_id": ObjectId(gone)})
+        embeddings.sync()
+        self.assertEqual(embeddings.match({"Skills": ["rust"]}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
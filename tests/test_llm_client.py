@@ -0,0 +1,158 @@
+"""LLMClient against the local stub endpoint: retries, backoff, the in-flight cap and coalescing.
+
+    python -m pytest tests
+"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from benchmarks.stub_llm import StubLLMHandler, queue_replies, start_stub
+from utils import metrics
+from utils.llm_client import LLMClient, LLMError
+
+NO_WAIT = {"Retry-After": "0"}
+
+
+def wait_for_calls(count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while StubLLMHandler.calls < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def run_threads(target, count):
+    """Call ``target(i)`` on ``count`` threads; returns ``{i: result or exception}``."""
+    results = {}
+
+    def run(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+class StubTestCase(unittest.TestCase):
+    delay = 0.0
+
+    def setUp(self):
+        self.server, self.url = start_stub(delay=self.delay)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("max_retries", 2)
+        return LLMClient(self.url, "test-key", timeout=(2, 5), **kwargs)
+
+
+class LLMClientTest(StubTestCase):
+    def test_reply_is_cached(self):
+        client = self.client()
+        first = client.chat("hello")
+        self.assertEqual(first, "Stub analysis of 5 characters.")
+        self.assertEqual(client.chat("hello"), first)
+        self.assertEqual(StubLLMHandler.calls, 1)
+        self.assertEqual(client.metrics()["cache_hits"], 1)
+
+    def test_retries_retryable_statuses(self):
+        queue_replies((429, {"error": "slow down"}, NO_WAIT), (503, {"error": "busy"}, NO_WAIT))
+        client = self.client()
+        self.assertEqual(client.chat("retry me"), "Stub analysis of 8 characters.")
+        self.assertEqual(StubLLMHandler.calls, 3)
+        self.assertEqual(client.metrics()["retries"], 2)
+
+    def test_gives_up_after_max_retries(self):
+        queue_replies(*[(500, {"error": "down"}, NO_WAIT)] * 3)
+        client = self.client(max_retries=2)
+        with self.assertRaisesRegex(LLMError, "500"):
+            client.chat("never")
+        self.assertEqual(StubLLMHandler.calls, 3)
+        self.assertEqual(client.metrics()["errors"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        queue_replies((400, {"error": "bad request"}))
+        with self.assertRaisesRegex(LLMError, "400"):
+            self.client().chat("bad")
+        self.assertEqual(StubLLMHandler.calls, 1)
+
+    def test_malformed_reply_raises_llm_error(self):
+        queue_replies((200, {"unexpected": True}), (200, "not json"))
+        client = self.client()
+        with self.assertRaisesRegex(LLMError, "Malformed response"):
+            client.chat("first")
+        with self.assertRaisesRegex(LLMError, "Malformed response"):
+            client.chat("second")
+
+    def test_metrics_are_exported(self):
+        client = self.client()
+        client.chat("hello")
+        client.chat("hello")
+        with mock.patch.object(metrics, "METRICS", []):
+            metrics.register_llm_client(client)
+            lines = [line for metric in metrics.METRICS for line in metric.render()]
+        self.assertIn('llm_client_calls_total{event="requests"} 2', lines)
+        self.assertIn('llm_client_calls_total{event="cache_hits"} 1', lines)
+        self.assertEqual(len([line for line in lines if line.startswith("llm_upstream_latency_seconds{")]), 3)
+
+    def test_backoff(self):
+        for attempt in range(6):
+            for _ in range(50):
+                self.assertTrue(0 <= LLMClient._backoff(attempt) <= min(20.0, 0.5 * 2 ** attempt))
+        self.assertEqual(LLMClient._backoff(0, "3"), 3.0)
+        self.assertEqual(LLMClient._backoff(0, "120"), 20.0)
+        self.assertLessEqual(LLMClient._backoff(1, "soon"), 1.0)
+
+
+class ConcurrencyTest(StubTestCase):
+    delay = 0.3
+
+    def test_in_flight_cap(self):
+        client = self.client(max_in_flight=2)
+        results = run_threads(lambda i: client.chat(f"prompt {i}"), 6)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(isinstance(result, str) for result in results.values()))
+        self.assertEqual(StubLLMHandler.calls, 6)
+        self.assertEqual(StubLLMHandler.peak_active, 2)
+
+    def test_identical_prompts_share_one_call(self):
+        client = self.client()
+        leader = threading.Thread(target=client.chat, args=("same",))
+        leader.start()
+        wait_for_calls(1)
+        results = run_threads(lambda i: client.chat("same"), 4)
+        leader.join(5)
+        self.assertEqual(StubLLMHandler.calls, 1)
+        self.assertEqual(set(results.values()), {"Stub analysis of 4 characters."})
+        self.assertEqual(client.metrics()["coalesced"], 4)
+
+    def test_coalesced_callers_see_the_leader_failure(self):
+        queue_replies((200, {"choices": []}))
+        client = self.client()
+        errors = []
+
+        def lead():
+            try:
+                client.chat("same")
+            except LLMError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        wait_for_calls(1)
+        results = run_threads(lambda i: client.chat("same"), 3)
+        leader.join(5)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(StubLLMHandler.calls, 1)
+        self.assertTrue(all(isinstance(result, LLMError) for result in results.values()), results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Match table: rows written as posts and freelancer skills change, and the two recommendation reads.
+
+    python -m pytest tests
+"""
+import unittest
+
+from bson import ObjectId
+
+from utils.match_table import (rebuild_match_table, recommended_freelancers, recommended_jobs,
+                               refresh_freelancer_matches, refresh_post_matches)
+from utils.schema import apply_indexes
+from utils.skill_index import index_freelancer_skills, normalize_skills
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class MatchTableTest(unittest.TestCase):
+    def setUp(self):
+        db = mongomock.MongoClient().db
+        apply_indexes(db)
+        self.db = db
+
+    def freelancer(self, skills):
+        name = f"f{self.db.users.count_documents({})}"
+        uid = str(self.db.users.insert_one({"username": name, "email": f"{name}@example.com",
+                                            "user_type": "freelancer"}).inserted_id)
+        index_freelancer_skills(self.db.skill_index, self.db.users, uid, skills)
+        return uid
+
+    def client_post(self, skills):
+        post = {"_id": ObjectId(), "UID": "c1", "user_type": "client", "Skills": skills,
+                "skill_keys": sorted(normalize_skills(skills))}
+        self.db.posts.insert_one(post)
+        refresh_post_matches(self.db.matches, self.db.skill_index, post)
+        return post
+
+    def test_new_post_ranks_freelancers_by_skill_overlap(self):
+        both, one = self.freelancer(["Python", "Flask"]), self.freelancer(["python"])
+        self.freelancer(["rust"])
+        post = self.client_post(["python", "flask"])
+        rows = recommended_freelancers(self.db.matches, str(post["_id"]))
+        self.assertEqual([(row["uid"], row["score"]) for row in rows], [(both, 1.0), (one, 0.5)])
+        self.assertEqual(rows[0]["matched"], ["flask", "python"])
+
+    def test_freelancer_gaining_a_skill_updates_only_their_rows(self):
+        uid = self.freelancer(["python"])
+        post = self.client_post(["python", "flask"])
+        other = self.client_post(["rust"])
+        index_freelancer_skills(self.db.skill_index, self.db.users, uid, ["flask"])
+        refresh_freelancer_matches(self.db.matches, self.db.posts, uid, ["python", "flask"], ["flask"])
+        jobs = recommended_jobs(self.db.matches, uid)
+        self.assertEqual([(row["post_id"], row["score"]) for row in jobs], [(str(post["_id"]), 1.0)])
+        self.assertEqual(recommended_freelancers(self.db.matches, str(other["_id"])), [])
+
+    def test_edited_post_drops_freelancers_who_no_longer_match(self):
+        uid = self.freelancer(["python"])
+        post = self.client_post(["python"])
+        post["Skills"] = ["go"]
+        refresh_post_matches(self.db.matches, self.db.skill_index, post)
+        self.assertEqual(recommended_jobs(self.db.matches, uid), [])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.freelancer(["python", "flask"])
+        self.freelancer(["flask"])
+        self.client_post(["python", "flask"])
+        self.client_post(["flask", "docker"])
+        incremental = sorted((row["post_id"], row["uid"], row["score"]) for row in self.db.matches.find())
+        rebuild_match_table(self.db.posts, self.db.skill_index, self.db.matches)
+        rebuilt = sorted((row["post_id"], row["uid"], row["score"]) for row in self.db.matches.find())
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual(len(rebuilt), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""send_blob: ranges, conditional GETs and dispositions, from disk and from an S3-style backend.
+
+    python -m pytest tests
+"""
+import io
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, request
+
+from utils.media import send_blob
+from utils.storage import BlobStore, FileSystemBackend, InMemoryS3Client, S3Backend
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+DATA = b"0123456789abcdefghij"
+
+
+def make_app(store, sendfile=""):
+    app = Flask(__name__)
+
+    @app.route("/media/<key>")
+    def media(key):
+        return send_blob(store, key, request.args.get("name"), sendfile=sendfile)
+
+    return app
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class SendBlobTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BlobStore(self.backend(), mongomock.MongoClient().db.blobs, tmp_dir=self.root)
+        self.key = self.store.put(io.BytesIO(DATA), "notes.pdf")
+        self.client = make_app(self.store).test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def backend(self):
+        return FileSystemBackend(self.root)
+
+    def get(self, headers=None, key=None, query=""):
+        return self.client.get(f"/media/{key or self.key}{query}", headers=headers or {})
+
+    def test_full_response_is_cached_forever(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, DATA)
+        self.assertEqual(response.headers["ETag"], f'"{self.key}"')
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+
+    def test_byte_range(self):
+        response = self.get({"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, DATA[2:6])
+        self.assertEqual(response.headers["Content-Range"], f"bytes 2-5/{len(DATA)}")
+
+    def test_suffix_range(self):
+        response = self.get({"Range": "bytes=-3"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, DATA[-3:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get({"Range": f"bytes={len(DATA) + 10}-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["Content-Range"], f"bytes */{len(DATA)}")
+
+    def test_if_none_match(self):
+        self.assertEqual(self.get({"If-None-Match": f'"{self.key}"'}).status_code, 304)
+
+    def test_stale_if_range_gets_the_whole_blob(self):
+        response = self.get({"Range": "bytes=2-5", "If-Range": '"something-else"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, DATA)
+
+    def test_disposition(self):
+        response = self.get(query="?name=../notes.pdf")
+        self.assertEqual(response.headers["Content-Disposition"], "inline; filename=notes.pdf")
+        self.assertEqual(response.headers["X-Content-Type-Options"], "nosniff")
+        page = self.store.put(io.BytesIO(b"<script>alert(1)</script>"), "page.html")
+        self.assertEqual(self.get(key=page).headers["Content-Disposition"], "attachment")
+
+    def test_unknown_key(self):
+        self.assertEqual(self.get(key="0" * 64).status_code, 404)
+
+
+class S3SendBlobTest(SendBlobTest):
+    def backend(self):
+        return S3Backend(InMemoryS3Client(), "bucket")
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class AccelRedirectTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BlobStore(FileSystemBackend(self.root), mongomock.MongoClient().db.blobs, tmp_dir=self.root)
+        self.key = self.store.put(io.BytesIO(DATA), "notes.pdf")
+        self.client = make_app(self.store, sendfile="x-accel").test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_nginx_serves_the_file(self):
+        response = self.client.get(f"/media/{self.key}")
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["X-Accel-Redirect"], f"/_media/{self.key[:2]}/{self.key[2:4]}/{self.key}")
+        self.assertEqual(self.client.get(f"/media/{self.key}", headers={"If-None-Match": f'"{self.key}"'}).status_code,
+                         304)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""validate_post and import_posts: per-item results, type checks and partial batch failures.
+
+    python -m pytest tests
+"""
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+
+from utils import posts
+from utils.posts import client_post, import_posts, validate_post
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+VALID = {"title": "Flask API", "description": "Build a small API", "skills_required": "python, flask"}
+
+
+class ValidatePostTest(unittest.TestCase):
+    def test_valid_posts(self):
+        self.assertIsNone(validate_post(VALID))
+        self.assertIsNone(validate_post(dict(VALID, budget=500, location="Berlin", skills_required=["python"])))
+        self.assertIsNone(validate_post(dict(VALID, budget="500-800", location=None)))
+
+    def test_rejections(self):
+        cases = [
+            ("not a dict", "Expected an object"),
+            ({"description": "x"}, "Missing title"),
+            (dict(VALID, description="   "), "Missing description"),
+            (dict(VALID, title=7), "Missing title"),
+            (dict(VALID, location=["Berlin"]), "location must be a string"),
+            (dict(VALID, budget=True), "budget must be a number or a string"),
+            (dict(VALID, budget={"min": 1}), "budget must be a number or a string"),
+            (dict(VALID, skills_required=["python", 3]), "skills_required must be a string or a list of strings"),
+            (dict(VALID, skills_required={"python": 1}), "skills_required must be a string or a list of strings"),
+        ]
+        for fields, error in cases:
+            with self.subTest(fields=fields):
+                self.assertEqual(validate_post(fields), error)
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class ImportPostsTest(unittest.TestCase):
+    def setUp(self):
+        self.posts = mongomock.MongoClient().db.posts
+
+    def build(self, item):
+        return client_post(item, "u1")
+
+    def test_results_follow_input_order(self):
+        items = [VALID, {"title": "No description"}, dict(VALID, title="Second")]
+        inserted, results = import_posts(self.posts, items, self.build)
+        self.assertEqual([result["ok"] for result in results], [True, False, True])
+        self.assertEqual(results[1], {"index": 1, "ok": False, "error": "Missing description"})
+        self.assertEqual([doc["Title"] for doc in inserted], ["Flask API", "Second"])
+        stored = self.posts.find_one({"_id": ObjectId(results[2]["post_id"])})
+        self.assertEqual((stored["Skills"], stored["skill_keys"]), (["python", " flask"], ["flask", "python"]))
+        self.assertIn("updated_at", stored)
+
+    def test_a_failed_write_only_fails_its_item(self):
+        duplicate = self.build(VALID)
+        self.posts.insert_one(dict(duplicate))
+        builds = iter([dict(duplicate), self.build(VALID)])
+        inserted, results = import_posts(self.posts, [VALID, VALID], lambda item: next(builds))
+        self.assertEqual([result["ok"] for result in results], [False, True])
+        self.assertEqual(len(inserted), 1)
+        self.assertEqual(self.posts.count_documents({}), 2)
+
+    def test_batches(self):
+        with mock.patch.object(posts, "IMPORT_BATCH", 2):
+            inserted, results = import_posts(self.posts, [dict(VALID, title=f"Post {i}") for i in range(5)],
+                                             self.build)
+        self.assertEqual(len(inserted), 5)
+        self.assertTrue(all(result["ok"] for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Presence: coalesced online/offline and room activity batches, and the sync between workers.
+
+    python -m pytest tests
+"""
+import unittest
+from unittest import mock
+
+from utils.presence import Presence, SYNC_EVENT, SYNC_ROOM, presence_room, watched_uids
+
+
+def by_event(batches, event):
+    return [(payload, room) for name, payload, room in batches if name == event]
+
+
+class RecordingManager:
+    """Stands in for an ObservedManager: ``relay`` delivers an emit to the observers."""
+
+    def __init__(self):
+        self.observers = []
+
+    def observe(self, observer):
+        self.observers.append(observer)
+
+    def relay(self, event, payload, room):
+        for observer in self.observers:
+            observer(event, payload, room)
+
+
+class PresenceFlushTest(unittest.TestCase):
+    def test_changes_go_to_each_users_room(self):
+        presence = Presence(worker_id="a")
+        presence.connect("s1", "u1")
+        presence.connect("s2", "u2")
+        self.assertEqual(by_event(presence.flush(), "presence"), [
+            ({"online": ["u1"], "offline": []}, presence_room("u1")),
+            ({"online": ["u2"], "offline": []}, presence_room("u2")),
+        ])
+        presence.disconnect("s1")
+        self.assertEqual(by_event(presence.flush(), "presence"),
+                         [({"online": [], "offline": ["u1"]}, presence_room("u1"))])
+
+    def test_reconnects_within_an_interval_are_not_announced(self):
+        presence = Presence(worker_id="a")
+        presence.connect("s1", "u1")
+        presence.flush()
+        presence.disconnect("s1")
+        presence.connect("s2", "u1")
+        self.assertEqual(by_event(presence.flush(), "presence"), [])
+
+    def test_room_activity_is_batched_per_room(self):
+        presence = Presence(worker_id="a", typing_ttl=5)
+        presence.room_change("r1", "ann", "joined")
+        presence.room_change("r1", "bob", "joined")
+        presence.room_change("r1", "bob", "left")
+        for _ in range(20):
+            presence.typing("r1", "ann")
+        activity = by_event(presence.flush(), "room_activity")
+        self.assertEqual(activity, [({"typing": ["ann"], "stopped": [], "joined": ["ann"], "left": ["bob"],
+                                      "room": "r1"}, "r1")])
+        self.assertEqual(by_event(presence.flush(), "room_activity"), [])
+        presence.typing("r1", "ann", False)
+        self.assertEqual(by_event(presence.flush(), "room_activity")[0][0]["stopped"], ["ann"])
+
+    def test_typing_expires_without_a_refresh(self):
+        presence = Presence(worker_id="a", typing_ttl=5)
+        with mock.patch("utils.presence.time.monotonic", return_value=100.0):
+            presence.typing("r1", "ann")
+            presence.flush()
+        with mock.patch("utils.presence.time.monotonic", return_value=106.0):
+            self.assertEqual(by_event(presence.flush(), "room_activity")[0][0]["stopped"], ["ann"])
+
+
+class PresenceSyncTest(unittest.TestCase):
+    def test_only_the_lowest_worker_announces(self):
+        first, second = Presence(worker_id="a"), Presence(worker_id="b")
+        manager = RecordingManager()
+        first.attach(manager)
+        second.connect("s1", "u1")
+        for event, payload, room in second.flush():
+            manager.relay(event, payload, room)
+        self.assertEqual(first.online(["u1", "u2"]), {"u1"})
+        self.assertEqual(by_event(first.flush(), "presence"), [({"online": ["u1"], "offline": []}, presence_room("u1"))])
+
+        second.apply_sync({"worker": "a", "snapshot": True, "online": []})
+        self.assertEqual(by_event(second.flush(), "presence"), [])
+
+    def test_other_events_are_ignored(self):
+        presence = Presence(worker_id="a")
+        manager = RecordingManager()
+        presence.attach(manager)
+        manager.relay(SYNC_EVENT, {"worker": "b", "online": ["u1"]}, "some-room")
+        manager.relay("message", {"worker": "b", "online": ["u1"]}, SYNC_ROOM)
+        self.assertEqual(presence.online(["u1"]), set())
+
+    def test_watched_uids(self):
+        self.assertEqual(watched_uids(["u1", "u1", 7]), ["u1", "7"])
+        self.assertEqual(watched_uids("u1"), [])
+        self.assertEqual(len(watched_uids([str(i) for i in range(1000)])), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""SearchIndex: BM25 ranking, filters, re-indexing and sync against a mongomock collection.
+
+    python -m pytest tests
+"""
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from utils.search import SearchIndex
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+def post(title, content="", budget=None, location=None, updated_at=None, _id=None):
+    doc = {"_id": _id or ObjectId(), "Title": title, "Content": content, "Budget": budget, "Location": location}
+    if updated_at is not None:
+        doc["updated_at"] = updated_at
+    return doc
+
+
+class SearchIndexTest(unittest.TestCase):
+    def test_title_hits_rank_above_content_hits(self):
+        index = SearchIndex()
+        in_content = post("Backend work", "needs a python developer")
+        in_title = post("Python developer", "backend work")
+        index.add_post(in_content)
+        index.add_post(in_title)
+        ids, total = index.search("python")
+        self.assertEqual(total, 2)
+        self.assertEqual(ids, [str(in_title["_id"]), str(in_content["_id"])])
+
+    def test_filters_and_paging(self):
+        index = SearchIndex()
+        for i in range(5):
+            index.add_post(post(f"Flask job {i}", budget=str(100 * i), location="Berlin" if i % 2 else "Paris"))
+        self.assertEqual(index.search("flask", min_budget=200)[1], 3)
+        self.assertEqual(index.search("flask", location="berlin")[1], 2)
+        first, total = index.search("flask", page=1, per_page=2)
+        second, _ = index.search("flask", page=2, per_page=2)
+        self.assertEqual(total, 5)
+        self.assertFalse(set(first) & set(second))
+
+    def test_newer_version_replaces_the_indexed_post(self):
+        index = SearchIndex()
+        original = post("Django site", updated_at=datetime(2026, 1, 1))
+        index.add_post(original)
+        index.add_post(dict(original, Title="Rails site"))  # same version: ignored
+        self.assertEqual(index.search("django")[1], 1)
+        index.add_post(dict(original, Title="Rails site", updated_at=datetime(2026, 1, 2)))
+        self.assertEqual(index.search("django")[1], 0)
+        self.assertEqual(index.search("rails")[0], [str(original["_id"])])
+        self.assertEqual(len(index), 1)
+
+    def test_remove_post(self):
+        index = SearchIndex()
+        kept, removed = post("Go service"), post("Go tooling")
+        index.add_post(kept)
+        index.add_post(removed)
+        index.remove_post(removed["_id"])
+        self.assertEqual(index.search("go"), ([str(kept["_id"])], 1))
+        self.assertEqual(len(index), 1)
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class SearchSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.posts = mongomock.MongoClient().db.posts
+        self.index = SearchIndex()
+
+    def test_first_sync_loads_everything(self):
+        self.posts.insert_many([post("Legacy rust job"), post("Stamped rust job", updated_at=datetime(2026, 1, 1))])
+        self.index.sync(self.posts)
+        self.assertEqual(self.index.search("rust")[1], 2)
+
+    def test_late_insert_with_an_older_id_is_picked_up(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        early_id = ObjectId()  # built before the attachments were stored
+        self.posts.insert_one(post("Kotlin app", updated_at=now, _id=ObjectId()))
+        self.index.sync(self.posts)
+        self.posts.insert_one(post("Kotlin backend", updated_at=now + timedelta(seconds=1), _id=early_id))
+        self.index.sync(self.posts)
+        self.assertIn(str(early_id), self.index.search("kotlin")[0])
+
+    def test_edits_and_deletes_reach_the_index(self):
+        stamp = datetime(2026, 1, 1)
+        edited = post("Vue frontend", updated_at=stamp)
+        deleted = post("Vue dashboard", updated_at=stamp)
+        self.posts.insert_many([edited, deleted])
+        self.index.sync(self.posts)
+        self.posts.update_one({"_id": edited["_id"]},
+                              {"$set": {"Title": "Svelte frontend", "updated_at": stamp + timedelta(seconds=5)}})
+        self.posts.delete_one({"_id": deleted["_id"]})
+        self.index.sync(self.posts)
+        self.index.reconcile(self.posts)
+        self.assertEqual(self.index.search("vue")[1], 0)
+        self.assertEqual(self.index.search("svelte")[0], [str(edited["_id"])])
+        self.assertEqual(len(self.index), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
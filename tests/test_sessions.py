@@ -0,0 +1,127 @@
+"""Server-side sessions: id regeneration on login, expiry, and the tiered store.
+
+    python -m pytest tests
+"""
+import unittest
+from unittest import mock
+
+from flask import Flask, session
+
+from utils.sessions import MemorySessionStore, MongoSessionStore, ServerSideSessionInterface, TieredSessionStore
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+def make_app(store, ttl=3600):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = ServerSideSessionInterface(store, ttl=ttl)
+
+    @app.route("/visit")
+    def visit():
+        session["visits"] = session.get("visits", 0) + 1
+        return str(session["visits"])
+
+    @app.route("/login")
+    def login():
+        session.clear()
+        session.regenerate()
+        session["userid"] = "u1"
+        return session.sid
+
+    @app.route("/whoami")
+    def whoami():
+        return session.get("userid", "")
+
+    @app.route("/logout")
+    def logout():
+        session.clear()
+        return ""
+
+    return app
+
+
+def cookie(client):
+    return client.get_cookie("session").value
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.store = MemorySessionStore()
+        self.app = make_app(self.store)
+        self.client = self.app.test_client()
+
+    def test_login_moves_to_a_fresh_id(self):
+        self.client.get("/visit")
+        planted = cookie(self.client)
+        old_sid = self.app.session_interface.session_id(self.app, planted)
+        new_sid = self.client.get("/login").get_data(as_text=True)
+        self.assertNotEqual(new_sid, old_sid)
+        self.assertIsNone(self.store.get(old_sid))
+        self.assertEqual(self.store.get(new_sid)[1], {"userid": "u1"})
+
+        # Whoever held the old cookie is not logged in
+        attacker = self.app.test_client()
+        attacker.set_cookie("session", planted)
+        self.assertEqual(attacker.get("/whoami").get_data(as_text=True), "")
+        self.assertEqual(self.client.get("/whoami").get_data(as_text=True), "u1")
+
+    def test_logout_deletes_the_session(self):
+        sid = self.client.get("/login").get_data(as_text=True)
+        self.client.get("/logout")
+        self.assertIsNone(self.store.get(sid))
+
+    def test_tampered_cookie_gets_a_new_session(self):
+        self.client.get("/login")
+        self.client.set_cookie("session", cookie(self.client) + "x")
+        self.assertEqual(self.client.get("/whoami").get_data(as_text=True), "")
+
+    def test_expired_session_is_not_loaded(self):
+        app = make_app(self.store, ttl=100)
+        client = app.test_client()
+        with mock.patch("utils.sessions.time.time", return_value=1000.0):
+            client.get("/login")
+        with mock.patch("utils.sessions.time.time", return_value=1040.0):  # before the half-TTL refresh
+            self.assertEqual(client.get("/whoami").get_data(as_text=True), "u1")
+        with mock.patch("utils.sessions.time.time", return_value=1101.0):
+            self.assertEqual(client.get("/whoami").get_data(as_text=True), "")
+
+    def test_expiry_is_extended_once_half_the_ttl_has_passed(self):
+        store = mock.Mock(wraps=MemorySessionStore())
+        client = make_app(store, ttl=100).test_client()
+        with mock.patch("utils.sessions.time.time", return_value=1000.0):
+            client.get("/login")
+        for now in (1010.0, 1040.0, 1060.0):
+            with mock.patch("utils.sessions.time.time", return_value=now):
+                client.get("/whoami")
+        self.assertEqual([call.args[2] for call in store.set.call_args_list], [1100.0, 1160.0])
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class MongoStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.sessions = mongomock.MongoClient().db.sessions
+
+    def test_expired_document_is_ignored_before_the_ttl_monitor_runs(self):
+        store = MongoSessionStore(self.sessions)
+        with mock.patch("utils.sessions.time.time", return_value=1000.0):
+            store.set("sid", {"userid": "u1"}, 1100.0)
+            self.assertEqual(store.get("sid"), (1100.0, {"userid": "u1"}))
+        with mock.patch("utils.sessions.time.time", return_value=1101.0):
+            self.assertIsNone(store.get("sid"))
+
+    def test_logout_on_another_worker_is_seen_after_the_lru_ttl(self):
+        here, there = TieredSessionStore(self.sessions), TieredSessionStore(self.sessions)
+        with mock.patch("utils.sessions.time.time", return_value=1000.0):
+            here.set("sid", {"userid": "u1"}, 5000.0)
+            there.delete("sid")
+            self.assertIsNotNone(here.get("sid"))  # still in this worker's LRU
+        with mock.patch("utils.sessions.time.time", return_value=1031.0):
+            self.assertIsNone(here.get("sid"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""BlobStore: de-duplicated puts, reference counts and garbage collection racing uploads.
+
+    python -m pytest tests
+"""
+import io
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from utils.storage import BlobStore, FileSystemBackend
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+class PutDuringDelete(FileSystemBackend):
+    """Runs ``on_delete`` (e.g. an upload of the same file) just before each delete."""
+
+    on_delete = None
+
+    def delete(self, key):
+        if self.on_delete:
+            self.on_delete(key)
+        super().delete(key)
+
+
+@unittest.skipUnless(mongomock, "needs mongomock")
+class BlobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.backend = PutDuringDelete(self.root)
+        self.blobs = mongomock.MongoClient().db.blobs
+        self.store = BlobStore(self.backend, self.blobs, tmp_dir=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def put(self, data=b"resume", filename="resume.pdf"):
+        return self.store.put(io.BytesIO(data), filename)
+
+    def test_identical_uploads_share_one_blob(self):
+        key = self.put()
+        self.assertEqual(self.put(), key)
+        blob = self.store.info(key)
+        self.assertEqual((blob["refs"], blob["size"], blob["content_type"]), (2, 6, "application/pdf"))
+        with self.store.open(key) as f:
+            self.assertEqual(f.read(), b"resume")
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        kept, dropped = self.put(b"kept"), self.put(b"dropped")
+        self.store.release(dropped)
+        self.assertEqual(self.store.collect_garbage(), 1)
+        self.assertIsNone(self.store.info(dropped))
+        self.assertFalse(self.backend.exists(dropped))
+        self.assertTrue(self.backend.exists(kept))
+
+    def test_put_after_mark_keeps_the_blob(self):
+        key = self.put()
+        self.store.release(key)
+        self.blobs.update_one({"_id": key}, {"$set": {"gc_pending": "marked"}})  # a GC run got this far
+        self.put()
+        self.assertEqual(self.store.collect_garbage(), 0)
+        self.assertTrue(self.backend.exists(key))
+        self.assertNotIn("gc_pending", self.store.info(key))
+
+    def test_put_during_sweep_rewrites_the_file(self):
+        key = self.put()
+        self.store.release(key)
+        uploads = []
+
+        def upload_same_file(deleting):
+            thread = threading.Thread(target=lambda: uploads.append(self.put()))
+            thread.start()
+            deadline = time.monotonic() + 5
+            while self.store.info(deleting)["refs"] < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            uploads.append(thread)
+
+        self.backend.on_delete = upload_same_file
+        self.assertEqual(self.store.collect_garbage(), 0)
+        uploads[0].join(5)
+        self.assertEqual(uploads[1:], [key])
+        self.assertTrue(self.backend.exists(key))
+        self.assertEqual(self.store.info(key)["refs"], 1)
+        self.assertNotIn("gc_pending", self.store.info(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logs import log_event
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_MAX_PENDING = int(os.getenv("ANALYSIS_MAX_PENDING", "64"))
+ANALYSIS_CACHE_SIZE = 256
+ANALYSIS_JOBS_KEPT = 1000
+ANALYSIS_JOB_TTL = 24 * 3600  # seconds a job's status stays in Mongo
+
+
+class QueueFull(Exception):
+    pass
+
+
+def analysis_cache_key(resume_text, job_requirements):
+    digest = hashlib.sha256()
+    digest.update(resume_text.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(job_requirements.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisJobs:
+    """Runs resume analyses off the request thread.
+
+    ``submit`` returns a job id straight away; text extraction and the LLM
+    call happen in a bounded thread pool. Finished analyses are cached by the
+    hash of (resume text, job requirements) so re-submitting the same pair
+    never reaches the LLM again. ``on_done(job_id, job)`` is called when a job
+    finishes, e.g. to push the result over SocketIO.
+
+    With a ``collection`` every job's status is also written to Mongo, so a
+    poll that lands on another worker still finds it.
+    """
+
+    def __init__(self, extract_fn, analyze_fn, on_done=None, max_workers=ANALYSIS_WORKERS,
+                 max_pending=ANALYSIS_MAX_PENDING, cache_size=ANALYSIS_CACHE_SIZE, collection=None):
+        self.extract_fn = extract_fn
+        self.analyze_fn = analyze_fn
+        self.on_done = on_done
+        self.collection = collection
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.jobs = OrderedDict()
+        self.cache = OrderedDict()
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit(self, resume_path, job_requirements):
+        """Queue an analysis of the PDF at ``resume_path``; the file is removed once read."""
+        return self._queue(job_requirements, resume_path=resume_path)
+
+    def submit_text(self, resume_text, job_requirements):
+        """Queue an analysis of resume text that has already been extracted."""
+        return self._queue(job_requirements, resume_text=resume_text)
+
+    def _queue(self, job_requirements, resume_path=None, resume_text=None):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise QueueFull("Too many analyses in progress, try again shortly")
+            self.pending += 1
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {"status": "pending"}
+            while len(self.jobs) > ANALYSIS_JOBS_KEPT:
+                self.jobs.popitem(last=False)
+        self._store(job_id, {"status": "pending"})
+        self.pool.submit(self._run, job_id, job_requirements, resume_path, resume_text)
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job:
+            return dict(job)
+        if self.collection is None:
+            return None
+        # Submitted to another worker, or no longer kept in memory here
+        return self.collection.find_one({"_id": job_id}, {"_id": 0, "expires_at": 0})
+
+    def _store(self, job_id, job):
+        if self.collection is None:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ANALYSIS_JOB_TTL)
+        try:
+            self.collection.replace_one({"_id": job_id}, dict(job, expires_at=expires_at), upsert=True)
+        except Exception as e:
+            # This worker still answers for the job from memory
+            log_event("analysis_job_store_failed", logging.WARNING, job_id=job_id, error=e)
+
+    def _cached(self, key):
+        with self.lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+            return result
+
+    def _remember(self, key, result):
+        with self.lock:
+            self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _run(self, job_id, job_requirements, resume_path=None, resume_text=None):
+        try:
+            if resume_text is None:
+                try:
+                    resume_text = self.extract_fn(resume_path)
+                finally:
+                    if os.path.exists(resume_path):
+                        os.remove(resume_path)
+            key = analysis_cache_key(resume_text, job_requirements)
+            result = self._cached(key)
+            cached = result is not None
+            if not cached:
+                result = self.analyze_fn(resume_text, job_requirements)
+                if not result.startswith("Error:"):
+                    self._remember(key, result)
+            job = {"status": "done", "analysis": result, "cached": cached}
+        except Exception as e:
+            log_event("resume_analysis_failed", logging.ERROR, job_id=job_id, error=e)
+            job = {"status": "failed", "error": str(e)}
+
+        with self.lock:
+            self.pending -= 1
+            if job_id in self.jobs:
+                self.jobs[job_id] = job
+        self._store(job_id, job)
+        if self.on_done:
+            self.on_done(job_id, job)
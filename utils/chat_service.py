@@ -0,0 +1,36 @@
+"""What the chat and analysis Socket.IO events do, shared by both servers.
+
+main.py's Flask-SocketIO handlers and asgi.py's asyncio handlers differ
+only in how they wait for rooms and sessions; the message write and the
+payloads they broadcast come from here, and presence from utils.presence.
+"""
+from datetime import datetime
+
+
+def analysis_update(job_id, job):
+    return dict(job, job_id=job_id)
+
+
+def finished_analysis(analysis_jobs, job_id):
+    """The update to send a late watcher, or None while the job is still pending."""
+    job = analysis_jobs.get(job_id)
+    if job and job["status"] != "pending":
+        return analysis_update(job_id, job)
+    return None
+
+
+class ChatService:
+    def __init__(self, message_writer, recent_messages):
+        self.message_writer = message_writer
+        self.recent_messages = recent_messages
+
+    def post(self, room, sender, sender_id, message):
+        """Queue ``message`` for ``room`` (its chatroom metadata); returns the payload to broadcast.
+
+        The write is batched by the MessageWriter thread, so this never
+        waits on Mongo.
+        """
+        timestamp = datetime.now().strftime("%H:%M")
+        doc = self.message_writer.append(room["room_id"], sender, sender_id, message, timestamp)
+        self.recent_messages.add(doc)
+        return {"seq": doc["seq"], "sender": sender, "message": message, "timestamp": timestamp}
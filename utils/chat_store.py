@@ -0,0 +1,272 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from utils.logs import log_event
+
+ROOM_CACHE_SIZE = 10000
+FLUSH_INTERVAL = 0.05  # seconds
+FLUSH_BATCH_SIZE = 200
+FLUSH_RETRIES = 5
+FLUSH_RETRY_DELAY = 0.5  # seconds, doubled on each retry
+WRITER_IDS = 1024  # seq = tick * WRITER_IDS + writer id
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_BUFFER_SIZE = 100
+HISTORY_BUFFER_ROOMS = 1000
+# Messages sent through other workers only reach this worker's buffers via
+# Mongo, so a buffer is reloaded once it is this old
+HISTORY_BUFFER_TTL = 10  # seconds
+
+
+ROOM_PROJECTION = {"_id": 0, "room_id": 1, "client_id": 1, "freelancer_id": 1}
+
+
+class RoomCache:
+    """room_id -> chatroom metadata, so sending a message needs no lookup."""
+
+    def __init__(self, chatroom_collection, maxsize=ROOM_CACHE_SIZE):
+        self.chatroom_collection = chatroom_collection
+        self.maxsize = maxsize
+        self.rooms = OrderedDict()
+        self.lock = threading.Lock()
+
+    def cached(self, room_id):
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is not None:
+                self.rooms.move_to_end(room_id)
+            return room
+
+    def get(self, room_id):
+        room = self.cached(room_id)
+        if room is None:
+            room = self.chatroom_collection.find_one({"room_id": room_id}, ROOM_PROJECTION)
+            if room:
+                self.put(room)
+        return room
+
+    def put(self, room):
+        with self.lock:
+            self.rooms[room["room_id"]] = room
+            self.rooms.move_to_end(room["room_id"])
+            while len(self.rooms) > self.maxsize:
+                self.rooms.popitem(last=False)
+
+
+class AsyncRoomCache:
+    """A RoomCache whose misses are read through Motor, for the asyncio server."""
+
+    def __init__(self, room_cache, chatroom_collection):
+        self.room_cache = room_cache
+        self.chatroom_collection = chatroom_collection  # a Motor collection
+
+    async def get(self, room_id):
+        room = self.room_cache.cached(room_id)
+        if room is None:
+            room = await self.chatroom_collection.find_one({"room_id": room_id}, ROOM_PROJECTION)
+            if room:
+                self.room_cache.put(room)
+        return room
+
+
+class MessageWriter:
+    """Append-only message log, written in batches off the emit path.
+
+    Each message gets its ``seq`` before it is emitted, and that is the seq
+    stored. It is a millisecond tick that never goes backwards in this
+    process, times ``WRITER_IDS``, plus a writer id claimed from the
+    ``counters`` collection once at start-up, so (room_id, seq) orders a
+    room's history and no two workers can pick the same seq, all without a
+    round-trip per message. ``append`` only enqueues; a background thread
+    flushes with ``insert_many`` every ``FLUSH_INTERVAL`` or
+    ``FLUSH_BATCH_SIZE`` messages, whichever comes first, and retries failed
+    writes with backoff.
+    """
+
+    def __init__(self, messages_collection, flush_interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH_SIZE,
+                 writer_id=None):
+        self.messages_collection = messages_collection
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.writer_id = claim_writer_id(messages_collection.database["counters"]) if writer_id is None else writer_id
+        self.queue = queue.Queue()
+        self.seq_lock = threading.Lock()
+        self.last_tick = 0
+        self.thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self.thread.start()
+
+    def next_seq(self):
+        with self.seq_lock:
+            self.last_tick = max(self.last_tick + 1, time.time_ns() // 1000000)
+            return self.last_tick * WRITER_IDS + self.writer_id
+
+    def append(self, room_id, sender, sender_id, message, timestamp):
+        doc = {
+            "room_id": room_id,
+            "seq": self.next_seq(),
+            "sender": sender,
+            "sender_id": sender_id,
+            "message": message,
+            "timestamp": timestamp,
+        }
+        self.queue.put(doc)
+        return doc
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch, attempt=0):
+        # insert_many adds _id to the dicts; keep the emitted copies clean
+        docs = [dict(doc) for doc in batch]
+        try:
+            self.messages_collection.insert_many(docs, ordered=False)
+            return
+        except BulkWriteError as e:
+            # Seqs are unique per writer, so a duplicate is a message an earlier attempt already stored
+            failed = [batch[err["index"]] for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            error = e
+        except Exception as e:
+            failed = batch
+            error = e
+        if not failed:
+            return
+        if attempt >= FLUSH_RETRIES:
+            log_event("chat_flush_failed", logging.ERROR, messages=len(failed),
+                      rooms=sorted({doc["room_id"] for doc in failed}), error=error)
+            return
+        log_event("chat_flush_retry", logging.WARNING, messages=len(failed), attempt=attempt + 1, error=error)
+        time.sleep(FLUSH_RETRY_DELAY * 2 ** attempt)
+        self._flush(failed, attempt + 1)
+
+
+def claim_writer_id(counters_collection):
+    """A writer id for this process; ids only repeat after ``WRITER_IDS`` more workers have started."""
+    counter = counters_collection.find_one_and_update(
+        {"_id": "chat_writer"}, {"$inc": {"next": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter["next"] % WRITER_IDS
+
+
+def public_message(doc):
+    return {key: doc.get(key) for key in ("seq", "sender", "message", "timestamp")}
+
+
+def fetch_history(messages_collection, room_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """Return up to ``limit`` messages older than ``before``, oldest first.
+
+    The second value is the cursor for the next (older) page, or None once
+    the start of the conversation is reached. Served from the
+    (room_id, seq) index, so a page costs the same however long the room is.
+    """
+    query = {"room_id": room_id}
+    if before is not None:
+        query["seq"] = {"$lt": before}
+    docs = list(messages_collection.find(query, {"_id": 0}).sort("seq", -1).limit(limit + 1))
+    has_more = len(docs) > limit
+    messages = [public_message(doc) for doc in reversed(docs[:limit])]
+    return messages, (messages[0]["seq"] if has_more and messages else None)
+
+
+class RecentMessages:
+    """Small per-room ring buffer of the latest messages for hot rooms."""
+
+    def __init__(self, messages_collection, size=HISTORY_BUFFER_SIZE,
+                 max_rooms=HISTORY_BUFFER_ROOMS, ttl=HISTORY_BUFFER_TTL):
+        self.messages_collection = messages_collection
+        self.size = size
+        self.max_rooms = max_rooms
+        self.ttl = ttl
+        self.rooms = OrderedDict()  # room_id -> [loaded_at, deque, has_older]
+        self.lock = threading.Lock()
+
+    def add(self, doc):
+        with self.lock:
+            entry = self.rooms.get(doc["room_id"])
+            if entry is not None:
+                if len(entry[1]) == self.size:
+                    entry[2] = True
+                entry[1].append(public_message(doc))
+
+    def latest(self, room_id, limit=HISTORY_PAGE_SIZE):
+        with self.lock:
+            entry = self.rooms.get(room_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.rooms.move_to_end(room_id)
+                buffered = list(entry[1])
+                has_older = entry[2]
+            else:
+                entry = None
+
+        if entry is None:
+            messages, next_before = fetch_history(self.messages_collection, room_id, limit=self.size)
+            buffered, has_older = messages, next_before is not None
+            with self.lock:
+                self.rooms[room_id] = [time.monotonic(), deque(messages, maxlen=self.size), has_older]
+                self.rooms.move_to_end(room_id)
+                while len(self.rooms) > self.max_rooms:
+                    self.rooms.popitem(last=False)
+
+        if limit > len(buffered) and has_older:
+            return fetch_history(self.messages_collection, room_id, limit=limit)
+        page = buffered[-limit:]
+        more = len(buffered) > limit or has_older
+        return page, (page[0]["seq"] if more and page else None)
+
+
+def migrate_room_arrays(chatroom_collection, messages_collection):
+    """Move messages out of the old client_msg/freelancer_msg arrays.
+
+    The old timestamps only carry HH:MM, so messages are ordered by that and
+    then by their position in each array.
+    """
+    moved = 0
+    seq = 0
+    for room in chatroom_collection.find({"$or": [{"client_msg.0": {"$exists": True}},
+                                                   {"freelancer_msg.0": {"$exists": True}}]}):
+        old = [(msg.get("timestamp", ""), i, msg) for i, msg in enumerate(room.get("client_msg", []))]
+        old += [(msg.get("timestamp", ""), i, msg) for i, msg in enumerate(room.get("freelancer_msg", []))]
+        docs = []
+        for timestamp, _, msg in sorted(old, key=lambda item: (item[0], item[1])):
+            seq += 1
+            docs.append({
+                "room_id": room["room_id"],
+                "seq": seq,
+                "sender": msg.get("sender"),
+                "sender_id": None,
+                "message": msg.get("message"),
+                "timestamp": timestamp,
+            })
+        if docs:
+            messages_collection.insert_many(docs, ordered=False)
+            moved += len(docs)
+        chatroom_collection.update_one({"_id": room["_id"]}, {"$unset": {"client_msg": "", "freelancer_msg": ""}})
+    return moved
+
+
+if __name__ == "__main__":
+    # Move existing chat history into the messages collection: python -m utils.chat_store
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.schema import apply_indexes
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    apply_indexes(db)
+    print(f"Moved {migrate_room_arrays(db['chatroom'], db['messages'])} messages")
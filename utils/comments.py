@@ -0,0 +1,63 @@
+import os
+from bson import ObjectId
+from pymongo import DESCENDING
+from utils.feed import parse_cursor
+
+COMMENTS_PAGE_SIZE = 10
+COMMENTS_MAX_PAGE_SIZE = 50
+
+
+def add_comment(comments_collection, posts_collection, post_id, comment):
+    """Store a comment in its own document and bump the post's comment_count.
+
+    Returns False when the post does not exist. Only the small counter on the
+    post is rewritten, however many comments it already has.
+    """
+    result = posts_collection.update_one({"_id": ObjectId(post_id)}, {"$inc": {"comment_count": 1}})
+    if result.matched_count == 0:
+        return False
+    comments_collection.insert_one(dict(comment, post_id=str(post_id)))
+    return True
+
+
+def fetch_comments(comments_collection, post_id, before=None, limit=COMMENTS_PAGE_SIZE):
+    """Return a page of a post's comments, newest first, and the cursor for the next page."""
+    query = {"post_id": str(post_id)}
+    before = parse_cursor(before)
+    if before is not None:
+        query["_id"] = {"$lt": before}
+    docs = list(comments_collection.find(query).sort("_id", DESCENDING).limit(limit + 1))
+    has_more = len(docs) > limit
+    comments = []
+    for doc in docs[:limit]:
+        doc["_id"] = str(doc["_id"])
+        comments.append(doc)
+    return comments, (comments[-1]["_id"] if has_more and comments else None)
+
+
+def migrate_embedded_comments(posts_collection, comments_collection):
+    """Move comments out of the old Comments arrays on post documents."""
+    moved = 0
+    for post in posts_collection.find({"Comments": {"$exists": True}}, {"Comments": 1}):
+        comments = [dict(comment, post_id=str(post["_id"])) for comment in post.get("Comments") or []]
+        if comments:
+            # Inserted in array order, so _id order matches the original order
+            comments_collection.insert_many(comments)
+            moved += len(comments)
+        posts_collection.update_one(
+            {"_id": post["_id"]},
+            {"$unset": {"Comments": ""}, "$set": {"comment_count": len(comments)}}
+        )
+    return moved
+
+
+if __name__ == "__main__":
+    # Move existing comments into their own collection: python -m utils.comments
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.schema import apply_indexes
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    apply_indexes(db)
+    print(f"Moved {migrate_embedded_comments(db['posts'], db['comments'])} comments")
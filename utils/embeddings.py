@@ -0,0 +1,316 @@
+"""Semantic freelancer matching on hashed TF-IDF vectors.
+
+Skills and post text are hashed into a fixed ``EMBEDDING_DIM``-wide
+vector, so no model or vocabulary has to be shipped. Skills also
+contribute character trigrams of their punctuation-free form, which is what
+lets "React.js", "reactjs" and "react" land close together. Every
+freelancer is one L2-normalized float32 row of a NumPy matrix, so scoring a
+job against all of them is a single matrix-vector product.
+
+``search(..., approximate=True)`` only scores the rows in the ``nprobe``
+k-means partitions nearest the query (an IVF index). It falls back to the
+exact scan until there are ``IVF_MIN_ROWS`` rows.
+"""
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from utils.logs import log_event
+
+EMBEDDING_DIM = 256
+SKILL_WEIGHT = 2.0  # a listed skill says more than a word in a description
+IVF_MIN_ROWS = 5000
+IVF_NPROBE = 8
+IVF_TRAIN_ITERATIONS = 8
+IVF_TRAIN_SAMPLE = 50  # rows sampled per partition when training
+EMBEDDINGS_SYNC_INTERVAL = float(os.getenv("EMBEDDINGS_SYNC_INTERVAL", "5"))  # seconds
+# A full rebuild refits the IDF weights and drops freelancers whose posts are gone
+EMBEDDINGS_REBUILD_INTERVAL = float(os.getenv("EMBEDDINGS_REBUILD_INTERVAL", "900"))  # seconds
+# Posts are stamped before their insert lands, so each sync re-reads this far back
+EMBEDDINGS_SYNC_OVERLAP = timedelta(minutes=5)
+
+_word = re.compile(r"[a-z0-9+#]+")
+
+
+def skill_features(skill):
+    words = _word.findall(skill.lower())
+    joined = "".join(words)
+    if not joined:
+        return []
+    padded = f"<{joined}>"
+    return words + ([joined] if len(words) > 1 else []) + [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def text_features(text):
+    return _word.findall((text or "").lower())
+
+
+def _bucket(feature, dim):
+    h = zlib.crc32(feature.encode("utf-8"))
+    # The sign bit keeps hash collisions from only ever adding up
+    return h % dim, 1.0 if (h // dim) & 1 else -1.0
+
+
+def _top_k(scores, k):
+    if k < len(scores):
+        picked = np.argpartition(-scores, k)[:k]
+    else:
+        picked = np.arange(len(scores))
+    return picked[np.argsort(-scores[picked], kind="stable")]
+
+
+class EmbeddingIndex:
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.matrix = np.zeros((1024, dim), dtype=np.float32)
+        self.size = 0
+        self.uids = []
+        self.rows = {}  # uid -> row
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.centroids = None
+        self.assignments = np.zeros(1024, dtype=np.int32)
+        self._lists = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def _raw(self, skills, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for skill in skills or []:
+            features = skill_features(skill)
+            for feature in features:
+                bucket, sign = _bucket(feature, self.dim)
+                vector[bucket] += sign * SKILL_WEIGHT / math.sqrt(len(features))
+        for feature in text_features(text):
+            bucket, sign = _bucket(feature, self.dim)
+            vector[bucket] += sign
+        # Sublinear term frequency, keeping the hashing sign
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+    def embed(self, skills, text=""):
+        vector = self._raw(skills, text) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def fit(self, documents):
+        """Set the IDF weights from ``[(skills, text)]``; call before bulk loading."""
+        df = np.zeros(self.dim, dtype=np.float64)
+        for skills, text in documents:
+            df += self._raw(skills, text) != 0
+        self.idf = (np.log((1 + len(documents)) / (1 + df)) + 1).astype(np.float32)
+
+    def _grow(self, needed):
+        capacity = len(self.matrix)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:self.size] = self.assignments[:self.size]
+        self.matrix, self.assignments = matrix, assignments
+
+    def upsert(self, uid, skills, text=""):
+        vector = self.embed(skills, text)
+        with self.lock:
+            row = self.rows.get(uid)
+            if row is None:
+                self._grow(self.size + 1)
+                row = self.size
+                self.rows[uid] = row
+                self.uids.append(uid)
+                self.size += 1
+            self.matrix[row] = vector
+            if self.centroids is not None:
+                self.assignments[row] = int(np.argmax(self.centroids @ vector))
+                self._lists = None
+
+    def train(self, nlist=None, seed=0):
+        """Partition the rows with spherical k-means for approximate search."""
+        with self.lock:
+            n = self.size
+            if n < IVF_MIN_ROWS:
+                self.centroids = None
+                return
+            nlist = nlist or int(math.sqrt(n))
+            rng = np.random.default_rng(seed)
+            sample = self.matrix[rng.choice(n, size=min(n, nlist * IVF_TRAIN_SAMPLE), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(IVF_TRAIN_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                # Re-seed empty partitions from random sample rows
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                norms[empty] = 1
+                centroids = sums / norms
+            for start in range(0, n, 16384):
+                block = self.matrix[start:min(n, start + 16384)]
+                self.assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            self.centroids = centroids.astype(np.float32)
+            self._lists = None
+
+    def _partition_lists(self):
+        if self._lists is None:
+            assignments = self.assignments[:self.size]
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, vector, top_k=20, approximate=False, nprobe=IVF_NPROBE):
+        """Return up to ``top_k`` ``(uid, cosine)`` pairs, best first."""
+        with self.lock:
+            if self.size == 0:
+                return []
+            if approximate and self.centroids is not None:
+                lists = self._partition_lists()
+                probes = _top_k(self.centroids @ vector, min(nprobe, len(lists)))
+                candidates = np.concatenate([lists[p] for p in probes])
+                scores = self.matrix[candidates] @ vector
+                picked = _top_k(scores, top_k)
+                rows, scores = candidates[picked], scores[picked]
+            else:
+                scores = self.matrix[:self.size] @ vector
+                rows = _top_k(scores, top_k)
+                scores = scores[rows]
+            return [(self.uids[row], float(score)) for row, score in zip(rows, scores) if score > 0]
+
+
+def freelancer_documents(users_collection, posts_collection, uids=None):
+    """``{uid: (skills, text)}`` from the users' skills and the text of their posts."""
+    query = {"user_type": "freelancer"}
+    if uids is not None:
+        query["UID"] = {"$in": list(uids)}
+    text = {}
+    for post in posts_collection.find(query, {"UID": 1, "Title": 1, "Content": 1}):
+        text.setdefault(str(post["UID"]), []).append(f"{post.get('Title') or ''} {post.get('Content') or ''}")
+    user_query = {"user_type": "freelancer", "skills.0": {"$exists": True}}
+    if uids is not None:
+        user_query["_id"] = {"$in": [ObjectId(uid) for uid in uids]}
+    documents = {}
+    for user in users_collection.find(user_query, {"skills": 1}):
+        uid = str(user["_id"])
+        documents[uid] = (user.get("skills", []), " ".join(text.get(uid, [])))
+    return documents
+
+
+def build_index(users_collection, posts_collection, dim=EMBEDDING_DIM):
+    documents = freelancer_documents(users_collection, posts_collection)
+    index = EmbeddingIndex(dim)
+    index.fit(list(documents.values()))
+    for uid, (skills, text) in documents.items():
+        index.upsert(uid, skills, text)
+    index.train()
+    return index
+
+
+class FreelancerEmbeddings:
+    """The app's index, built and kept current off the request path.
+
+    A freelancer's document only changes when they write a post, and every
+    post carries ``updated_at``. ``sync`` re-embeds the authors of freelancer
+    posts stamped within ``EMBEDDINGS_SYNC_OVERLAP`` of the newest one seen,
+    so posts handled by other workers are picked up too, and rebuilds the
+    whole index every ``EMBEDDINGS_REBUILD_INTERVAL`` seconds. ``start`` runs
+    it on a background thread; until the first build finishes ``ready`` is
+    False.
+    """
+
+    def __init__(self, users_collection, posts_collection, rebuild_interval=EMBEDDINGS_REBUILD_INTERVAL):
+        self.users_collection = users_collection
+        self.posts_collection = posts_collection
+        self.rebuild_interval = rebuild_interval
+        self._index = None
+        self.built_at = 0.0
+        self.watermark = None  # newest freelancer post updated_at seen
+        self.seen = {}  # post id -> updated_at, for posts inside the overlap window
+        self.lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._index is not None
+
+    def _newest_post(self):
+        newest = self.posts_collection.find_one(
+            {"user_type": "freelancer", "updated_at": {"$exists": True}}, {"updated_at": 1},
+            sort=[("updated_at", -1)])
+        return newest["updated_at"] if newest else None
+
+    def rebuild(self):
+        # Read the watermark first: anything stamped during the build is re-read by the next sync
+        watermark = self._newest_post()
+        index = build_index(self.users_collection, self.posts_collection)
+        with self.lock:
+            self._index = index
+            self.watermark = watermark
+            self.seen = {}
+            self.built_at = time.monotonic()
+
+    def sync(self):
+        """Build the index when missing or due, otherwise re-embed freelancers with new posts."""
+        if self._index is None or time.monotonic() - self.built_at >= self.rebuild_interval:
+            self.rebuild()
+            return
+        query = {"user_type": "freelancer", "updated_at": {"$exists": True}}
+        if self.watermark is not None:
+            query["updated_at"] = {"$gte": self.watermark - EMBEDDINGS_SYNC_OVERLAP}
+        changed = set()
+        seen = {}
+        for post in self.posts_collection.find(query, {"UID": 1, "updated_at": 1}):
+            post_id = str(post["_id"])
+            seen[post_id] = post["updated_at"]
+            if self.seen.get(post_id) != post["updated_at"]:
+                changed.add(str(post["UID"]))
+            if self.watermark is None or post["updated_at"] > self.watermark:
+                self.watermark = post["updated_at"]
+        self.seen = seen
+        if changed:
+            self._upsert(changed)
+
+    def _upsert(self, uids):
+        index = self._index
+        for doc_uid, (skills, text) in freelancer_documents(
+                self.users_collection, self.posts_collection, uids).items():
+            index.upsert(doc_uid, skills, text)
+
+    def refresh(self, uid):
+        """Re-embed one freelancer right away after their skills or posts change here."""
+        if self._index is None:
+            return  # picked up by the build
+        self._upsert([uid])
+
+    def start(self, interval=EMBEDDINGS_SYNC_INTERVAL):
+        """Build the index and keep it in sync on a daemon thread."""
+        def run():
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    log_event("embeddings_sync_failed", logging.WARNING, error=e)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="embeddings-sync", daemon=True)
+        thread.start()
+        return thread
+
+    def match(self, post, top_k=20, approximate=False):
+        """Best freelancers for ``post``; empty until the index has been built."""
+        index = self._index
+        if index is None:
+            return []
+        skills = post.get("Skills") or post.get("Skills_required") or []
+        text = f"{post.get('Title') or ''} {post.get('Content') or ''}"
+        return index.search(index.embed(skills, text), top_k=top_k, approximate=approximate)
@@ -0,0 +1,51 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils.render_cache import attach_content_html
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 50
+
+# Comments can grow without bound, so the feed never ships them; Content_html
+# stands in for Content (see render_cache.attach_content_html)
+FEED_PROJECTION = {"Comments": 0, "Content": 0}
+
+
+def parse_page_size(value, default=FEED_PAGE_SIZE, maximum=FEED_MAX_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def parse_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return ObjectId(cursor)
+    except (InvalidId, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def fetch_feed_page(collection, cursor=None, limit=FEED_PAGE_SIZE, query=None):
+    """Return one page of posts, newest first, and the cursor for the next page.
+
+    Pages are keyed on ``_id`` so every page is an index range scan no matter
+    how deep the user has scrolled. ``next_cursor`` is None on the last page.
+    """
+    query = dict(query or {})
+    after = parse_cursor(cursor)
+    if after is not None:
+        query["_id"] = {"$lt": after}
+
+    # Fetch one extra document to know whether another page exists
+    posts = list(collection.find(query, FEED_PROJECTION).sort("_id", -1).limit(limit + 1))
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+
+    for post in posts:
+        post["_id"] = str(post["_id"])
+    attach_content_html(collection, posts)
+
+    next_cursor = posts[-1]["_id"] if has_more and posts else None
+    return posts, next_cursor
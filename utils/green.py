@@ -0,0 +1,41 @@
+"""Blocking calls that stay safe on an unpatched eventlet hub.
+
+``python main.py`` serves Flask-SocketIO from greenlets without
+monkey-patching, so a plain socket read, ``time.sleep`` or a thread
+pool's ``result()`` there stops every connection on the hub. These
+helpers pick eventlet's green variant only when the calling thread runs a
+hub; ASGI worker threads and background threads get the standard library.
+"""
+import socket
+import sys
+import threading
+import time
+
+
+def on_eventlet_hub():
+    """True on a thread that runs an eventlet hub, monkey-patched or not."""
+    hubs = sys.modules.get("eventlet.hubs")
+    return hubs is not None and getattr(hubs._threadlocal, "hub", None) is not None
+
+
+def socket_module(green=None):
+    if on_eventlet_hub() if green is None else green:
+        from eventlet.green import socket as green_socket
+        return green_socket
+    return socket
+
+
+def sleep(seconds, green=None):
+    if on_eventlet_hub() if green is None else green:
+        import eventlet
+        eventlet.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def make_lock(green=None):
+    """A lock that waiting greenlets can share without blocking their hub."""
+    if on_eventlet_hub() if green is None else green:
+        from eventlet.semaphore import Semaphore
+        return Semaphore(1)
+    return threading.Lock()
@@ -0,0 +1,168 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+import requests
+from requests.adapters import HTTPAdapter
+
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 1000
+
+
+class LLMError(Exception):
+    pass
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LLMClient:
+    """Chat completions client shared by the whole process.
+
+    - one keep-alive ``requests.Session`` with a sized connection pool
+    - connect/read timeouts and retries on 429/5xx with jittered backoff
+      (``Retry-After`` is honoured when the server sends it)
+    - at most ``max_in_flight`` upstream calls at once
+    - identical prompts in flight at the same time share one upstream call,
+      and recent answers are served from a small LRU
+    """
+
+    def __init__(self, base_url, api_key, model=LLM_MODEL, max_in_flight=LLM_MAX_IN_FLIGHT,
+                 max_retries=LLM_MAX_RETRIES, timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT),
+                 cache_size=LLM_CACHE_SIZE):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.cache = OrderedDict()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.counters = {"requests": 0, "cache_hits": 0, "coalesced": 0,
+                         "upstream_calls": 0, "retries": 0, "errors": 0}
+
+    def chat(self, prompt):
+        """Return the model's reply to ``prompt``; raises LLMError on failure.
+
+        Callers coalesced onto another caller's request raise the same error.
+        """
+        with self.lock:
+            self.counters["requests"] += 1
+            if prompt in self.cache:
+                self.cache.move_to_end(prompt)
+                self.counters["cache_hits"] += 1
+                return self.cache[prompt]
+            flight = self.flights.get(prompt)
+            leader = flight is None
+            if leader:
+                flight = self.flights[prompt] = _Flight()
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call(prompt)
+            with self.lock:
+                self.cache[prompt] = flight.result
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return flight.result
+        except Exception as e:
+            # Coalesced callers re-raise whatever stopped the leader
+            flight.error = e
+            with self.lock:
+                self.counters["errors"] += 1
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(prompt, None)
+            flight.done.set()
+
+    def _call(self, prompt):
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            retry_after = None
+            with self.slots:
+                with self.lock:
+                    self.counters["upstream_calls"] += 1
+                try:
+                    response = self.session.post(self.base_url, json=data, headers=headers, timeout=self.timeout)
+                except requests.RequestException as e:
+                    response = None
+                    failure = f"{type(e).__name__}: {e}"
+                finally:
+                    self.latencies.append(time.perf_counter() - start)
+
+            if response is not None:
+                if response.status_code == 200:
+                    try:
+                        return response.json()["choices"][0]["message"]["content"]
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        raise LLMError(f"Malformed response: {type(e).__name__}: {e}") from e
+                failure = f"{response.status_code} - {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                break
+            with self.lock:
+                self.counters["retries"] += 1
+            time.sleep(self._backoff(attempt, retry_after))
+        raise LLMError(failure)
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None, base=0.5, cap=20.0):
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), cap)
+        except ValueError:
+            pass
+        # Full jitter: spread retries so clients do not hammer the API in step
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+
+    def metrics(self):
+        with self.lock:
+            counters = dict(self.counters)
+            latencies = sorted(self.latencies)
+        requests_seen = counters["requests"] or 1
+        metrics = dict(counters)
+        metrics["cache_hit_rate"] = round(counters["cache_hits"] / requests_seen, 4)
+        metrics["coalesced_rate"] = round(counters["coalesced"] / requests_seen, 4)
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            metrics[f"latency_{name}_ms"] = (
+                round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1)
+                if latencies else None
+            )
+        return metrics
@@ -0,0 +1,130 @@
+"""Tiny line-based pub/sub broker for running several Socket.IO workers on one machine.
+
+Protocol (one command per line, payloads are JSON so never contain newlines):
+
+    SUB <channel>            subscribe this connection to a channel
+    PUB <channel> <payload>  deliver payload to every subscriber of channel
+    MSG <channel> <payload>  what subscribers receive
+
+Start it with ``python -m utils.local_broker --port 6390`` and point workers
+at it with ``SOCKETIO_MESSAGE_QUEUE=local://127.0.0.1:6390``. It is meant
+for development and load tests; use Redis or RabbitMQ across machines.
+"""
+import argparse
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from utils.green import make_lock, on_eventlet_hub, sleep, socket_module
+from utils.logs import log_event
+
+BROKER_PORT = 6390
+
+
+class Broker:
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+
+    async def handle(self, reader, writer):
+        channels = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, rest = line.decode("utf-8").rstrip("\n").partition(" ")
+                if command == "SUB":
+                    channels.add(rest)
+                    self.subscribers[rest].add(writer)
+                elif command == "PUB":
+                    channel, _, payload = rest.partition(" ")
+                    message = f"MSG {channel} {payload}\n".encode("utf-8")
+                    for subscriber in list(self.subscribers.get(channel, ())):
+                        subscriber.write(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in channels:
+                self.subscribers[channel].discard(writer)
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=BROKER_PORT):
+    broker = Broker()
+    server = await asyncio.start_server(broker.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def start_broker_thread(host="127.0.0.1", port=0):
+    """Run a broker in a background thread; returns the port it listens on."""
+    ready = threading.Event()
+    bound = {}
+
+    async def main():
+        broker = Broker()
+        server = await asyncio.start_server(broker.handle, host, port)
+        bound["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(main()), daemon=True).start()
+    ready.wait()
+    return bound["port"]
+
+
+class BrokerConnection:
+    """Blocking client for the broker, used by the Socket.IO manager.
+
+    Called on an eventlet hub it uses green sockets, so the unpatched
+    eventlet server keeps serving while it waits on the broker.
+    """
+
+    def __init__(self, host="127.0.0.1", port=BROKER_PORT):
+        self.address = (host, port)
+        self.publishers = {}  # on a hub or not -> [lock, socket]
+        self.lock = threading.Lock()  # guards publishers; never held across I/O
+
+    def publish(self, channel, payload):
+        line = f"PUB {channel} {payload}\n".encode("utf-8")
+        green = on_eventlet_hub()
+        with self.lock:
+            if green not in self.publishers:
+                self.publishers[green] = [make_lock(green), None]
+            publisher = self.publishers[green]
+        with publisher[0]:
+            for attempt in range(2):
+                try:
+                    if publisher[1] is None:
+                        publisher[1] = socket_module(green).create_connection(self.address)
+                    publisher[1].sendall(line)
+                    return
+                except OSError:
+                    publisher[1] = None
+                    if attempt:
+                        raise
+
+    def subscribe(self, channel, retry_sleep=1):
+        """Yield every payload published on channel, reconnecting on errors."""
+        green = on_eventlet_hub()
+        while True:
+            try:
+                with socket_module(green).create_connection(self.address) as sock:
+                    sock.sendall(f"SUB {channel}\n".encode("utf-8"))
+                    for line in sock.makefile("r", encoding="utf-8"):
+                        _, _, rest = line.rstrip("\n").partition(" ")
+                        _, _, payload = rest.partition(" ")
+                        yield payload
+            except OSError as e:
+                log_event("local_broker_disconnected", logging.WARNING, error=e, retry_in=retry_sleep)
+            sleep(retry_sleep, green)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local pub/sub broker for Socket.IO workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=BROKER_PORT)
+    args = parser.parse_args()
+    print(f"Local broker listening on {args.host}:{args.port}")
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,70 @@
+"""Structured logging that never blocks a request.
+
+``log_event`` formats one JSON line per event; a background thread does
+the write to stdout. The queue is bounded: when stdout cannot keep
+up, lines are dropped and counted instead of stalling the caller. Debug and
+info events are sampled at ``LOG_SAMPLE_RATE``; warnings and errors are
+always kept.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = 10000
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        line.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_queue = queue.Queue(LOG_QUEUE_SIZE)
+# The JSON line is built on the caller's thread (QueueHandler.prepare formats
+# the record); the listener thread only writes it out
+_handler = DroppingQueueHandler(_queue)
+_handler.setFormatter(JsonFormatter())
+_listener = QueueListener(_queue, logging.StreamHandler(sys.stdout))
+_listener.start()
+
+logger = logging.getLogger("freelanceconnect")
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(_handler)
+logger.propagate = False
+
+
+def log_event(event, level=logging.INFO, sample=None, exc_info=None, **fields):
+    """Log ``event`` with ``fields`` as one JSON line.
+
+    ``sample`` overrides ``LOG_SAMPLE_RATE`` for chatty events.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = LOG_SAMPLE_RATE if sample is None else sample
+    if level < logging.WARNING and rate < 1.0 and random.random() >= rate:
+        return
+    logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
@@ -0,0 +1,109 @@
+"""Materialized (client post, freelancer) match scores.
+
+Each row is ``{post_id, uid, client_id, score, matched}``, where ``score``
+is the fraction of the post's skills the freelancer has. Rows are written
+when a post or a freelancer's skills change, touching only the pairs that
+change can affect, so both recommendation views are single indexed reads.
+
+    python -m utils.match_table   rebuild the table from existing posts
+"""
+import os
+from pymongo import DESCENDING, UpdateOne
+from utils.skill_index import match_freelancers, normalize_skills
+
+RECOMMENDED_PAGE_SIZE = 20
+
+
+def _row_op(post_id, client_id, uid, required, matched):
+    return UpdateOne(
+        {"post_id": post_id, "uid": uid},
+        {"$set": {
+            "client_id": client_id,
+            "score": round(len(matched) / len(required), 4),
+            "matched": sorted(matched),
+        }},
+        upsert=True
+    )
+
+
+def refresh_post_matches(matches_collection, index_collection, post):
+    """Rewrite the rows of one client post after it is created or edited.
+
+    Candidates come from the skill index, so only freelancers sharing at
+    least one skill with the post are read.
+    """
+    post_id = str(post["_id"])
+    required = normalize_skills(post.get("Skills"))
+    candidates = match_freelancers(index_collection, required, top_k=None) if required else []
+    if candidates:
+        matches_collection.bulk_write(
+            [_row_op(post_id, post["UID"], uid, required, matched) for uid, matched in candidates],
+            ordered=False
+        )
+    # Drop freelancers that no longer share a skill after an edit
+    matches_collection.delete_many({"post_id": post_id, "uid": {"$nin": [uid for uid, _ in candidates]}})
+    return len(candidates)
+
+
+def refresh_freelancer_matches(matches_collection, posts_collection, uid, skills, changed_skills):
+    """Update one freelancer's rows after ``changed_skills`` were added or removed.
+
+    Only client posts asking for one of the changed skills can gain, lose
+    or change a score, so only those are read.
+    """
+    skills = normalize_skills(skills)
+    changed_skills = normalize_skills(changed_skills)
+    if not changed_skills:
+        return 0
+    ops, emptied = [], []
+    posts = posts_collection.find(
+        {"user_type": "client", "skill_keys": {"$in": sorted(changed_skills)}},
+        {"UID": 1, "skill_keys": 1}
+    )
+    for post in posts:
+        required = set(post["skill_keys"])
+        matched = required & skills
+        if matched:
+            ops.append(_row_op(str(post["_id"]), post["UID"], uid, required, matched))
+        else:
+            emptied.append(str(post["_id"]))
+    if ops:
+        matches_collection.bulk_write(ops, ordered=False)
+    if emptied:
+        matches_collection.delete_many({"uid": uid, "post_id": {"$in": emptied}})
+    return len(ops)
+
+
+def recommended_freelancers(matches_collection, post_id, limit=RECOMMENDED_PAGE_SIZE):
+    return list(matches_collection.find({"post_id": post_id}, {"_id": 0})
+                .sort([("score", DESCENDING), ("uid", DESCENDING)]).limit(limit))
+
+
+def recommended_jobs(matches_collection, uid, limit=RECOMMENDED_PAGE_SIZE):
+    return list(matches_collection.find({"uid": uid}, {"_id": 0})
+                .sort([("score", DESCENDING), ("post_id", DESCENDING)]).limit(limit))
+
+
+def rebuild_match_table(posts_collection, index_collection, matches_collection):
+    """Backfill ``skill_keys`` on client posts and recompute every row."""
+    matches_collection.delete_many({})
+    count = 0
+    for post in posts_collection.find({"user_type": "client"}, {"UID": 1, "Skills": 1}):
+        posts_collection.update_one(
+            {"_id": post["_id"]}, {"$set": {"skill_keys": sorted(normalize_skills(post.get("Skills")))}}
+        )
+        count += refresh_post_matches(matches_collection, index_collection, post)
+    return count
+
+
+if __name__ == "__main__":
+    # Run after python -m utils.skill_index so the postings are current
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.schema import apply_indexes
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    apply_indexes(db)
+    count = rebuild_match_table(db["posts"], db["skill_index"], db["matches"])
+    print(f"Wrote {count} match rows")
@@ -0,0 +1,79 @@
+"""Serving blobs from the content-addressed store.
+
+A key is the SHA-256 of the bytes behind it, so it doubles as a strong
+ETag and the URL can be cached forever. ``MEDIA_SENDFILE`` lets the front
+web server stream the file instead of a Python worker:
+
+    MEDIA_SENDFILE=x-accel     nginx, with an ``internal`` location at
+                               MEDIA_ACCEL_PREFIX aliased to STORAGE_ROOT
+    MEDIA_SENDFILE=x-sendfile  Apache mod_xsendfile / lighttpd
+"""
+import os
+from flask import Response, abort, request
+from werkzeug.utils import secure_filename, send_file
+from werkzeug.wsgi import wrap_file
+
+MEDIA_MAX_AGE = 365 * 24 * 60 * 60  # content never changes under a key
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/_media/")
+# Types a browser may render in place; anything else (HTML, SVG, text...) is
+# a download, since it would otherwise run on the app's own origin
+INLINE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf"}
+
+
+def _cache_forever(response, key):
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = MEDIA_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
+
+def _disposition(response, mimetype, download_name):
+    disposition = "inline" if mimetype in INLINE_TYPES else "attachment"
+    if download_name:
+        response.headers.set("Content-Disposition", disposition, filename=download_name)
+    elif disposition == "attachment":
+        response.headers["Content-Disposition"] = disposition
+    response.headers["X-Content-Type-Options"] = "nosniff"
+
+
+def send_blob(store, key, download_name=None, sendfile=MEDIA_SENDFILE):
+    """Response for one blob with ETag, Range and conditional GET support."""
+    blob = store.info(key)
+    if not blob:
+        abort(404)
+    mimetype = blob.get("content_type", "application/octet-stream")
+    download_name = secure_filename(download_name) if download_name else None
+    path = store.backend.file_path(key)
+
+    if path and sendfile == "x-accel":
+        response = Response(mimetype=mimetype)
+        root = getattr(store.backend, "root", os.path.dirname(path))
+        response.headers["X-Accel-Redirect"] = MEDIA_ACCEL_PREFIX + os.path.relpath(path, root).replace(os.sep, "/")
+        _disposition(response, mimetype, download_name)
+        # nginx answers Range itself; only revalidation is handled here
+        return _cache_forever(response, key).make_conditional(request.environ)
+
+    if path:
+        response = send_file(
+            path, request.environ, mimetype=mimetype,
+            conditional=False, etag=False, use_x_sendfile=sendfile == "x-sendfile"
+        )
+    else:
+        response = Response(
+            wrap_file(request.environ, store.open(key)), mimetype=mimetype, direct_passthrough=True
+        )
+        response.content_length = blob["size"]
+    _disposition(response, mimetype, download_name)
+
+    # With X-Sendfile the body never passes through here, so ranges are left to the server
+    offloaded = "X-Sendfile" in response.headers
+    response = _cache_forever(response, key)
+    response = response.make_conditional(
+        request.environ, accept_ranges=not offloaded, complete_length=None if offloaded else blob["size"]
+    )
+    if response.status_code == 304:
+        response.headers.pop("X-Sendfile", None)
+    return response
@@ -0,0 +1,287 @@
+"""Per-route latency, Mongo query, Socket.IO event and LLM client metrics.
+
+``init_app`` times every request and attributes the Mongo commands it ran
+(counted by a pymongo ``CommandListener``) to its route, so a page that
+issues 40 queries shows up next to the one that issues 2. Objects that
+keep their own counters, like the LLMClient, are read at scrape time
+through ``register``. Everything is kept in in-process histograms and
+served as Prometheus text at
+``/metrics?token=<METRICS_TOKEN>``; with no ``METRICS_TOKEN`` set the route
+answers 404.
+"""
+import functools
+import hmac
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, g, has_request_context, request
+from pymongo import monitoring
+
+from utils.logs import log_event
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+MONGO_QUERY_WARN = int(os.getenv("MONGO_QUERY_WARN", "25"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+DOC_BUCKETS = (0, 1, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        slot = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            if slot < len(self.buckets):
+                series[slot] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _labels(self.labels + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + ('+Inf',))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = dict(self.series)
+        lines += [f"{self.name}{_labels(self.labels, labels)} {value}" for labels, value in sorted(series.items())]
+        return lines
+
+
+class Collected:
+    """Series read from ``collect()`` at scrape time, for counters another object already keeps.
+
+    ``collect`` returns ``{label values: value}``.
+    """
+
+    def __init__(self, name, help_text, kind, collect, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.collect = collect
+        self.labels = labels
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_labels(self.labels, labels)} {value}"
+                  for labels, value in sorted(self.collect().items()) if value is not None]
+        return lines
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("route", "method", "status"))
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("command", "collection"))
+mongo_queries_per_request = Histogram(
+    "mongo_queries_per_request", "Mongo commands issued per request", ("route",), COUNT_BUCKETS)
+mongo_docs_per_request = Histogram(
+    "mongo_docs_returned_per_request", "Documents returned to the app per request", ("route",), DOC_BUCKETS)
+mongo_command_failures = Counter(
+    "mongo_command_failures_total", "Mongo commands that failed", ("command", "collection"))
+socketio_event_duration = Histogram(
+    "socketio_event_duration_seconds", "Socket.IO handler latency", ("event",))
+
+METRICS = [http_request_duration, mongo_command_duration, mongo_queries_per_request,
+           mongo_docs_per_request, mongo_command_failures, socketio_event_duration]
+
+LLM_COUNTERS = ("requests", "cache_hits", "coalesced", "upstream_calls", "retries", "errors")
+LLM_QUANTILES = (("0.5", "latency_p50_ms"), ("0.95", "latency_p95_ms"), ("0.99", "latency_p99_ms"))
+
+
+def register(metric):
+    """Serve ``metric`` (anything with ``render()``) at /metrics too."""
+    METRICS.append(metric)
+
+
+def register_llm_client(client):
+    """Export ``client.metrics()``: call counts by outcome and upstream latency quantiles."""
+    register(Collected(
+        "llm_client_calls_total", "LLM client calls, cache hits, coalesced waits, retries and errors", "counter",
+        lambda: {(name,): value for name, value in client.metrics().items() if name in LLM_COUNTERS}, ("event",)))
+
+    def latency():
+        metrics = client.metrics()
+        return {(q,): None if metrics[key] is None else metrics[key] / 1000 for q, key in LLM_QUANTILES}
+    register(Collected("llm_upstream_latency_seconds", "Upstream LLM call latency over the recent calls",
+                       "gauge", latency, ("quantile",)))
+
+
+class RequestStats:
+    """The Mongo work done by one request, kept on ``flask.g``.
+
+    ``g`` belongs to the request context, so requests sharing one OS thread
+    (greenlets on the eventlet hub) each count only their own commands.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.docs = 0
+
+
+def current_stats():
+    """The running request's RequestStats, or None outside a request."""
+    return g.get("mongo_stats") if has_request_context() else None
+
+
+def _returned_docs(reply):
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    # count/distinct/write replies
+    return reply.get("n", 0) if isinstance(reply.get("n"), int) else 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every Mongo command and charges it to the current request."""
+
+    def __init__(self):
+        self.pending = {}  # (connection, request_id) -> collection
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event):
+        with self.lock:
+            collection = self.pending.pop((event.connection_id, event.request_id), "")
+        stats = current_stats()
+        if stats is not None:
+            stats.queries += 1
+        return collection, stats
+
+    def succeeded(self, event):
+        collection, stats = self._finish(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+        if stats is not None:
+            stats.docs += _returned_docs(event.reply)
+
+    def failed(self, event):
+        collection, _ = self._finish(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+        mongo_command_failures.inc(event.command_name, collection)
+        log_event("mongo_command_failed", logging.WARNING, command=event.command_name,
+                  collection=collection, failure=event.failure)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def init_app(app):
+    """Time every request and serve the collected metrics at ``/metrics``."""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.mongo_stats = RequestStats()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        stats = g.pop("mongo_stats")
+        queries, docs = stats.queries, stats.docs
+        route = _route()
+        http_request_duration.observe(elapsed, route, request.method, response.status_code)
+        mongo_queries_per_request.observe(queries, route)
+        mongo_docs_per_request.observe(docs, route)
+        if queries > MONGO_QUERY_WARN or elapsed > SLOW_REQUEST_SECONDS:
+            log_event("slow_request", logging.WARNING, route=route, method=request.method,
+                      status=response.status_code, ms=round(elapsed * 1000, 1), queries=queries, docs=docs)
+        return response
+
+    @app.teardown_request
+    def record_error(error):
+        # after_request is skipped when the view raised
+        started = g.pop("request_started", None)
+        if started is None:
+            return
+        g.pop("mongo_stats", None)
+        http_request_duration.observe(time.perf_counter() - started, _route(), request.method, 500)
+
+    @app.route("/metrics")
+    def metrics():
+        # Closed unless a token is configured
+        if not METRICS_TOKEN or not hmac.compare_digest(request.args.get("token", "").encode(), METRICS_TOKEN.encode()):
+            abort(404)
+        lines = []
+        for metric in METRICS:
+            lines += metric.render()
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def timed_event(event):
+    """Record a Socket.IO handler's latency under ``event``; works on sync and async handlers."""
+
+    def decorator(handler):
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await handler(*args, **kwargs)
+                finally:
+                    socketio_event_duration.observe(time.perf_counter() - started, event)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                socketio_event_duration.observe(time.perf_counter() - started, event)
+        return wrapper
+    return decorator
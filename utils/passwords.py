@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+from utils.green import on_eventlet_hub, sleep
+from utils.logs import log_event
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "4"))
+# Hashes queued or running at once; beyond this logins are turned away
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+PASSWORD_QUEUE_TIMEOUT = 2  # seconds to wait for a free slot
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(PASSWORD_MAX_PENDING)
+
+
+def _acquire_slot(green):
+    if not green:
+        return _slots.acquire(timeout=PASSWORD_QUEUE_TIMEOUT)
+    # A blocking acquire would stop the greenlets that release the slots
+    deadline = time.monotonic() + PASSWORD_QUEUE_TIMEOUT
+    while not _slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            return False
+        sleep(0.01, green)
+    return True
+
+
+def _offload(fn, *args):
+    """Run CPU-bound bcrypt work on a real OS thread and wait for the result.
+
+    On an eventlet hub the wait must be green (``socketio.run`` does not
+    monkey-patch), so eventlet's tpool is used; anywhere else (ASGI worker
+    threads, background threads) a plain pool.
+    """
+    green = on_eventlet_hub()
+    if not _acquire_slot(green):
+        raise HashingBusy("Too many sign-ins in progress, try again shortly")
+    try:
+        if green:
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        return _pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+
+
+def hash_password(password, rounds=None):
+    return _offload(_hash, password, rounds or BCRYPT_ROUNDS)
+
+
+def check_password(password, hashed_password):
+    return _offload(bcrypt.checkpw, password.encode("utf-8"), hashed_password)
+
+
+def needs_rehash(hashed_password, rounds=None):
+    """True when the hash was made with a different work factor than configured."""
+    try:
+        cost = int(hashed_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != (rounds or BCRYPT_ROUNDS)
+
+
+def rehash_in_background(users_collection, user_id, password):
+    """Re-hash at the current work factor after a successful login, off the request."""
+    def rehash():
+        try:
+            hashed = hash_password(password)
+            users_collection.update_one({"_id": user_id}, {"$set": {"hashed_password": hashed}})
+        except Exception as e:
+            log_event("password_rehash_failed", logging.ERROR, user_id=user_id, error=e)
+
+    threading.Thread(target=rehash, daemon=True).start()
@@ -0,0 +1,75 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_text_cache")
+# Documents with more pages than this are split across the process pool
+PDF_PARALLEL_PAGES = 8
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+_pool = None
+
+
+class PDFTooLarge(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_pdf_pages(pdf_path, start=0, stop=None):
+    """Yield the text of each page without building the whole string."""
+    with open(pdf_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages[start:stop]:
+            yield page.extract_text() or ""
+
+
+def _extract_range(pdf_path, start, stop):
+    return "".join(iter_pdf_pages(pdf_path, start, stop))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+
+def _extract(pdf_path, max_pages):
+    with open(pdf_path, "rb") as file:
+        page_count = min(len(PyPDF2.PdfReader(file).pages), max_pages)
+    if page_count <= PDF_PARALLEL_PAGES or PDF_WORKERS <= 1:
+        return _extract_range(pdf_path, 0, page_count)
+
+    chunk = -(-page_count // PDF_WORKERS)
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    futures = [_get_pool().submit(_extract_range, pdf_path, start, stop) for start, stop in ranges]
+    return "".join(future.result() for future in futures)
+
+
+def extract_text_from_pdf(pdf_path, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES):
+    """Extract a PDF's text, reusing the on-disk cache keyed by the file's SHA-256."""
+    if os.path.getsize(pdf_path) > max_bytes:
+        raise PDFTooLarge(f"PDF is larger than {max_bytes} bytes")
+
+    cache_path = os.path.join(PDF_CACHE_DIR, f"{file_sha256(pdf_path)}-{max_pages}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding="utf-8") as f:
+            return f.read()
+
+    text = _extract(pdf_path, max_pages)
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text
@@ -0,0 +1,140 @@
+"""Post creation: one insert per post, and a bulk import for many at once.
+
+The ``_id`` is generated here rather than by the server, so attachments
+are stored first and the finished document, Multimedia included, is
+written with a single ``insert_one``, stamped with the ``updated_at`` that
+search sync keys on. ``import_posts`` builds many documents and writes
+them with unordered ``insert_many`` batches, so one bad item does not stop
+the rest; each item gets its own result.
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from utils.render_cache import render_content
+from utils.skill_index import normalize_skills
+from utils.storage import save_upload
+
+IMPORT_MAX_POSTS = 500
+IMPORT_BATCH = 100
+
+
+def split_skills(skills):
+    """Accept a comma-separated string or a list; returns the list as entered."""
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return [skill for skill in (skills or []) if isinstance(skill, str) and skill.strip()]
+
+
+def client_post(fields, uid):
+    """A client job post from form or JSON ``fields``."""
+    skills = split_skills(fields.get("skills_required"))
+    content = fields.get("description")
+    return {
+        "_id": ObjectId(),
+        "Title": fields.get("title"),
+        "Content": content,
+        "Content_html": render_content(content),
+        "Location": fields.get("location"),
+        "Budget": fields.get("budget"),
+        "Multimedia": [],
+        "comment_count": 0,
+        "Skills": skills,
+        "skill_keys": sorted(normalize_skills(skills)),
+        "UID": uid,
+        "user_type": "client",
+    }
+
+
+def freelancer_post(fields, uid):
+    """A freelancer service post from form ``fields``."""
+    content = fields.get("description")
+    return {
+        "_id": ObjectId(),
+        "Title": fields.get("title"),
+        "Content": content,
+        "Content_html": render_content(content),
+        "Category": fields.get("category"),
+        "Location": fields.get("location"),
+        "Budget": fields.get("budget"),
+        "Delivery_time": fields.get("delivery_time"),
+        "Skills_required": split_skills(fields.get("skills_required")),
+        "Multimedia": [],
+        "comment_count": 0,
+        "UID": uid,
+        "user_type": "freelancer",
+    }
+
+
+def create_post(posts_collection, store, post, uploads=()):
+    """Store ``uploads`` (werkzeug FileStorage) as the post's attachments, then insert it once.
+
+    If the insert fails the attachments are released again.
+    """
+    for upload in uploads:
+        post["Multimedia"].append(save_upload(store, upload))
+    post["updated_at"] = datetime.now(timezone.utc)
+    try:
+        posts_collection.insert_one(post)
+    except Exception:
+        for attachment in post["Multimedia"]:
+            store.release(attachment["key"])
+        raise
+    return post
+
+
+def validate_post(fields):
+    """Return why ``fields`` cannot become a post, or None."""
+    if not isinstance(fields, dict):
+        return "Expected an object"
+    for name in ("title", "description"):
+        value = fields.get(name)
+        if not isinstance(value, str) or not value.strip():
+            return f"Missing {name}"
+    # Optional, but stored as given, so a wrong type would reach search and matching
+    if fields.get("location") is not None and not isinstance(fields["location"], str):
+        return "location must be a string"
+    budget = fields.get("budget")
+    if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (str, int, float))):
+        return "budget must be a number or a string"
+    skills = fields.get("skills_required")
+    if skills is not None and not isinstance(skills, str) and (
+            not isinstance(skills, list) or not all(isinstance(skill, str) for skill in skills)):
+        return "skills_required must be a string or a list of strings"
+    return None
+
+
+def import_posts(posts_collection, items, build):
+    """Insert ``build(item)`` for every valid item with unordered ``insert_many``.
+
+    Returns ``(posts, results)``: the inserted documents and one
+    ``{"index", "ok", "post_id" | "error"}`` result per item, in input order.
+    """
+    results = [None] * len(items)
+    pending = []  # (item index, document)
+    for i, item in enumerate(items):
+        error = validate_post(item)
+        if error:
+            results[i] = {"index": i, "ok": False, "error": error}
+        else:
+            pending.append((i, build(item)))
+
+    inserted = []
+    for start in range(0, len(pending), IMPORT_BATCH):
+        batch = pending[start:start + IMPORT_BATCH]
+        failed = {}
+        now = datetime.now(timezone.utc)
+        for _, doc in batch:
+            doc["updated_at"] = now
+        try:
+            posts_collection.insert_many([doc for _, doc in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+        for position, (i, doc) in enumerate(batch):
+            if position in failed:
+                results[i] = {"index": i, "ok": False, "error": failed[position]}
+            else:
+                results[i] = {"index": i, "ok": True, "post_id": str(doc["_id"])}
+                inserted.append(doc)
+    return inserted, results
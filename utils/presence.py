@@ -0,0 +1,190 @@
+"""Who is online and who is typing, broadcast in coalesced batches.
+
+Each worker keeps an in-memory map of its own Socket.IO connections
+(uid -> sids). Changes are not broadcast as they happen. Every
+``PRESENCE_INTERVAL`` seconds ``flush`` compares the current state with
+what was last sent and returns at most one ``presence`` batch and one
+``room_activity`` batch per active room. However often a user reconnects,
+joins rooms or types, the broadcast rate stays bounded by the interval.
+
+Online/offline changes go to one room per user, ``presence_room(uid)``,
+which the pages showing that user join through ``watch_presence``; a
+watcher only hears about the users it shows.
+
+Workers share their maps through the Socket.IO backend itself. Every
+flush emits this worker's connection changes to ``SYNC_ROOM``, which no
+client joins, and ``attach`` registers with the client manager (a
+utils.socket_queue ObservedManager) so that emits published by other
+workers update this worker's view of them. A full snapshot goes out every
+``PRESENCE_SNAPSHOT_INTERVAL`` seconds, and immediately when a new worker
+appears. A worker that stops sending is forgotten after three intervals.
+Only the live worker with the lowest id announces online/offline changes
+to clients, so a user connected to two workers never flickers.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+PRESENCE_INTERVAL = float(os.getenv("PRESENCE_INTERVAL", "1.0"))  # seconds
+PRESENCE_SNAPSHOT_INTERVAL = 10  # seconds
+TYPING_TTL = 5  # seconds a typing signal lasts without a refresh
+PRESENCE_MAX_WATCHED = 200  # uids one watch_presence call can subscribe to
+SYNC_ROOM = "presence:sync"
+SYNC_EVENT = "presence_sync"
+
+
+def presence_room(uid):
+    return f"presence:{uid}"
+
+
+def watched_uids(uids):
+    """The uids a ``watch_presence`` call subscribes to, capped at ``PRESENCE_MAX_WATCHED``."""
+    if not isinstance(uids, list):
+        return []
+    return list(dict.fromkeys(str(uid) for uid in uids))[:PRESENCE_MAX_WATCHED]
+
+
+class Presence:
+    def __init__(self, worker_id=None, snapshot_interval=PRESENCE_SNAPSHOT_INTERVAL, typing_ttl=TYPING_TTL):
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.snapshot_interval = snapshot_interval
+        self.typing_ttl = typing_ttl
+        self.connections = {}  # sid -> uid
+        self.local = defaultdict(set)  # uid -> sids on this worker
+        self.remote = {}  # worker id -> [uids, last heard]
+        self.synced = set()  # local uids as last sent to the other workers
+        self.announced = set()  # online uids as last announced to clients
+        self.typists = {}  # (room, name) -> [expires at, announced at]
+        self.stopped = set()  # (room, name)
+        self.room_changes = defaultdict(dict)  # room -> {name: "joined" | "left"}
+        self.last_snapshot = 0.0
+        self.lock = threading.Lock()
+
+    def connect(self, sid, uid):
+        if not uid:
+            return
+        with self.lock:
+            self.connections[sid] = uid
+            self.local[uid].add(sid)
+
+    def disconnect(self, sid):
+        with self.lock:
+            uid = self.connections.pop(sid, None)
+            if uid is not None:
+                self.local[uid].discard(sid)
+                if not self.local[uid]:
+                    del self.local[uid]
+
+    def _live_remote(self, now):
+        stale = now - 3 * self.snapshot_interval
+        return {worker: entry[0] for worker, entry in self.remote.items() if entry[1] >= stale}
+
+    def online(self, uids):
+        """The subset of ``uids`` connected to any worker."""
+        now = time.monotonic()
+        with self.lock:
+            everywhere = set(self.local).union(*self._live_remote(now).values())
+        return {str(uid) for uid in uids if str(uid) in everywhere}
+
+    def typing(self, room, name, active=True):
+        if not room or not name:
+            return
+        key = (room, name)
+        with self.lock:
+            if active:
+                entry = self.typists.setdefault(key, [0.0, None])
+                entry[0] = time.monotonic() + self.typing_ttl
+                self.stopped.discard(key)
+            else:
+                entry = self.typists.pop(key, None)
+                if entry is not None and entry[1] is not None:
+                    self.stopped.add(key)
+
+    def room_change(self, room, name, change):
+        """Record that ``name`` ``"joined"`` or ``"left"`` ``room``; the latest change wins."""
+        if room and name:
+            with self.lock:
+                self.room_changes[room][name] = change
+
+    def apply_sync(self, payload):
+        """Merge another worker's sync batch into the remote view."""
+        worker = payload.get("worker")
+        if not worker or worker == self.worker_id:
+            return
+        now = time.monotonic()
+        with self.lock:
+            entry = self.remote.get(worker)
+            if entry is None:
+                entry = self.remote[worker] = [set(), now]
+                self.last_snapshot = 0.0  # introduce ourselves on the next flush
+            if payload.get("snapshot"):
+                entry[0] = set(payload.get("online", ()))
+            else:
+                entry[0] |= set(payload.get("online", ()))
+                entry[0] -= set(payload.get("offline", ()))
+            entry[1] = now
+
+    def flush(self):
+        """Everything to broadcast since the last flush, as ``[(event, payload, room)]``."""
+        now = time.monotonic()
+        batches = []
+        with self.lock:
+            local = set(self.local)
+            if now - self.last_snapshot >= self.snapshot_interval:
+                self.last_snapshot = now
+                batches.append((SYNC_EVENT, {"worker": self.worker_id, "snapshot": True, "online": sorted(local)},
+                                SYNC_ROOM))
+            elif local != self.synced:
+                batches.append((SYNC_EVENT, {"worker": self.worker_id, "online": sorted(local - self.synced),
+                                             "offline": sorted(self.synced - local)}, SYNC_ROOM))
+            self.synced = local
+
+            remote = self._live_remote(now)
+            for worker in set(self.remote) - set(remote):
+                del self.remote[worker]
+            if self.worker_id <= min(remote, default=self.worker_id):
+                everywhere = local.union(*remote.values())
+                for uid in sorted(everywhere - self.announced):
+                    batches.append(("presence", {"online": [uid], "offline": []}, presence_room(uid)))
+                for uid in sorted(self.announced - everywhere):
+                    batches.append(("presence", {"online": [], "offline": [uid]}, presence_room(uid)))
+                self.announced = everywhere
+            else:
+                self.announced = set()  # whoever leads now owns the announcements
+
+            rooms = defaultdict(lambda: {"typing": [], "stopped": [], "joined": [], "left": []})
+            for (room, name), entry in list(self.typists.items()):
+                if entry[0] <= now:
+                    del self.typists[(room, name)]
+                    rooms[room]["stopped"].append(name)
+                elif entry[1] is None or now - entry[1] >= self.typing_ttl / 2:
+                    # Re-announced before the clients' copy expires
+                    entry[1] = now
+                    rooms[room]["typing"].append(name)
+            for room, name in self.stopped:
+                rooms[room]["stopped"].append(name)
+            self.stopped = set()
+            for room, changes in self.room_changes.items():
+                for name, change in changes.items():
+                    rooms[room][change].append(name)
+            self.room_changes.clear()
+
+        for room, activity in sorted(rooms.items()):
+            batches.append(("room_activity", dict({key: sorted(names) for key, names in activity.items()}, room=room),
+                            room))
+        return batches
+
+    def attach(self, manager):
+        """Hear other workers' sync batches through the Socket.IO client ``manager``.
+
+        A single worker with no message queue has nothing to hear, and the
+        manager is left alone.
+        """
+        if hasattr(manager, "observe"):
+            manager.observe(self._observe)
+
+    def _observe(self, event, data, room):
+        if event == SYNC_EVENT and room == SYNC_ROOM and isinstance(data, dict):
+            self.apply_sync(data)
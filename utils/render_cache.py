@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.utils import convert_lists_to_html
+
+RENDER_CACHE_SIZE = 4096
+RENDER_CACHE_TTL = 60  # seconds; bounds how long another worker's edit can go unseen
+BACKFILL_BATCH_SIZE = 500
+
+# post id -> (expires at, rendered Content HTML), most recently used last
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+
+def render_content(content):
+    return convert_lists_to_html(content)
+
+
+def get_content_html(post):
+    """Return the HTML for a post's Content without re-rendering it per request.
+
+    Posts written since the render cache was introduced carry ``Content_html``,
+    which always wins, so an edit made on any worker shows up at once. Older
+    posts are rendered from ``Content`` and kept in the in-process LRU for
+    ``RENDER_CACHE_TTL`` seconds.
+    """
+    html = post.get("Content_html")
+    if html is not None:
+        return html
+
+    key = str(post["_id"])
+    now = time.monotonic()
+    with _render_lock:
+        entry = _render_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _render_cache.move_to_end(key)
+            return entry[1]
+
+    html = render_content(post.get("Content"))
+    with _render_lock:
+        _render_cache[key] = (now + RENDER_CACHE_TTL, html)
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return html
+
+
+def attach_content_html(collection, posts):
+    """Set each post's ``Content`` to its HTML, for posts fetched without ``Content``.
+
+    Only posts that predate ``Content_html`` need the raw text; it is read
+    for all of them in one query.
+    """
+    legacy = [post["_id"] for post in posts if post.get("Content_html") is None]
+    if legacy:
+        raw = {
+            str(doc["_id"]): doc.get("Content")
+            for doc in collection.find({"_id": {"$in": [ObjectId(pid) for pid in legacy]}}, {"Content": 1})
+        }
+        for post in posts:
+            if post.get("Content_html") is None:
+                post["Content"] = raw.get(str(post["_id"]))
+    for post in posts:
+        post["Content"] = get_content_html(post)
+        post.pop("Content_html", None)
+    return posts
+
+
+def invalidate(post_id):
+    with _render_lock:
+        _render_cache.pop(str(post_id), None)
+
+
+def update_post_content(collection, post_id, content):
+    """Edit a post's Content, keeping the stored and cached HTML in step."""
+    result = collection.update_one(
+        {"_id": ObjectId(post_id)},
+        {"$set": {"Content": content, "Content_html": render_content(content)},
+         "$currentDate": {"updated_at": True}}
+    )
+    invalidate(post_id)
+    return result
+
+
+def backfill_content_html(collection, batch_size=BACKFILL_BATCH_SIZE):
+    """Store Content_html on every post that was written before it existed."""
+    updated = 0
+    batch = []
+    cursor = collection.find({"Content_html": {"$exists": False}}, {"Content": 1})
+    for post in cursor:
+        batch.append(UpdateOne(
+            {"_id": post["_id"]},
+            {"$set": {"Content_html": render_content(post.get("Content"))}}
+        ))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    # Backfill existing posts: python -m utils.render_cache
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    client = MongoClient(os.getenv("CON_STR"))
+    count = backfill_content_html(client["freelanceconnect"]["posts"])
+    print(f"Rendered Content_html for {count} posts")
@@ -0,0 +1,158 @@
+"""Indexes the app relies on, and a check that every query it issues uses one.
+
+    python -m utils.schema           create any missing indexes
+    python -m utils.schema --check   create them, then explain() every query
+                                     shape and exit 1 if any is a COLLSCAN
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from utils.logs import log_event
+
+# collection -> [(keys, options)]
+INDEXES = {
+    "users": [
+        ([("email", ASCENDING)], {"unique": True}),
+        ([("username", ASCENDING)], {"unique": True}),
+        ([("user_type", ASCENDING)], {}),
+    ],
+    "posts": [
+        ([("UID", ASCENDING), ("_id", DESCENDING)], {}),
+        ([("user_type", ASCENDING)], {}),
+        ([("skill_keys", ASCENDING)], {}),
+        ([("updated_at", ASCENDING)], {}),
+    ],
+    "profile": [
+        ([("uid", ASCENDING)], {"unique": True}),
+    ],
+    "chatroom": [
+        ([("room_id", ASCENDING)], {"unique": True}),
+    ],
+    "messages": [
+        ([("room_id", ASCENDING), ("seq", ASCENDING)], {"unique": True}),
+    ],
+    "comments": [
+        ([("post_id", ASCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "skill_index": [
+        ([("skill", ASCENDING)], {"unique": True}),
+    ],
+    "matches": [
+        ([("post_id", ASCENDING), ("uid", ASCENDING)], {"unique": True}),
+        ([("post_id", ASCENDING), ("score", DESCENDING), ("uid", DESCENDING)], {}),
+        ([("uid", ASCENDING), ("score", DESCENDING), ("post_id", DESCENDING)], {}),
+    ],
+    "sessions": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "analysis_jobs": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "blobs": [
+        ([("refs", ASCENDING)], {}),
+        ([("content_type", ASCENDING)], {}),
+    ],
+}
+
+_sample_id = ObjectId()
+
+# One entry per query shape the app issues: (collection, filter, sort)
+QUERY_SHAPES = [
+    ("users", {"email": "someone@example.com"}, None),
+    ("users", {"username": "someone"}, None),
+    ("users", {"$or": [{"email": "someone@example.com"}, {"username": "someone"}]}, None),
+    ("users", {"_id": {"$in": [_sample_id]}}, None),
+    ("users", {"user_type": "client"}, None),
+    ("users", {"user_type": "freelancer", "skills.0": {"$exists": True}}, None),
+    ("users", {"user_type": "freelancer", "skills.0": {"$exists": True}, "_id": {"$in": [_sample_id]}}, None),
+    ("posts", {}, [("_id", DESCENDING)]),
+    ("posts", {"_id": {"$lt": _sample_id}}, [("_id", DESCENDING)]),
+    ("posts", {"_id": {"$gt": _sample_id}}, [("_id", ASCENDING)]),
+    ("posts", {"_id": {"$in": [_sample_id]}}, None),
+    ("posts", {"UID": str(_sample_id)}, None),
+    ("posts", {"user_type": "freelancer"}, None),
+    ("posts", {"user_type": "freelancer", "UID": {"$in": [str(_sample_id)]}}, None),
+    ("posts", {"updated_at": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("posts", {"user_type": "freelancer", "updated_at": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("posts", {"user_type": "freelancer", "updated_at": {"$exists": True}}, [("updated_at", DESCENDING)]),
+    ("profile", {"uid": str(_sample_id)}, None),
+    ("chatroom", {"room_id": str(_sample_id)}, None),
+    ("messages", {"room_id": str(_sample_id)}, [("seq", DESCENDING)]),
+    ("messages", {"room_id": str(_sample_id), "seq": {"$lt": 1}}, [("seq", DESCENDING)]),
+    ("comments", {"post_id": str(_sample_id)}, [("_id", DESCENDING)]),
+    ("comments", {"post_id": str(_sample_id), "_id": {"$lt": _sample_id}}, [("_id", DESCENDING)]),
+    ("skill_index", {"skill": {"$in": ["python", "flask"]}}, None),
+    ("posts", {"user_type": "client", "skill_keys": {"$in": ["python", "flask"]}}, None),
+    ("matches", {"post_id": str(_sample_id)}, [("score", DESCENDING), ("uid", DESCENDING)]),
+    ("matches", {"uid": str(_sample_id)}, [("score", DESCENDING), ("post_id", DESCENDING)]),
+    ("matches", {"uid": str(_sample_id), "post_id": {"$in": [str(_sample_id)]}}, None),
+    ("sessions", {"_id": "session-id"}, None),
+    ("analysis_jobs", {"_id": "job-id"}, None),
+    ("counters", {"_id": "chat_writer"}, None),
+    ("blobs", {"refs": {"$lte": 0}, "gc_pending": {"$exists": False}}, None),
+    ("blobs", {"refs": {"$lte": 0}, "gc_pending": "marked"}, None),
+    ("blobs", {"content_type": {"$in": ["image/png", "image/jpeg"]}, "variants": {"$exists": False},
+               "variant": {"$ne": True}}, None),
+]
+
+
+def apply_indexes(db):
+    """Create every declared index; safe to run on each boot."""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. existing duplicates block a unique index; keep booting
+                log_event("index_failed", logging.WARNING, collection=collection, keys=keys, error=e)
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def check_query_plans(db):
+    """Return ``[(collection, filter, stages)]`` for every shape that scans a collection."""
+    failures = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_stages(cursor.explain().get("queryPlanner", {}).get("winningPlan", {})))
+        if "COLLSCAN" in stages:
+            failures.append((collection, query, stages))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create indexes and check query plans")
+    parser.add_argument("--check", action="store_true", help="fail if any query shape does a COLLSCAN")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    apply_indexes(db)
+    print("Indexes applied")
+    if args.check:
+        failures = check_query_plans(db)
+        for collection, query, stages in failures:
+            print(f"COLLSCAN: {collection}.find({query}) -> {stages}")
+        print(f"{len(QUERY_SHAPES) - len(failures)}/{len(QUERY_SHAPES)} query shapes use an index")
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,219 @@
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta, timezone
+
+from utils.logs import log_event
+
+SEARCH_PAGE_SIZE = 10
+SEARCH_PROJECTION = {
+    "Title": 1, "Content": 1, "Skills": 1, "Skills_required": 1,
+    "Location": 1, "Category": 1, "Budget": 1, "updated_at": 1,
+}
+SEARCH_SYNC_INTERVAL = float(os.getenv("SEARCH_SYNC_INTERVAL", "2"))  # seconds
+# Posts are stamped before their insert lands, so each sync re-reads this far back
+SEARCH_SYNC_OVERLAP = timedelta(minutes=5)
+SEARCH_RECONCILE_INTERVAL = 300  # seconds between sweeps for deleted posts
+
+# Field weights: a hit in the title counts more than one in the description
+FIELD_WEIGHTS = {
+    "Title": 3,
+    "Skills": 2,
+    "Skills_required": 2,
+    "Category": 2,
+    "Location": 1,
+    "Content": 1,
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text):
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(item) for item in text)
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def _version(updated_at):
+    # Mongo hands back naive UTC to the millisecond; match what it would store
+    if updated_at is None or updated_at.tzinfo is None and updated_at.microsecond % 1000 == 0:
+        return updated_at
+    if updated_at.tzinfo is not None:
+        updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return updated_at.replace(microsecond=updated_at.microsecond // 1000 * 1000)
+
+
+def parse_budget(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SearchIndex:
+    """In-process BM25 index over the searchable fields of every post.
+
+    ``sync`` fills the index from Mongo on first call and afterwards reads
+    only posts whose ``updated_at`` is within ``SEARCH_SYNC_OVERLAP`` of the
+    newest one seen, so posts written by other workers, late inserts and
+    edits are all picked up; an edited post is re-indexed. ``reconcile``
+    drops posts that no longer exist. ``start`` runs both on a background
+    thread, so no request ever waits for the index to load.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc index: weighted tf}
+        self.doc_ids = []  # None once the post is removed
+        self.doc_terms = []
+        self.doc_lengths = []
+        self.budgets = []
+        self.locations = []
+        self.positions = {}  # post id -> doc index
+        self.versions = {}  # post id -> updated_at as indexed
+        self.live = 0
+        self.total_length = 0
+        self.watermark = None  # newest updated_at seen
+        self.loaded = False
+        self._norms = None  # per-doc BM25 length normalisation, rebuilt after changes
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self.live
+
+    def add_post(self, post):
+        """Index ``post``; a newer version of an indexed post replaces it."""
+        post_id = str(post["_id"])
+        version = _version(post.get("updated_at"))
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(post.get(field)):
+                terms[token] += weight
+
+        with self.lock:
+            if post_id in self.positions:
+                if version is None or version == self.versions.get(post_id):
+                    return
+                self._remove(post_id)
+            doc = len(self.doc_ids)
+            self.positions[post_id] = doc
+            self.versions[post_id] = version
+            self.doc_ids.append(post_id)
+            self.doc_terms.append(list(terms))
+            self.budgets.append(parse_budget(post.get("Budget")))
+            self.locations.append((post.get("Location") or "").lower())
+            length = sum(terms.values())
+            self.doc_lengths.append(length)
+            self.total_length += length
+            self.live += 1
+            for term, tf in terms.items():
+                self.postings[term][doc] = tf
+            self._norms = None
+
+    def remove_post(self, post_id):
+        with self.lock:
+            if str(post_id) in self.positions:
+                self._remove(str(post_id))
+
+    def _remove(self, post_id):
+        doc = self.positions.pop(post_id)
+        self.versions.pop(post_id, None)
+        for term in self.doc_terms[doc]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths[doc]
+        self.doc_ids[doc], self.doc_terms[doc], self.doc_lengths[doc] = None, [], 0
+        self.live -= 1
+        self._norms = None
+
+    def sync(self, collection):
+        query = {}
+        if self.loaded:
+            if self.watermark is None:
+                query = {"updated_at": {"$exists": True}}
+            else:
+                query = {"updated_at": {"$gte": self.watermark - SEARCH_SYNC_OVERLAP}}
+        for post in collection.find(query, SEARCH_PROJECTION):
+            self.add_post(post)
+            updated_at = post.get("updated_at")
+            if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+        self.loaded = True
+
+    def reconcile(self, collection):
+        """Drop indexed posts that have been deleted from ``collection``."""
+        with self.lock:
+            known = set(self.positions)
+        existing = {str(doc["_id"]) for doc in collection.find({}, {"_id": 1})}
+        with self.lock:
+            for post_id in known - existing:
+                if post_id in self.positions:
+                    self._remove(post_id)
+
+    def start(self, collection, interval=SEARCH_SYNC_INTERVAL, reconcile_interval=SEARCH_RECONCILE_INTERVAL):
+        """Load the index and keep it in sync on a daemon thread."""
+        def run():
+            last_reconcile = time.monotonic()
+            while True:
+                try:
+                    self.sync(collection)
+                    if time.monotonic() - last_reconcile >= reconcile_interval:
+                        last_reconcile = time.monotonic()
+                        self.reconcile(collection)
+                except Exception as e:
+                    log_event("search_sync_failed", logging.WARNING, error=e)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="search-sync", daemon=True)
+        thread.start()
+        return thread
+
+    def _matches_filters(self, doc, min_budget, max_budget, location):
+        budget = self.budgets[doc]
+        if min_budget is not None and (budget is None or budget < min_budget):
+            return False
+        if max_budget is not None and (budget is None or budget > max_budget):
+            return False
+        if location and location not in self.locations[doc]:
+            return False
+        return True
+
+    def search(self, query, page=1, per_page=SEARCH_PAGE_SIZE,
+               min_budget=None, max_budget=None, location=None):
+        """Return ``(post ids for the page, total number of hits)``."""
+        terms = set(tokenize(query))
+        location = (location or "").strip().lower()
+        with self.lock:
+            n_docs = self.live
+            if not terms or not n_docs:
+                return [], 0
+            if self._norms is None:
+                avg_length = self.total_length / n_docs or 1
+                self._norms = [self.k1 * (1 - self.b + self.b * length / avg_length)
+                               for length in self.doc_lengths]
+            norms = self._norms
+            k1_plus_1 = self.k1 + 1
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    scores[doc] += idf * tf * k1_plus_1 / (tf + norms[doc])
+
+            hits = [doc for doc in scores if self._matches_filters(doc, min_budget, max_budget, location)]
+            start = (max(page, 1) - 1) * per_page
+            top = heapq.nlargest(start + per_page, hits, key=scores.__getitem__)
+            return [self.doc_ids[doc] for doc in top[start:]], len(hits)
@@ -0,0 +1,228 @@
+"""Server-side sessions: the cookie carries only a signed session id.
+
+Session data lives in a ``SessionStore``. ``TieredSessionStore`` puts a
+per-process LRU in front of the ``sessions`` collection, so most requests
+never leave the process. The Mongo tier is the source of truth; the LRU
+holds entries for at most ``SESSION_LRU_TTL`` seconds, so a logout on one
+worker reaches the others within that window.
+
+A Socket.IO connection keeps one WSGI environ for all of its events, so
+the opened session is remembered there and looked up once per connection
+instead of once per event.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 60 * 60)))  # seconds
+SESSION_LRU_SIZE = 10000
+SESSION_LRU_TTL = 30  # seconds
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "tiered")  # tiered, mongo or memory
+ENVIRON_KEY = "freelanceconnect.session"
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+        self.replaced_sid = None  # deleted from the store on save
+
+    def regenerate(self):
+        """Move to a fresh session id, dropping the old one on save.
+
+        Call whenever privileges change (login), so an id planted or seen
+        before then never carries the new identity.
+        """
+        if not self.new and self.replaced_sid is None:
+            self.replaced_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class MemorySessionStore:
+    """LRU of sid -> session; entries are dropped after ``ttl`` seconds even if the session lives on."""
+
+    def __init__(self, maxsize=SESSION_LRU_SIZE, ttl=SESSION_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # sid -> (evict_at, expires_at, data)
+        self.lock = threading.Lock()
+
+    def get(self, sid):
+        with self.lock:
+            entry = self.entries.get(sid)
+            if entry is None:
+                return None
+            if min(entry[0], entry[1]) < time.time():
+                del self.entries[sid]
+                return None
+            self.entries.move_to_end(sid)
+            return entry[1], entry[2]
+
+    def set(self, sid, data, expires_at):
+        with self.lock:
+            self.entries[sid] = (time.time() + self.ttl, expires_at, data)
+            self.entries.move_to_end(sid)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self.lock:
+            self.entries.pop(sid, None)
+
+
+def _mongo_entry(doc):
+    if not doc:
+        return None
+    expires_at = doc["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+    # The TTL monitor only runs once a minute, so check expiry here too
+    if expires_at < time.time():
+        return None
+    return expires_at, doc["data"]
+
+
+class MongoSessionStore:
+    """One document per session; a TTL index on ``expires_at`` reaps old ones."""
+
+    def __init__(self, sessions_collection):
+        self.sessions_collection = sessions_collection
+
+    def get(self, sid):
+        return _mongo_entry(self.sessions_collection.find_one({"_id": sid}))
+
+    def set(self, sid, data, expires_at):
+        self.sessions_collection.replace_one(
+            {"_id": sid},
+            {"data": data, "expires_at": datetime.fromtimestamp(expires_at, timezone.utc)},
+            upsert=True
+        )
+
+    def delete(self, sid):
+        self.sessions_collection.delete_one({"_id": sid})
+
+
+class TieredSessionStore:
+    def __init__(self, sessions_collection):
+        self.memory = MemorySessionStore(ttl=SESSION_LRU_TTL)
+        self.mongo = MongoSessionStore(sessions_collection)
+
+    def get(self, sid):
+        entry = self.memory.get(sid)
+        if entry is not None:
+            return entry
+        entry = self.mongo.get(sid)
+        if entry is not None:
+            self.memory.set(sid, entry[1], entry[0])
+        return entry
+
+    def set(self, sid, data, expires_at):
+        self.mongo.set(sid, data, expires_at)
+        self.memory.set(sid, data, expires_at)
+
+    def delete(self, sid):
+        self.memory.delete(sid)
+        self.mongo.delete(sid)
+
+
+async def fetch_session(store, sessions_collection, sid):
+    """``store.get(sid)`` for the asyncio server, reading Mongo through the Motor ``sessions_collection``."""
+    memory = store if isinstance(store, MemorySessionStore) else getattr(store, "memory", None)
+    if memory is not None:
+        entry = memory.get(sid)
+        if entry is not None or memory is store:
+            return entry
+    entry = _mongo_entry(await sessions_collection.find_one({"_id": sid}))
+    if entry is not None and memory is not None:
+        memory.set(sid, entry[1], entry[0])
+    return entry
+
+
+def session_store_from_env(sessions_collection):
+    """Build the store selected by ``SESSION_BACKEND``."""
+    if SESSION_BACKEND == "memory":
+        return MemorySessionStore()
+    if SESSION_BACKEND == "mongo":
+        return MongoSessionStore(sessions_collection)
+    return TieredSessionStore(sessions_collection)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store, ttl=SESSION_TTL):
+        self.store = store
+        self.ttl = ttl
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="freelanceconnect-session")
+
+    def session_id(self, app, cookie):
+        """The session id in a signed session cookie, or None."""
+        if not cookie:
+            return None
+        try:
+            return self._signer(app).unsign(cookie).decode()
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        cached = request.environ.get(ENVIRON_KEY)
+        if cached is not None:
+            return cached
+
+        session = None
+        sid = self.session_id(app, request.cookies.get(self.get_cookie_name(app)))
+        if sid:
+            entry = self.store.get(sid)
+            if entry is not None:
+                expires_at, data = entry
+                session = ServerSideSession(dict(data), sid=sid, expires_at=expires_at)
+        if session is None:
+            session = ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+        request.environ[ENVIRON_KEY] = session
+        return session
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced_sid:
+            self.store.delete(session.replaced_sid)
+            session.replaced_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        # Extend the expiry at most once per half TTL, not on every request
+        refresh = session.expires_at is None or session.expires_at - now < self.ttl / 2
+        if not (session.modified or refresh):
+            return
+        session.expires_at = now + self.ttl
+        self.store.set(session.sid, dict(session), session.expires_at)
+        session.modified = False
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
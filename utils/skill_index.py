@@ -0,0 +1,75 @@
+import os
+from collections import defaultdict
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+MATCH_TOP_K = 20
+MATCH_MAX_K = 100
+
+
+def normalize_skills(skills):
+    return {skill.strip().lower() for skill in skills or [] if skill and skill.strip()}
+
+
+def index_freelancer_skills(index_collection, users_collection, uid, skills):
+    """Add a freelancer's skills to the skill -> UIDs posting lists.
+
+    The same skills are also kept on the user document so /match can return
+    them with the single batched user lookup.
+    """
+    skills = normalize_skills(skills)
+    if not skills:
+        return
+    index_collection.bulk_write([
+        UpdateOne({"skill": skill}, {"$addToSet": {"uids": uid}}, upsert=True)
+        for skill in skills
+    ], ordered=False)
+    try:
+        users_collection.update_one(
+            {"_id": ObjectId(uid)},
+            {"$addToSet": {"skills": {"$each": sorted(skills)}}}
+        )
+    except InvalidId:
+        pass
+
+
+def match_freelancers(index_collection, required_skills, top_k=MATCH_TOP_K):
+    """Merge the posting lists of the required skills.
+
+    Returns up to ``top_k`` ``(uid, matched_skills)`` pairs, best match first.
+    Only the postings for the requested skills are read, so the cost follows
+    the number of matches rather than the number of freelancer posts.
+    """
+    required_skills = normalize_skills(required_skills)
+    matched = defaultdict(set)
+    for entry in index_collection.find({"skill": {"$in": list(required_skills)}}):
+        for uid in entry.get("uids", []):
+            matched[uid].add(entry["skill"])
+    ranked = sorted(matched.items(), key=lambda item: (-len(item[1]), item[0]))
+    return ranked[:top_k]
+
+
+def rebuild_skill_index(posts_collection, index_collection, users_collection):
+    """Build the index from scratch out of the existing freelancer posts."""
+    skills_by_uid = defaultdict(set)
+    for post in posts_collection.find({"user_type": "freelancer"}, {"UID": 1, "Skills_required": 1}):
+        skills_by_uid[str(post["UID"])] |= normalize_skills(post.get("Skills_required"))
+
+    index_collection.delete_many({})
+    for uid, skills in skills_by_uid.items():
+        index_freelancer_skills(index_collection, users_collection, uid, skills)
+    return len(skills_by_uid)
+
+
+if __name__ == "__main__":
+    # Rebuild the index for existing posts: python -m utils.skill_index
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.schema import apply_indexes
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    apply_indexes(db)
+    count = rebuild_skill_index(db["posts"], db["skill_index"], db["users"])
+    print(f"Indexed skills for {count} freelancers")
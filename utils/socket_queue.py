@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from urllib.parse import urlparse
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+from utils.local_broker import BrokerConnection, BROKER_PORT
+from utils.logs import log_event
+
+SOCKETIO_CHANNEL = "flask-socketio"
+
+
+class ObservedManager(socketio.Manager):
+    """Lets this process see every emit its client manager delivers, other workers' included.
+
+    Listed after a pub/sub manager class (``class M(RedisManager,
+    ObservedManager)``) it sits between that class and socketio.Manager, so
+    the emits relayed from other workers pass through ``emit`` here on their
+    way to local clients.
+    """
+
+    observers = ()
+
+    def observe(self, observer):
+        """Call ``observer(event, data, room)`` for each emit delivered by this worker."""
+        self.observers += (observer,)
+
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        for observer in self.observers:
+            observer(event, data, to or room)
+        return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs)
+
+
+class AsyncObservedManager(socketio.AsyncManager):
+    """ObservedManager for python-socketio's AsyncServer."""
+
+    observers = ()
+
+    def observe(self, observer):
+        self.observers += (observer,)
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        for observer in self.observers:
+            observer(event, data, to or room)
+        return await super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to,
+                                  **kwargs)
+
+
+def observed(manager_class, observed_class=ObservedManager):
+    """``manager_class`` with ``observed_class`` mixed in below it."""
+    return type(manager_class.__name__, (manager_class, observed_class), {})
+
+
+class LocalBrokerManager(socketio.PubSubManager, ObservedManager):
+    """Socket.IO client manager that shares events through utils.local_broker."""
+
+    name = "localbroker"
+
+    def __init__(self, url=f"local://127.0.0.1:{BROKER_PORT}", channel=SOCKETIO_CHANNEL,
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        parsed = urlparse(url)
+        self.connection = BrokerConnection(parsed.hostname or "127.0.0.1", parsed.port or BROKER_PORT)
+
+    def _publish(self, data):
+        self.connection.publish(self.channel, self.json.dumps(data))
+
+    def _listen(self):
+        yield from self.connection.subscribe(self.channel)
+
+
+class AsyncLocalBrokerManager(AsyncPubSubManager, AsyncObservedManager):
+    """LocalBrokerManager for python-socketio's AsyncServer, on asyncio streams."""
+
+    name = "asynclocalbroker"
+
+    def __init__(self, url=f"local://127.0.0.1:{BROKER_PORT}", channel=SOCKETIO_CHANNEL,
+                 write_only=False, logger=None, json=None, retry_sleep=1.0):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname or "127.0.0.1", parsed.port or BROKER_PORT
+        self.retry_sleep = retry_sleep
+        self.writer = None
+
+    async def _publish(self, data):
+        line = f"PUB {self.channel} {self.json.dumps(data)}\n".encode("utf-8")
+        for _ in range(2):
+            try:
+                if self.writer is None:
+                    _, self.writer = await asyncio.open_connection(self.host, self.port)
+                self.writer.write(line)
+                await self.writer.drain()
+                return
+            except OSError:
+                self.writer = None
+
+    async def _listen(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(f"SUB {self.channel}\n".encode("utf-8"))
+                await writer.drain()
+                while line := await reader.readline():
+                    _, _, rest = line.decode("utf-8").rstrip("\n").partition(" ")
+                    _, _, payload = rest.partition(" ")
+                    yield payload
+            except OSError as e:
+                log_event("local_broker_disconnected", logging.WARNING, error=e, retry_in=self.retry_sleep)
+            await asyncio.sleep(self.retry_sleep)
+
+
+def async_client_manager(url):
+    """The AsyncServer client manager for the message queue at ``url``, or None for a single worker."""
+    if not url:
+        return None
+    if url.startswith("local://"):
+        return AsyncLocalBrokerManager(url)
+    if url.startswith(("redis://", "rediss://")):
+        return observed(socketio.AsyncRedisManager, AsyncObservedManager)(url, channel=SOCKETIO_CHANNEL)
+    if url.startswith("amqp://"):
+        return observed(socketio.AsyncAioPikaManager, AsyncObservedManager)(url, channel=SOCKETIO_CHANNEL)
+    raise ValueError(f"No asyncio Socket.IO manager for {url}")
+
+
+def socketio_queue_options(url, write_only=False):
+    """SocketIO() keyword arguments for the message queue at ``url``.
+
+    ``local://host:port`` uses the in-repo broker; redis://, kafka://, zmq
+    and other (Kombu) URLs use the backends Flask-SocketIO would pick. Either
+    way the manager is an ObservedManager. No URL means a single worker with
+    no queue.
+    """
+    if not url:
+        return {}
+    if url.startswith("local://"):
+        return {"client_manager": LocalBrokerManager(url, write_only=write_only)}
+    if url.startswith(("redis://", "rediss://")):
+        manager_class = socketio.RedisManager
+    elif url.startswith("kafka://"):
+        manager_class = socketio.KafkaManager
+    elif url.startswith("zmq"):
+        manager_class = socketio.ZmqManager
+    else:
+        manager_class = socketio.KombuManager
+    return {"client_manager": observed(manager_class)(url, channel=SOCKETIO_CHANNEL, write_only=write_only)}
@@ -0,0 +1,277 @@
+"""Content-addressed blob storage for uploads.
+
+Every upload is streamed to the backend in chunks while its SHA-256 is
+computed; the hex digest is the blob's key, so identical files are stored
+once. A ``blobs`` collection keeps a reference count per key and
+``collect_garbage`` removes blobs nothing refers to any more.
+
+Collection is mark-then-sweep so it never races an upload of the same
+content: a blob is marked ``gc_pending``, moved to ``sweeping`` only while
+it is still unreferenced, and its record is deleted only if that still
+holds once the file is gone. A put that takes a reference while the blob
+is marked keeps it from being swept; one that arrives mid-sweep waits for
+the sweep to finish and writes the file again.
+
+    python -m utils.storage --gc   delete unreferenced blobs
+"""
+import argparse
+import hashlib
+import io
+import mimetypes
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import ReturnDocument
+
+from utils.green import sleep
+from utils.logs import log_event
+
+CHUNK_SIZE = 64 * 1024
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "fs")  # fs, s3 or memory
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", "blobs")
+S3_BUCKET = os.getenv("S3_BUCKET", "freelanceconnect")
+GC_SWEEP_WAIT = 30  # seconds a put waits for a sweep of its blob to finish
+GC_SWEEP_POLL = 0.05
+
+
+class FileSystemBackend:
+    """Blobs as files under ``root``, fanned out by the first bytes of the key."""
+
+    def __init__(self, root=STORAGE_ROOT):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def store(self, key, tmp_path):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def file_path(self, key):
+        return self.path(key)
+
+    @contextmanager
+    def local_path(self, key):
+        yield self.path(key)
+
+    def delete(self, key):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+
+class S3Backend:
+    """Blobs in an S3-compatible bucket through a boto3-style client.
+
+    Only ``put_object``, ``get_object``, ``head_object`` and
+    ``delete_object`` are used, so MinIO or ``InMemoryS3Client`` work too.
+    """
+
+    def __init__(self, client, bucket, prefix="blobs/"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _name(self, key):
+        return f"{self.prefix}{key}"
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._name(key))
+            return True
+        except Exception:
+            return False
+
+    def store(self, key, tmp_path):
+        try:
+            if not self.exists(key):
+                with open(tmp_path, "rb") as f:
+                    self.client.put_object(Bucket=self.bucket, Key=self._name(key), Body=f)
+        finally:
+            os.remove(tmp_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"]
+
+    def file_path(self, key):
+        # Not on local disk, so there is nothing to hand to the web server
+        return None
+
+    @contextmanager
+    def local_path(self, key):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as out, self.open(key) as body:
+                shutil.copyfileobj(body, out, CHUNK_SIZE)
+            yield path
+        finally:
+            os.remove(path)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._name(key))
+
+
+class InMemoryS3Client:
+    """Local stand-in for an S3 client, for development and tests."""
+
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        data = Body.read() if hasattr(Body, "read") else Body
+        with self.lock:
+            self.objects[(Bucket, Key)] = bytes(data)
+
+    def head_object(self, Bucket, Key):
+        with self.lock:
+            if (Bucket, Key) not in self.objects:
+                raise KeyError(Key)
+            return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        with self.lock:
+            self.objects.pop((Bucket, Key), None)
+
+
+class BlobStore:
+    def __init__(self, backend, blobs_collection, tmp_dir=None):
+        self.backend = backend
+        self.blobs_collection = blobs_collection
+        self.tmp_dir = tmp_dir
+
+    def put(self, fileobj, filename=None):
+        """Stream ``fileobj`` into the store and take a reference to it; returns the key."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            key = digest.hexdigest()
+
+            # Take the reference before storing, so a sweep can see it
+            content_type = mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+            blob = self.blobs_collection.find_one_and_update(
+                {"_id": key},
+                {"$inc": {"refs": 1}, "$setOnInsert": {"size": size, "content_type": content_type}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        try:
+            if blob.get("gc_pending") == "marked":
+                # Referenced again: the sweep now skips it
+                self.blobs_collection.update_one({"_id": key, "gc_pending": "marked"}, {"$unset": {"gc_pending": ""}})
+            elif blob.get("gc_pending") == "sweeping":
+                self._wait_for_sweep(key)
+            # Writes the file unless it is already there, e.g. again after a sweep deleted it
+            self.backend.store(key, tmp_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.release(key)
+            raise
+        return key
+
+    def _wait_for_sweep(self, key):
+        deadline = time.monotonic() + GC_SWEEP_WAIT
+        while self.blobs_collection.find_one({"_id": key, "gc_pending": "sweeping"}, {"_id": 1}):
+            if time.monotonic() > deadline:
+                log_event("blob_sweep_wait_timeout", logging.WARNING, key=key)
+                return
+            sleep(GC_SWEEP_POLL)
+
+    def release(self, key):
+        """Drop one reference; the blob itself goes at the next garbage collection."""
+        if key:
+            self.blobs_collection.update_one({"_id": key}, {"$inc": {"refs": -1}})
+
+    def info(self, key):
+        return self.blobs_collection.find_one({"_id": key})
+
+    def open(self, key):
+        return self.backend.open(key)
+
+    def local_path(self, key):
+        return self.backend.local_path(key)
+
+    def collect_garbage(self):
+        """Delete blobs whose reference count has dropped to zero, and their thumbnails."""
+        self.blobs_collection.update_many(
+            {"refs": {"$lte": 0}, "gc_pending": {"$exists": False}},
+            {"$set": {"gc_pending": "marked"}}
+        )
+        removed = 0
+        while True:
+            # Only a blob nobody took a reference to since it was marked
+            blob = self.blobs_collection.find_one_and_update(
+                {"refs": {"$lte": 0}, "gc_pending": "marked"},
+                {"$set": {"gc_pending": "sweeping"}}
+            )
+            if blob is None:
+                return removed
+            self.backend.delete(blob["_id"])
+            if self.blobs_collection.find_one_and_delete({"_id": blob["_id"], "refs": {"$lte": 0}}) is None:
+                # A put arrived mid-sweep; it rewrites the file once this is cleared
+                self.blobs_collection.update_one({"_id": blob["_id"]}, {"$unset": {"gc_pending": ""}})
+                continue
+            for variant_key in (blob.get("variants") or {}).values():
+                self.release(variant_key)
+            removed += 1
+
+
+def blob_store_from_env(blobs_collection):
+    """Build the BlobStore selected by ``STORAGE_BACKEND``."""
+    if STORAGE_BACKEND == "s3":
+        import boto3
+        backend = S3Backend(boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL")), S3_BUCKET)
+    elif STORAGE_BACKEND == "memory":
+        backend = S3Backend(InMemoryS3Client(), S3_BUCKET)
+    else:
+        backend = FileSystemBackend(STORAGE_ROOT)
+    return BlobStore(backend, blobs_collection)
+
+
+def save_upload(store, upload):
+    """Store a werkzeug FileStorage; returns the blob key and the original filename."""
+    return {"key": store.put(upload.stream, upload.filename), "filename": upload.filename}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blob storage maintenance")
+    parser.add_argument("--gc", action="store_true", help="delete blobs with no references")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    if args.gc:
+        store = blob_store_from_env(db["blobs"])
+        print(f"Removed {store.collect_garbage()} unreferenced blobs")
@@ -0,0 +1,118 @@
+"""Sized, re-encoded variants of uploaded images.
+
+Originals stay in the blob store untouched. Each variant is a blob of its
+own, and the original's ``blobs`` document maps size name -> variant key,
+so the mapping never changes once written and can be cached freely.
+
+    python -m utils.thumbnails   generate variants for images uploaded earlier
+"""
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+from utils.logs import log_event
+
+# name -> longest edge in pixels
+THUMBNAIL_SIZES = {"small": 96, "medium": 320, "large": 1024}
+THUMBNAIL_QUALITY = 82
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+VARIANT_CACHE_SIZE = 10000
+
+
+def render_variants(path, sizes=THUMBNAIL_SIZES):
+    """Return ``{name: jpeg_bytes}``; images already under a size are re-encoded, not upscaled."""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        variants = {}
+        for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+            if max(image.size) > edge:
+                image.thumbnail((edge, edge), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            variants[name] = out.getvalue()
+        return variants
+
+
+class Thumbnailer:
+    """Generates variants on a small worker pool, off the upload request."""
+
+    def __init__(self, store, max_workers=THUMBNAIL_WORKERS):
+        self.store = store
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self.variants = OrderedDict()  # (key, size) -> variant key
+        self.lock = threading.Lock()
+
+    def submit(self, key):
+        return self.pool.submit(self.generate, key)
+
+    def generate(self, key):
+        blob = self.store.info(key)
+        if not blob or blob.get("content_type") not in IMAGE_TYPES or "variants" in blob or blob.get("variant"):
+            return None
+        try:
+            with self.store.local_path(key) as path:
+                rendered = render_variants(path)
+        except Exception as e:
+            log_event("thumbnail_failed", logging.WARNING, key=key, error=e)
+            return None
+        variants = {
+            name: self.store.put(io.BytesIO(data), f"{name}.jpg")
+            for name, data in rendered.items()
+        }
+        self.store.blobs_collection.update_many(
+            {"_id": {"$in": list(variants.values())}}, {"$set": {"variant": True}}
+        )
+        # Only the first writer records its variants; a racing duplicate gives its refs back
+        result = self.store.blobs_collection.update_one(
+            {"_id": key, "variants": {"$exists": False}}, {"$set": {"variants": variants}}
+        )
+        if result.modified_count == 0:
+            for variant_key in variants.values():
+                self.store.release(variant_key)
+        return variants
+
+    def variant(self, key, size):
+        """Key of the ``size`` variant of ``key``, or None until it has been generated."""
+        with self.lock:
+            found = self.variants.get((key, size))
+            if found:
+                self.variants.move_to_end((key, size))
+                return found
+        blob = self.store.blobs_collection.find_one({"_id": key}, {"variants": 1})
+        found = ((blob or {}).get("variants") or {}).get(size)
+        if found:
+            with self.lock:
+                self.variants[(key, size)] = found
+                while len(self.variants) > VARIANT_CACHE_SIZE:
+                    self.variants.popitem(last=False)
+        return found
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from utils.storage import blob_store_from_env
+
+    load_dotenv()
+    db = MongoClient(os.getenv("CON_STR"))["freelanceconnect"]
+    thumbnailer = Thumbnailer(blob_store_from_env(db["blobs"]))
+    pending = db["blobs"].find(
+        {"content_type": {"$in": list(IMAGE_TYPES)}, "variants": {"$exists": False}, "variant": {"$ne": True}},
+        {"_id": 1}
+    )
+    futures = [thumbnailer.submit(blob["_id"]) for blob in pending]
+    done = sum(1 for future in futures if future.result())
+    print(f"Generated variants for {done} images")
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from bson.errors import InvalidId
+
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL = 60  # seconds
+
+# Password hashes never need to sit in the cache
+USER_PROJECTION = {"hashed_password": 0}
+
+
+class UserCache:
+    """TTL'd LRU of user documents keyed by ObjectId.
+
+    Call ``invalidate`` after writing to a user document so this worker
+    sees the change at once; other workers pick it up when the TTL runs out.
+    """
+
+    def __init__(self, users_collection, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.users_collection = users_collection
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.users = OrderedDict()  # ObjectId -> (expires_at, user)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id):
+        try:
+            return user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+        except (InvalidId, TypeError):
+            return None
+
+    def _lookup(self, key, now):
+        entry = self.users.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            del self.users[key]
+            return None
+        self.users.move_to_end(key)
+        return entry[1]
+
+    def _store(self, user, now):
+        self.users[user["_id"]] = (now + self.ttl, user)
+        self.users.move_to_end(user["_id"])
+        while len(self.users) > self.maxsize:
+            self.users.popitem(last=False)
+
+    def get(self, user_id):
+        return self.get_many([user_id]).get(str(user_id))
+
+    def get_many(self, user_ids):
+        """Return ``{str(id): user}`` for the ids that exist, using one $in query for misses."""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self.lock:
+            for user_id in user_ids:
+                key = self._key(user_id)
+                if key is None:
+                    continue
+                user = self._lookup(key, now)
+                if user is not None:
+                    found[str(key)] = user
+                else:
+                    missing.append(key)
+        if missing:
+            users = list(self.users_collection.find({"_id": {"$in": missing}}, USER_PROJECTION))
+            with self.lock:
+                for user in users:
+                    self._store(user, now)
+                    found[str(user["_id"])] = user
+        return found
+
+    def invalidate(self, user_id):
+        key = self._key(user_id)
+        with self.lock:
+            self.users.pop(key, None)